@@ -0,0 +1,319 @@
+"""
+Asyncio arena server: many clients pick characters, manage equipment, train and duel at the same time.
+
+The protocol is one JSON object per line in both directions. Every request has an "op" field, and every
+response has "ok" plus either the result fields or an "error" message:
+
+    {"op": "select", "name": "Alice", "class": "warrior"}   pick a character, creating it if it is new
+    {"op": "stats"}                                          the selected character
+    {"op": "inventory"}                                      unequipped and equipped items, numbered from 1
+    {"op": "equip", "index": 1}                              put on an item from the inventory list
+    {"op": "unequip", "index": 1}                            take off an item from the armory list
+    {"op": "equip_best", "objective": "duel"}                wear the best gear from the inventory
+    {"op": "train", "bots": 10}                              fight bots in the forest, at most Arena.max_bots
+    {"op": "duel", "opponent": "Bob"}                        fight another stored character
+    {"op": "quit"}
+
+Requests are handled one at a time on the event loop and never await in the middle of a game action, so a
+character shared by several sessions is never seen half-updated.
+
+    python arena.py serve --port 8765
+    python arena.py load --port 8765 --clients 200 --fights 50
+    python arena.py bench --clients 200 --fights 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import events
+
+from character import Character, Warrior, Mage, Rogue, Paladin
+from game import Game
+from loadout import OBJECTIVES, equip_best
+from main import create_character
+from rng import derive, new_seed
+from storage import PlayerStore, open_store
+
+CHARACTER_CLASSES: dict[str, type[Character]] = {
+    character_class.get_character_type(): character_class for character_class in (Warrior, Mage, Rogue, Paladin)
+}
+
+
+class ArenaError(Exception):
+    """A request the arena cannot carry out. The message is sent back to the client."""
+
+
+class Arena:
+    """
+    Game logic shared by all sessions of a server.
+
+    Attributes:
+        players (PlayerStore): Where characters are loaded from and saved to.
+        seed (int): Root seed of the arena's fights. Duel n is Game(seed=seed, match_id=n).
+        fights (int): Number of duels fought since the arena started.
+        trainings (int): Number of training batches since the arena started.
+        max_bots (int): Most bots a single train request may fight. A batch runs on the event loop, so this
+            bounds how long one request holds up every other session.
+    """
+    max_bots = 1_000
+
+    def __init__(self, players: PlayerStore, seed: None | int = None) -> None:
+        self.players = players
+        self.seed = new_seed() if seed is None else seed
+        self.fights = 0
+        self.trainings = 0
+
+    def close(self) -> None:
+        self.players.save()
+
+    @staticmethod
+    def describe(character: Character) -> dict:
+        return {
+            "name": character.name,
+            "type": character.type_char,
+            "level": character.level,
+            "experience": character.experience,
+            "health": character.health,
+            "shield": character.shield,
+            "damage": character.damage,
+        }
+
+    def select(self, name: str, character_type: None | str) -> Character:
+        """Returns a stored character, or creates one if character_type is given."""
+        if not isinstance(name, str) or not name:
+            raise ArenaError("The name must be a non-empty string.")
+        character = self.players.get(name)
+        if character is not None:
+            return character
+        if character_type not in CHARACTER_CLASSES:
+            raise ArenaError(f"No character named {name}. Choose a class: {', '.join(CHARACTER_CLASSES)}.")
+        character = create_character(name, CHARACTER_CLASSES[character_type])
+        self.players[name] = character
+        return character
+
+    @staticmethod
+    def _pick(items: list, index) -> object:
+        if not isinstance(index, int) or not 1 <= index <= len(items):
+            raise ArenaError("Incorrect index.")
+        return items[index - 1]
+
+    def equip(self, character: Character, index: int) -> None | str:
+        return character.put_on(self._pick(character.inventory.unequipped(character.armory), index))
+
+    def unequip(self, character: Character, index: int) -> None:
+        character.take_off(self._pick([item for item in character.armory.list_items.values() if item], index))
+
+    def train(self, character: Character, bots: int) -> dict:
+        if not isinstance(bots, int) or bots < 1:
+            raise ArenaError("The number of bots must be a positive integer.")
+        if bots > self.max_bots:
+            raise ArenaError(f"At most {self.max_bots} bots per training.")
+        report = Game.train_in_forest(character, bots, derive(self.seed, "train", self.trainings))
+        self.trainings += 1
+        self.players.save([character.name])
+        return {"wins": report.wins, "losses": report.losses, "draws": report.draws,
+                "levels_gained": report.levels_gained, "drops": len(report.drops)}
+
+    def duel(self, character: Character, opponent_name: str) -> dict:
+        if not isinstance(opponent_name, str) or not opponent_name:
+            raise ArenaError("The opponent must be a non-empty string.")
+        opponent = self.players.get(opponent_name)
+        if opponent is None:
+            raise ArenaError(f"No character named {opponent_name}.")
+        if opponent is character:
+            raise ArenaError("A character can't fight itself.")
+        game = Game(character, opponent, self.seed, self.fights)
+        game.boost_char_damage()
+        with events.unsubscribed(events.console_renderer):
+            game.resolve_fight()
+        self.players.save([character.name, opponent.name])
+        self.fights += 1
+        return {"winner": game.winner and game.winner.name, "rounds": game.rounds, "you": self.describe(character)}
+
+    def handle(self, session: dict, request: dict) -> dict:
+        """
+        Carries out one request.
+
+        Args:
+            session (dict): Per-connection state, holding the selected character.
+            request (dict): The decoded request.
+
+        Returns:
+            dict: The response fields, without "ok".
+        """
+        op = request.get("op")
+        if op == "select":
+            session["character"] = self.select(request.get("name"), request.get("class"))
+            return self.describe(session["character"])
+        character = session.get("character")
+        if character is None:
+            raise ArenaError("Select a character first.")
+        if op == "stats":
+            return self.describe(character)
+        if op == "inventory":
+            return {"inventory": [str(item) for item in character.inventory.unequipped(character.armory)],
+                    "armory": [str(item) for item in character.armory.list_items.values() if item]}
+        if op == "equip":
+            message = self.equip(character, request.get("index"))
+            if message:
+                raise ArenaError(message)
+            return self.describe(character)
+        if op == "unequip":
+            self.unequip(character, request.get("index"))
+            return self.describe(character)
+        if op == "equip_best":
+            objective = request.get("objective", "duel")
+            if objective not in OBJECTIVES:
+                raise ArenaError(f"Unknown objective: {objective}. Choose one of {', '.join(OBJECTIVES)}.")
+            equip_best(character, objective)
+            return self.describe(character)
+        if op == "train":
+            return self.train(character, request.get("bots", 1))
+        if op == "duel":
+            return self.duel(character, request.get("opponent"))
+        raise ArenaError(f"Unknown op: {op}.")
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handles one connection until the client quits or disconnects."""
+        session = {}
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ArenaError("Requests must be JSON objects.")
+                    if request.get("op") == "quit":
+                        writer.write(b'{"ok": true}\n')
+                        await writer.drain()
+                        break
+                    response = {"ok": True, **self.handle(session, request)}
+                except ArenaError as error:
+                    response = {"ok": False, "error": str(error)}
+                except json.JSONDecodeError:
+                    response = {"ok": False, "error": "Requests must be JSON objects."}
+                except Exception as error:
+                    # A bug in handling one request must not drop the session.
+                    response = {"ok": False, "error": f"Internal error: {type(error).__name__}."}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(arena: Arena, host: str = "127.0.0.1", port: int = 8765,
+                       unix_path: None | str = None) -> asyncio.AbstractServer:
+    """Starts listening on a TCP port, or on a Unix socket if unix_path is given."""
+    if unix_path:
+        return await asyncio.start_unix_server(arena.serve_client, unix_path, limit=2 ** 20, backlog=4096)
+    return await asyncio.start_server(arena.serve_client, host, port, limit=2 ** 20, backlog=4096)
+
+
+async def _open(host: str, port: int, unix_path: None | str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=2 ** 20)
+    return await asyncio.open_connection(host, port, limit=2 ** 20)
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, **request) -> dict:
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def _load_client(number: int, clients: int, fights: int, host: str, port: int, unix_path: None | str,
+                       latencies: list[float]) -> None:
+    reader, writer = await _open(host, port, unix_path)
+    await _request(reader, writer, op="select", name=f"load-{number}",
+                   **{"class": random.choice(list(CHARACTER_CLASSES))})
+    await _request(reader, writer, op="equip", index=1)
+    for fight in range(fights):
+        opponent = f"load-{(number + 1 + fight % (clients - 1)) % clients}"
+        started = time.perf_counter()
+        response = await _request(reader, writer, op="duel", opponent=opponent)
+        if response["ok"]:
+            latencies.append(time.perf_counter() - started)
+    await _request(reader, writer, op="quit")
+    writer.close()
+
+
+async def run_load(clients: int = 100, fights: int = 20, host: str = "127.0.0.1", port: int = 8765,
+                   unix_path: None | str = None) -> dict:
+    """
+    Connects many clients at once, each fighting the others' characters.
+
+    Args:
+        clients (int): Number of concurrent connections, at least 2.
+        fights (int): Duels requested by every client.
+        host (str): Server host.
+        port (int): Server port.
+        unix_path (None | str): Unix socket path, used instead of host and port.
+
+    Returns:
+        dict: Fights per second and p50/p99 duel latency in milliseconds.
+    """
+    # Create every character first so that opponents exist when the duels start.
+    setup = [await _open(host, port, unix_path) for _ in range(clients)]
+    for number, (reader, writer) in enumerate(setup):
+        await _request(reader, writer, op="select", name=f"load-{number}",
+                       **{"class": random.choice(list(CHARACTER_CLASSES))})
+        await _request(reader, writer, op="quit")
+        writer.close()
+
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_load_client(number, clients, fights, host, port, unix_path, latencies)
+                           for number in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "fights": len(latencies),
+        "fights_per_second": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    arena = Arena(open_store(args.store))
+    server = await start_server(arena, args.host, args.port, args.unix)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        arena.close()
+
+
+async def _bench(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        arena = Arena(open_store(os.path.join(directory, "arena.db")))
+        server = await start_server(arena, args.host, args.port, args.unix)
+        async with server:
+            result = await run_load(args.clients, args.fights, args.host, args.port, args.unix)
+        arena.close()
+        return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arena server and load generator.")
+    parser.add_argument("mode", choices=("serve", "load", "bench"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Unix socket path to use instead of TCP.")
+    parser.add_argument("--store", default="arena.db", help="Player store used by 'serve'.")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--fights", type=int, default=20)
+    arguments = parser.parse_args()
+
+    if arguments.mode == "serve":
+        asyncio.run(_serve(arguments))
+    elif arguments.mode == "load":
+        print(asyncio.run(run_load(arguments.clients, arguments.fights, arguments.host, arguments.port,
+                                   arguments.unix)))
+    else:
+        print(asyncio.run(_bench(arguments)))
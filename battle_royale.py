@@ -0,0 +1,280 @@
+"""
+Battle royale: any number of characters in one arena, every one for themselves, until one is left standing.
+
+    battle = BattleRoyale(characters, seed=7)
+    winner = battle.play()
+
+Every round each fighter still standing picks a target and strikes it, and the strikes of the round land at the
+same time, so a fighter struck down in a round still strikes in it. A strike follows the rules of a duel: the
+type boost of Game.boost_char_damage() when the attacker has the advantage over its target, an extra
+fatal_damage on the fighter's fatal strikes (its own FatalSchedule, as in Game), and the shield absorbing first
+as in take_a_strike().
+
+Targeting keeps one heap of fighters per type, ordered by effective HP (health + shield) left after the strikes
+already aimed at them this round. A fighter strikes the weakest fighter of the type it has the advantage over,
+or the weakest fighter of any type if there is none (or the weakest of any type outright, with
+targeting="weakest"). A target that the strikes aimed at it will bring down is taken off the heaps for the rest
+of the round, so the fighters spread their strikes instead of all striking the same one. Heap entries are never
+searched for: an entry is stale once its fighter is down or has a newer entry, and stale entries are dropped when
+they reach the top, so a round costs O(n log n).
+
+Experience follows Game.check_winner(): the fighter that lands the strike bringing another one down gains
+experience as for beating it in a duel (experience_add() and level_up()) if it is still standing after the round,
+every fallen fighter loses its experience, and the last one standing gets the winner's level-dependent boost. If
+the last fighters fall together there is no winner. Health and shield live in the battle while it runs; every
+fighter is restored when it ends.
+
+    python battle_royale.py 1000 --seed 7
+"""
+import argparse
+import heapq
+
+from character import Character, Mage, Paladin, Rogue, Warrior
+from events import bus, ExperienceChanged, Strike
+from game import Game, health_shield_after, TYPE_ADVANTAGE
+from rng import FatalSchedule, Stream, new_seed
+
+# Attacker type -> the type it gets the type boost against.
+PREY: dict[str, str] = {attacker: defender for attacker, defender in TYPE_ADVANTAGE}
+TARGETING = ("advantage", "weakest")
+
+
+class BattleRoyale:
+    """
+    A free-for-all between any number of characters.
+
+    Attributes:
+        fighters (list[Character]): The fighters, in the order they were given.
+        rounds (int): Rounds fought so far.
+        winner (None | Character): The last one standing once the battle is over, None before or if the last
+            fighters fell together.
+        eliminated (list[tuple[int, Character]]): (round, fighter) for every fallen fighter, in the order they fell.
+        seed (int): Root seed of the battle's random streams.
+        match_id (int | str): Identifies the battle among the battles played with the same seed.
+        targeting (str): 'advantage' or 'weakest', see the module docstring.
+    """
+
+    def __init__(self, fighters: list[Character], seed: None | int = None, match_id: int | str = 0,
+                 targeting: str = "advantage") -> None:
+        """
+        Args:
+            fighters (list[Character]): At least two distinct characters.
+            seed (None | int): Root seed, a fresh one if None. Fighter n, counting from 1, rolls its fatal
+                strikes from Stream(seed, match_id, "fatal", n), so two fighters fight the duel Game would.
+            match_id (int | str): Identifies the battle among the battles played with the same seed.
+            targeting (str): 'advantage' or 'weakest'.
+
+        Raises:
+            ValueError: If there are fewer than two fighters or the targeting is unknown.
+        """
+        if len(fighters) < 2:
+            raise ValueError("A battle needs at least two fighters.")
+        if targeting not in TARGETING:
+            raise ValueError(f"Unknown targeting {targeting!r}, expected one of {TARGETING}.")
+        self.fighters = list(fighters)
+        self.rounds = 0
+        self.winner: None | Character = None
+        self.eliminated: list[tuple[int, Character]] = []
+        self.seed = new_seed() if seed is None else seed
+        self.match_id = match_id
+        self.targeting = targeting
+
+        self._health = [fighter.health for fighter in self.fighters]
+        self._shield = [fighter.shield for fighter in self.fighters]
+        self._damage = [fighter.strike for fighter in self.fighters]
+        self._fatal_damage = [fighter.fatal_damage for fighter in self.fighters]
+        self._types = [fighter.type_char for fighter in self.fighters]
+        self._schedules = [FatalSchedule(Stream(self.seed, match_id, "fatal", number), fighter.fatal_prop)
+                           for number, fighter in enumerate(self.fighters, 1)]
+        # Fighters still standing, in striking order. A fallen fighter is swapped with the last one and popped.
+        self._living = list(range(len(self.fighters)))
+        self._position = list(range(len(self.fighters)))
+        # A heap entry [effective HP, fighter, version] is current while its version is the fighter's version.
+        self._versions = [0] * len(self.fighters)
+        self._heaps: dict[None | str, list[list]] = {}
+        for number, fighter_type in enumerate(self._types):
+            self._heaps.setdefault(fighter_type, []).append([self._health[number] + self._shield[number], number, 0])
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        self._standing = [True] * len(self.fighters)
+
+    @property
+    def over(self) -> bool:
+        """True once at most one fighter is standing."""
+        return len(self._living) <= 1
+
+    def _push(self, number: int, effective_hp: float) -> None:
+        """Makes effective_hp the fighter's current heap entry, leaving its older entries stale."""
+        self._versions[number] += 1
+        heap = self._heaps[self._types[number]]
+        heapq.heappush(heap, [effective_hp, number, self._versions[number]])
+        if len(heap) > 64 and len(heap) > 4 * len(self._living):
+            self._compact(heap)
+
+    def _compact(self, heap: list[list]) -> None:
+        """Drops the stale entries of a heap, so it does not grow with the number of strikes."""
+        versions, standing = self._versions, self._standing
+        heap[:] = [entry for entry in heap if standing[entry[1]] and entry[2] == versions[entry[1]]]
+        heapq.heapify(heap)
+
+    def _top(self, heap: list[list], attacker: int) -> None | list:
+        """Returns the current entry at the top of a heap other than the attacker's own, dropping stale ones."""
+        versions, standing = self._versions, self._standing
+        own = None
+        while heap:
+            entry = heap[0]
+            number = entry[1]
+            if not standing[number] or entry[2] != versions[number]:
+                heapq.heappop(heap)
+            elif number == attacker and own is None:
+                own = heapq.heappop(heap)
+            else:
+                break
+        if own is not None:
+            entry = heap[0] if heap else None
+            heapq.heappush(heap, own)
+            return entry
+        return heap[0] if heap else None
+
+    def _target(self, attacker: int) -> None | list:
+        """Returns the heap entry of the attacker's target, None if no one is left to strike."""
+        if self.targeting == "advantage":
+            prey = self._heaps.get(PREY.get(self._types[attacker]))
+            if prey:
+                entry = self._top(prey, attacker)
+                if entry is not None:
+                    return entry
+        best = None
+        for heap in self._heaps.values():
+            entry = self._top(heap, attacker)
+            if entry is not None and (best is None or entry[0] < best[0]):
+                best = entry
+        return best
+
+    def play_round(self) -> int:
+        """
+        Plays one round: every fighter standing strikes its target, then the fallen are taken out.
+
+        Returns:
+            int: The number of fighters that fell in the round.
+
+        Raises:
+            ValueError: If no one can deal damage any more, so the battle would never end.
+        """
+        if self.over:
+            return 0
+        self.rounds += 1
+        rounds = self.rounds
+        health, shield, damage, types = self._health, self._shield, self._damage, self._types
+        boost = Character.type_boost
+
+        strikes = []
+        for attacker in self._living:
+            entry = self._target(attacker)
+            if entry is None:
+                continue
+            defender = entry[1]
+            strike = damage[attacker]
+            if Game.has_type_advantage(types[attacker], types[defender]):
+                strike *= boost
+            fatal = self._schedules[attacker].is_fatal(rounds)
+            if fatal:
+                strike += self._fatal_damage[attacker]
+            strikes.append((attacker, defender, strike, fatal))
+            # The target's new entry holds what the strikes aimed at it this round leave; a target they bring
+            # down gets none and is not aimed at again until the round is over.
+            self._versions[defender] += 1
+            if entry[0] - strike > 0:
+                heapq.heappush(self._heaps[types[defender]], [entry[0] - strike, defender, self._versions[defender]])
+
+        if not any(strike > 0 for _, _, strike, _ in strikes) and all(
+                self._schedules[number].next_after(rounds) == float("inf") or self._fatal_damage[number] <= 0
+                for number in self._living):
+            raise ValueError("No one can deal damage.")
+
+        emit = bus.listening(Strike)
+        killers: dict[int, int] = {}
+        struck = set()
+        for attacker, defender, strike, fatal in strikes:
+            if emit:
+                name, target_name = self.fighters[attacker].name, self.fighters[defender].name
+                if strike < shield[defender]:
+                    bus.emit(Strike(self, name, target_name, strike, 0.0, fatal))
+                else:
+                    bus.emit(Strike(self, name, target_name, shield[defender], strike - shield[defender], fatal))
+            health[defender], shield[defender] = health_shield_after(health[defender], shield[defender], strike, 1)
+            struck.add(defender)
+            if health[defender] <= 0 and defender not in killers:
+                killers[defender] = attacker
+
+        for number in struck:
+            if health[number] > 0:
+                self._push(number, health[number] + shield[number])
+        for fallen, killer in killers.items():
+            if health[killer] > 0:
+                killer_character = self.fighters[killer]
+                killer_character.experience_add(self.fighters[fallen].level)
+                killer_character.level_up()
+        for fallen in killers:
+            self._eliminate(fallen)
+
+        if self.over:
+            self._finish()
+        return len(killers)
+
+    def _eliminate(self, number: int) -> None:
+        self._standing[number] = False
+        position = self._position[number]
+        last = self._living.pop()
+        if last != number:
+            self._living[position] = last
+            self._position[last] = position
+        fighter = self.fighters[number]
+        fighter.experience_drop()
+        self.eliminated.append((self.rounds, fighter))
+
+    def _finish(self) -> None:
+        """Crowns the last one standing, if any, and restores every fighter."""
+        if self._living:
+            self.winner = self.fighters[self._living[0]]
+            self.winner.level_dependent_boost()
+        for fighter in self.fighters:
+            fighter.restore()
+        if bus.listening(ExperienceChanged):
+            for fighter in self.fighters:
+                bus.emit(ExperienceChanged(self, fighter, fighter.experience, fighter.level))
+
+    def play(self) -> None | Character:
+        """
+        Plays rounds until at most one fighter is standing.
+
+        Returns:
+            None | Character: The winner, None if the last fighters fell together.
+        """
+        while not self.over:
+            self.play_round()
+        return self.winner
+
+    def standings(self) -> list[Character]:
+        """Returns the fighters from the winner down to the first to fall; fighters standing come first."""
+        standing = [self.fighters[number] for number in self._living]
+        return standing + [fighter for _, fighter in reversed(self.eliminated)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays a battle royale between random characters.")
+    parser.add_argument("fighters", type=int, nargs="?", default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--targeting", choices=TARGETING, default="advantage")
+    arguments = parser.parse_args()
+
+    classes = Stream(arguments.seed, "classes")
+    characters = []
+    for index in range(arguments.fighters):
+        character = classes.choice((Warrior, Mage, Rogue, Paladin))()
+        character.name = f"fighter{index}"
+        characters.append(character)
+    battle = BattleRoyale(characters, arguments.seed, targeting=arguments.targeting)
+    champion = battle.play()
+    print(f"{battle.rounds} rounds.")
+    print("The last fighters fell together." if champion is None else f"The winner: \n{champion}")
@@ -0,0 +1,85 @@
+"""
+Measures inventory operations on large inventories, next to the plain list the inventory used to be.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_inventory
+"""
+import random
+import timeit
+
+from inventory_items import Armory, Inventory, ITEM_TYPES, Items
+
+
+def make_items(size: int, distinct: int = 1_000, seed: int = 0) -> list[Items]:
+    """Creates size items drawn from a pool of distinct random items."""
+    generator = random.Random(seed)
+    pool = [ITEM_TYPES[generator.choice(list(ITEM_TYPES))](f"item{number}", round(generator.uniform(0.8, 1.4), 2),
+                                                           round(generator.uniform(0.8, 1.4), 2),
+                                                           round(generator.uniform(0.8, 1.4), 2))
+            for number in range(distinct)]
+    return [generator.choice(pool) for _ in range(size)]
+
+
+def microseconds(statement, number: int, repeat: int = 3) -> float:
+    """Returns the best time per call of statement in microseconds."""
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1e6
+
+
+def run(size: int = 100_000, distinct: int = 1_000) -> list[tuple[str, float, float]]:
+    """
+    Times inventory operations at the given size.
+
+    Args:
+        size (int): Number of items in the inventory.
+        distinct (int): Number of different items among them.
+
+    Returns:
+        list[tuple[str, float, float]]: (operation, microseconds with Inventory, microseconds with a list).
+    """
+    items = make_items(size, distinct)
+    inventory, plain = Inventory(), []
+    inventory.add_item(*items)
+    plain.extend(items)
+    armory = Armory()
+    armory.set_items({"helmet": inventory.ranked("helmet")[0]})
+    equipped = [item for item in armory.list_items.values() if item]
+    probe = items[size // 2]
+
+    def remove_and_add() -> None:
+        inventory.remove_item(probe)
+        inventory.add_item(probe)
+
+    def list_remove_and_add() -> None:
+        plain.remove(probe)
+        plain.append(probe)
+
+    def list_unequipped() -> list:
+        left, result = list(equipped), []
+        for item in plain:
+            if item in left:
+                left.remove(item)
+            else:
+                result.append(item)
+        return result
+
+    def list_best() -> Items:
+        return max((item for item in plain if item.get_item_type() == "ring"),
+                   key=lambda item: item.boost_damage * item.boost_health * item.boost_shield)
+
+    inventory.unequipped(armory)
+    return [
+        ("contains", microseconds(lambda: probe in inventory, 10_000), microseconds(lambda: probe in plain, 100)),
+        ("remove + add", microseconds(remove_and_add, 10_000), microseconds(list_remove_and_add, 100)),
+        ("unequipped, cached", microseconds(lambda: inventory.unequipped(armory), 10_000),
+         microseconds(list_unequipped, 3)),
+        ("best ring", microseconds(lambda: inventory.best("ring", armory), 10_000), microseconds(list_best, 3)),
+        ("render unequipped", microseconds(lambda: [str(item) for item in inventory.unequipped(armory)], 3),
+         microseconds(lambda: [str(item) for item in list_unequipped()], 3)),
+    ]
+
+
+if __name__ == "__main__":
+    print(f"{'operation':>20} {'Inventory':>14} {'list':>14}")
+    for operation, counted, listed in run():
+        print(f"{operation:>20} {counted:>11.2f} us {listed:>11.2f} us")
@@ -0,0 +1,133 @@
+"""
+Measures the memory held per bot and per character, and how long they take to build.
+
+The memory is also measured for the layout before __slots__ and shared catalog items: the same objects copied
+into plain objects that keep their attributes in a __dict__, with a copy of every item per bot or character.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory
+"""
+import pickle
+import timeit
+import tracemalloc
+import types
+
+from typing import Callable
+
+from bots import Bot
+from character import Warrior
+from inventory_items import Armory, Inventory
+from main import create_character
+
+
+class Unslotted:
+    """A plain object keeping its attributes in a __dict__, like the classes did before __slots__."""
+
+
+def unslotted(value, copies: None | dict[int, object] = None):
+    """
+    Returns a value in the old layout: every object with __slots__ becomes an Unslotted with the same attributes,
+    so every shared catalog item becomes a copy of its own, and containers are copied with their contents.
+
+    Args:
+        value: A bot, character or anything they hold.
+        copies (None | dict[int, object]): Copies made so far by id, so that an object held twice, like an
+            equipped item that is also in the inventory, is copied once.
+    """
+    copies = {} if copies is None else copies
+    copy = copies.get(id(value))
+    if copy is not None:
+        return copy
+    if isinstance(value, (list, tuple)):
+        copy = copies[id(value)] = type(value)(unslotted(item, copies) for item in value)
+    elif isinstance(value, dict):
+        copy = copies[id(value)] = {unslotted(key, copies): unslotted(item, copies) for key, item in value.items()}
+    elif hasattr(type(value), "__slots__"):
+        copy = copies[id(value)] = Unslotted()
+        for cls in type(value).__mro__:
+            for name, slot in vars(cls).items():
+                if isinstance(slot, types.MemberDescriptorType) and hasattr(value, name):
+                    setattr(copy, name, unslotted(getattr(value, name), copies))
+    else:
+        return value
+    return copy
+
+
+def bytes_per_object(factory: Callable, count: int) -> float:
+    """
+    Returns the traced memory still held per object after creating count objects.
+
+    Args:
+        factory (Callable): Creates one object.
+        count (int): Number of objects to create and keep alive.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def nanoseconds_per_object(factory: Callable, count: int, repeat: int = 5) -> float:
+    """
+    Returns the best construction time per object over several runs.
+
+    Args:
+        factory (Callable): Creates one object.
+        count (int): Number of objects created per run.
+        repeat (int): Number of runs.
+    """
+    return min(timeit.repeat(factory, number=count, repeat=repeat)) / count * 1e9
+
+
+def run_construction(count: int = 20_000) -> dict[str, float]:
+    """
+    Runs the construction time benchmarks.
+
+    Args:
+        count (int): Number of objects created per run.
+
+    Returns:
+        dict[str, float]: Nanoseconds per object for every benchmark.
+    """
+    return {
+        "bot": nanoseconds_per_object(Bot, count),
+        "new character": nanoseconds_per_object(lambda: create_character("player", Warrior), count),
+        "inventory": nanoseconds_per_object(Inventory, count),
+        "armory": nanoseconds_per_object(Armory, count),
+    }
+
+
+def run(count: int = 20_000, roster_size: int = 5_000) -> dict[str, tuple[float, float]]:
+    """
+    Runs the memory benchmarks, both for the current layout and for the old one, see unslotted().
+
+    Args:
+        count (int): Number of bots and characters to create.
+        roster_size (int): Number of characters in the pickled roster.
+
+    Returns:
+        dict[str, tuple[float, float]]: Bytes per object for every benchmark, now and in the old layout.
+    """
+    roster = {f"player{i}": create_character(f"player{i}", Warrior) for i in range(roster_size)}
+    data = pickle.dumps(roster)
+    old_data = pickle.dumps(unslotted(roster))
+    return {
+        "bot": (bytes_per_object(Bot, count), bytes_per_object(lambda: unslotted(Bot()), count)),
+        "new character": (bytes_per_object(lambda: create_character("player", Warrior), count),
+                          bytes_per_object(lambda: unslotted(create_character("player", Warrior)), count)),
+        "loaded character": (bytes_per_object(lambda: pickle.loads(data), 10) / roster_size,
+                             bytes_per_object(lambda: pickle.loads(old_data), 10) / roster_size),
+        "pickled character": (len(data) / roster_size, len(old_data) / roster_size),
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'bytes':>20}  {'now':>10} {'old layout':>10} {'old/now':>8}")
+    for name, (value, old) in run().items():
+        print(f"{name:>20}: {value:10.1f} {old:10.1f} {old / value:7.2f}x")
+    for name, value in run_construction().items():
+        print(f"{name:>20}: {value:10.1f} ns")
@@ -0,0 +1,75 @@
+"""
+Measures how round-robin tournaments scale with the number of worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tournament
+    python -m benchmarks.bench_tournament --size 1000 --workers 1 4
+"""
+import argparse
+import os
+import random
+import time
+
+from character import Warrior, Mage, Rogue, Paladin
+from main import create_character
+from tournament import Tournament
+
+
+def make_roster(size: int, seed: int = 0) -> list:
+    """Creates characters of random classes and levels from 1 to 21, each level gained as after a won duel."""
+    generator = random.Random(seed)
+    roster = []
+    for number in range(size):
+        character = create_character(f"player{number}", generator.choice((Warrior, Mage, Rogue, Paladin)))
+        for _ in range(generator.randint(0, 20)):
+            # Five wins over an opponent of the same level make the 100 experience a level takes.
+            for _ in range(5):
+                character.experience_add(character.level)
+            character.level_up()
+            character.level_dependent_boost()
+        roster.append(character)
+    return roster
+
+
+def run(size: int = 2_000, workers: None | list[int] = None) -> list[tuple[int, float]]:
+    """
+    Plays the same round robin with different numbers of workers.
+
+    Args:
+        size (int): Number of participants.
+        workers (None | list[int]): Worker counts to try, defaults to 1, the powers of two up to the CPU count
+            and the CPU count, with at least two of them.
+
+    Returns:
+        list[tuple[int, float]]: (workers, seconds) for every run.
+    """
+    if workers is None:
+        cpus = max(os.cpu_count() or 1, 2)
+        workers = sorted({2 ** power for power in range(cpus.bit_length()) if 2 ** power <= cpus} | {cpus})
+    timings, reference = [], None
+    for count in workers:
+        roster = make_roster(size)
+        started = time.perf_counter()
+        standings = Tournament(roster, workers=count, seed=0).round_robin()
+        timings.append((count, time.perf_counter() - started))
+        result = [(character.name, points, character.level, character.experience) for character, points in standings]
+        if reference is None:
+            reference = result
+        elif result != reference:
+            raise AssertionError(f"Results with {count} workers differ from the results with {workers[0]}.")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the same round robin with different numbers of workers.")
+    parser.add_argument("--size", type=int, default=2_000, help="Number of participants.")
+    parser.add_argument("--workers", type=int, nargs="+", help="Worker counts to try, 1 first for the speedups.")
+    arguments = parser.parse_args()
+
+    levels = [character.level for character in make_roster(arguments.size)]
+    print(f"{arguments.size} participants, levels {min(levels)}-{max(levels)}, {os.cpu_count() or 1} CPU(s).")
+    results = run(arguments.size, arguments.workers)
+    base = results[0][1]
+    for count, seconds in results:
+        print(f"{count:>3} workers: {seconds:8.2f} s, speedup {base / seconds:5.2f}x")
@@ -0,0 +1,308 @@
+"""
+Benchmark suite for the combat, equipment and persistence hot paths, compared against a stored baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.run                          compare with benchmarks/baseline.json
+    python -m benchmarks.run --save                   record the current numbers as the baseline
+    python -m benchmarks.run --roster-sizes 100 1000000
+    python -m benchmarks.run --royale-sizes 10 1000 100000
+
+Every benchmark reports the best time per operation over a few repeats. A benchmark is a regression when it is
+slower than its baseline by more than the threshold (25% by default), and the exit status is then 1. Baselines
+are only comparable on the machine that recorded them.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from typing import Callable
+
+import headless
+import main
+
+from battle_royale import BattleRoyale
+from bots import Bot, BotFactory
+from character import Warrior, Mage, Rogue, Paladin
+from game import Game
+from inventory_items import Armory, Inventory, ITEM_CATALOG, ITEM_TYPES
+from storage import open_store
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+ROSTER_SIZES = (100, 1_000, 10_000, 100_000)
+ROYALE_SIZES = (10, 100, 1_000, 10_000, 100_000)
+CLASSES = (Warrior, Mage, Rogue, Paladin)
+
+
+def measure(setup: Callable[[], object], run: Callable[[object], None], operations: int, repeat: int = 5) -> float:
+    """
+    Returns the best time per operation in nanoseconds.
+
+    Args:
+        setup (Callable): Builds fresh state before every repeat, untimed.
+        run (Callable): Does `operations` operations on the state, timed.
+        operations (int): Number of operations done by one run.
+        repeat (int): Number of timed runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup()
+        started = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - started)
+    return best / operations * 1e9
+
+
+def strike_loop(fights: int = 500) -> float:
+    """Game.take_a_strike() until one side falls, per fight."""
+    def setup() -> list[Game]:
+        generator = random.Random(0)
+        games = []
+        for number in range(fights):
+            game = Game(main.create_character("a", generator.choice(CLASSES)),
+                        main.create_character("b", generator.choice(CLASSES)), seed=0, match_id=number)
+            game.boost_char_damage()
+            games.append(game)
+        return games
+
+    def run(games: list[Game]) -> None:
+        for game in games:
+            while game.character_1.health > 0 and game.character_2.health > 0:
+                game.take_a_strike()
+
+    return measure(setup, run, fights)
+
+
+def forest_training(bots: int = 500) -> float:
+    """Game.forest_training() and forest_train_winner() until the bot or the character falls, per bot."""
+    def setup() -> tuple[Game, Warrior, BotFactory]:
+        character = main.create_character("a", Warrior)
+        return Game(character, main.create_character("b", Mage), seed=0), character, BotFactory()
+
+    def run(state: tuple[Game, Warrior, BotFactory]) -> None:
+        game, character, factory = state
+        with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+            for _ in range(bots):
+                bot = factory.acquire(character.level)
+                while True:
+                    game.forest_training(character, bot)
+                    if game.forest_train_winner(character, bot):
+                        break
+                factory.release(bot)
+                game.restore_health_shield()
+
+    return measure(setup, run, bots)
+
+
+def bot_construction(count: int = 100_000) -> float:
+    """Bot(), per bot."""
+    return measure(lambda: None, lambda _: [Bot() for _ in range(count)], count)
+
+
+def bot_generator(count: int = 100_000) -> float:
+    """next(Bot.gen_bot()), per bot."""
+    return measure(lambda: None, lambda _: [next(Bot.gen_bot()) for _ in range(count)], count)
+
+
+def bot_pool(count: int = 100_000) -> float:
+    """BotFactory.acquire() and release(), the way main.forest_training() spawns bots, per bot."""
+    def run(factory: BotFactory) -> None:
+        for level in range(count):
+            factory.release(factory.acquire(level % 50))
+
+    return measure(BotFactory, run, count)
+
+
+def armory_churn(cycles: int = 20_000) -> float:
+    """Armory.set_item() and take_off_item() of every slot but the shield, per item put on and taken off."""
+    items = [item for slot, item in ITEM_CATALOG.items() if slot != "shield"]
+
+    def run(armory: Armory) -> None:
+        for _ in range(cycles):
+            for item in items:
+                armory.set_item(item)
+            for item in items:
+                armory.take_off_item(item)
+
+    return measure(Armory, run, cycles * len(items))
+
+
+def inventory_growth(count: int = 100_000) -> float:
+    """Inventory.add_item() into one growing inventory, per item."""
+    generator = random.Random(0)
+    pool = [ITEM_TYPES[generator.choice(list(ITEM_TYPES))](f"item{number}", 1.1, 1.0, 1.0) for number in range(1_000)]
+    items = [generator.choice(pool) for _ in range(count)]
+
+    def run(inventory: Inventory) -> None:
+        for item in items:
+            inventory.add_item(item)
+
+    return measure(Inventory, run, count)
+
+
+@contextlib.contextmanager
+def _main_store(path: str):
+    """Points main.open_file() and main.save_file() at another store for the duration."""
+    saved = main.players, main.file_name, main.legacy_file_name
+    main.players, main.file_name, main.legacy_file_name = None, path, path
+    try:
+        yield
+    finally:
+        if main.players is not None:
+            main.players.close()
+        main.players, main.file_name, main.legacy_file_name = saved
+
+
+def headless_sessions(count: int = 1_000) -> float:
+    """headless.run_sessions() of generated sessions on a fresh store, per session."""
+    def run(directory: tempfile.TemporaryDirectory) -> None:
+        with directory, _main_store(os.path.join(directory.name, "players.db")):
+            for _ in headless.run_sessions(headless.generate_sessions(count)):
+                pass
+
+    return measure(tempfile.TemporaryDirectory, run, count, repeat=3)
+
+
+def roster(size: int) -> dict[str, float]:
+    """
+    main.open_file() plus loading every player, per player, and main.save_file() after one player changed, per call.
+
+    Args:
+        size (int): Number of players in the roster.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "players.db")
+        store = open_store(path)
+        generator = random.Random(0)
+        for number in range(size):
+            store[f"player{number}"] = main.create_character(f"player{number}", generator.choice(CLASSES))
+            if number % 10_000 == 9_999:
+                store.save()
+                store.reload()
+        store.save()
+        store.close()
+
+        def open_and_load(_) -> None:
+            with _main_store(path):
+                main.open_file()
+                for name in main.players:
+                    main.players[name]
+
+        def load():
+            stack = contextlib.ExitStack()
+            stack.enter_context(_main_store(path))
+            main.open_file()
+            for name in main.players:
+                main.players[name]
+            main.players["player0"].experience_add("bot")
+            return stack
+
+        def save(stack: contextlib.ExitStack) -> None:
+            with stack:
+                main.save_file()
+
+        repeat = 3 if size <= 100_000 else 1
+        return {
+            f"open_file {size}": measure(lambda: None, open_and_load, size, repeat),
+            f"save_file {size}": measure(load, save, 1, repeat),
+        }
+
+
+def battle_royale(size: int) -> dict[str, float]:
+    """
+    BattleRoyale.play() between random characters until one is left, per fighter.
+
+    Args:
+        size (int): Number of fighters.
+    """
+    def setup() -> BattleRoyale:
+        generator = random.Random(0)
+        return BattleRoyale([main.create_character(f"fighter{number}", generator.choice(CLASSES))
+                             for number in range(size)], seed=0)
+
+    repeat = 3 if size <= 10_000 else 1
+    return {f"battle royale {size}": measure(setup, BattleRoyale.play, size, repeat)}
+
+
+def run(roster_sizes: tuple[int, ...] = ROSTER_SIZES,
+        royale_sizes: tuple[int, ...] = ROYALE_SIZES) -> dict[str, float]:
+    """
+    Runs every benchmark.
+
+    Args:
+        roster_sizes (tuple[int, ...]): Roster sizes for the open_file/save_file benchmarks.
+        royale_sizes (tuple[int, ...]): Numbers of fighters for the battle royale benchmarks.
+
+    Returns:
+        dict[str, float]: Nanoseconds per operation by benchmark name.
+    """
+    results = {
+        "strike loop": strike_loop(),
+        "forest training": forest_training(),
+        "Bot()": bot_construction(),
+        "Bot.gen_bot()": bot_generator(),
+        "bot pool": bot_pool(),
+        "armory churn": armory_churn(),
+        "inventory growth": inventory_growth(),
+        "headless session": headless_sessions(),
+    }
+    for size in roster_sizes:
+        results.update(roster(size))
+    for size in royale_sizes:
+        results.update(battle_royale(size))
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """
+    Prints the results next to the baseline.
+
+    Returns:
+        list[str]: Names of the benchmarks slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    print(f"{'benchmark':>20} {'ns/op':>12} {'baseline':>12} {'ratio':>7}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:>20} {value:>12.1f} {'-':>12} {'-':>7}")
+            continue
+        ratio = value / reference
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>20} {value:>12.1f} {reference:>12.1f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the hot paths, compared against a baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file.")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, 0.25 means 25%%.")
+    parser.add_argument("--roster-sizes", type=int, nargs="*", default=list(ROSTER_SIZES))
+    parser.add_argument("--royale-sizes", type=int, nargs="*", default=list(ROYALE_SIZES))
+    arguments = parser.parse_args()
+
+    current = run(tuple(arguments.roster_sizes), tuple(arguments.royale_sizes))
+    stored = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            stored = json.load(file)["results"]
+    slower = compare(current, stored, arguments.threshold)
+    if arguments.save:
+        with open(arguments.baseline, 'w') as file:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "results": {**stored, **current}}, file, indent=2)
+            file.write("\n")
+        print(f"Baseline written to {arguments.baseline}.")
+    elif slower:
+        print(f"{len(slower)} benchmark(s) slower than the baseline by more than {arguments.threshold:.0%}.")
+        sys.exit(1)
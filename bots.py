@@ -1,7 +1,7 @@
-import random
-
 from typing import Generator
-from inventory_items import Items, Helmet, LHandWeapon, RHandWeapon, Shoes, Shield, Ring
+
+from inventory_items import Items, ITEM_CATALOG
+from rng import Stream, new_seed
 
 
 class Bot:
@@ -11,20 +11,51 @@ class Bot:
 
     Attributes:
         _type (str): Identifier for the type of character, always set to 'bot'.
-        __drop_item_probability (float): Probability that the bot will drop an item upon defeat, set to 95%.
+        __drop_item_probability (float): Probability that the bot will drop an item upon defeat, set to 5%.
     """
+    __slots__ = ("_inventory", "_health", "_damage", "_level")
     _type: str = "bot"
-    __drop_item_probability: float = 1 if random.random() <= 0.05 else 0  # 5% probability
+    __drop_item_probability: float = 0.05
+    __base_health: int = 300
+    __base_damage: int = 15
+    __loot: tuple[Items, ...] = tuple(ITEM_CATALOG.values())
 
     def __init__(self) -> None:
         """
         Initializes a Bot with a predefined set of items and base attributes.
+
+        The items are the shared catalog prototypes, so spawning a bot allocates no items.
         """
-        self._inventory: list[Items] = [Helmet(), LHandWeapon(), RHandWeapon(), Shield(), Shoes(), Ring()]
-        self._health: int = 300
-        self._damage: int = 15
+        self._inventory: tuple[Items, ...] = Bot.__loot
+        self._health: int = Bot.__base_health
+        self._damage: int = Bot.__base_damage
         self._level: str = "bot"
 
+    @staticmethod
+    def scaled_stats(opponent_level: int) -> tuple[float, float]:
+        """
+        Returns the health and damage a fresh bot has after a single boost_bot(opponent_level) call.
+
+        Args:
+            opponent_level (int): The level of the opponent.
+        """
+        health, damage = Bot.__base_health, Bot.__base_damage
+        return health + (opponent_level / 10 * health), damage + (opponent_level / 10 * damage)
+
+    @staticmethod
+    def roll_drop(stream: Stream) -> None | Items:
+        """
+        Rolls a bot's loot without creating a bot or printing anything.
+
+        Args:
+            stream (Stream): The stream the drop and the item are rolled from.
+
+        Returns:
+            Items | None: The dropped item, or None if no item is dropped.
+        """
+        if stream.chance(Bot.__drop_item_probability):
+            return stream.choice(Bot.__loot)
+
     def boost_bot(self, opponent_level: int) -> None:
         """
         Dynamically increases the bot's health and damage based on the opponent's level.
@@ -35,17 +66,33 @@ class Bot:
         self._health += (opponent_level / 10 * self._health)
         self._damage += (opponent_level / 10 * self._damage)
 
-    def drop_item(self) -> Items:
+    def drop_item(self, stream: None | Stream = None) -> Items:
         """
         Randomly selects and returns an item from the bot's inventory based on the drop probability.
 
+        Nothing is shown here: Game.forest_train_winner() announces the pickup with an ItemDropped event.
+
+        Args:
+            stream (None | Stream): The stream the drop and the item are rolled from, a fresh one if None.
+
         Returns:
             Items | None: The item dropped by the bot, or None if no item is dropped.
         """
-        if self.__drop_item_probability:
-            item = random.choice(self._inventory)
-            print(f"You picked up a new item: \n{item}.")
-            return item
+        if stream is None:
+            stream = Stream(new_seed(), "drop")
+        if stream.chance(self.__drop_item_probability):
+            return stream.choice(self._inventory)
+
+    def reset(self, health: float, damage: float) -> None:
+        """
+        Puts a used bot back into fighting shape with the given stats, see BotFactory.
+
+        Args:
+            health (float): The bot's health.
+            damage (float): The bot's damage.
+        """
+        self._health = health
+        self._damage = damage
 
     def reduce_health(self, value: int) -> None:
         """
@@ -80,5 +127,69 @@ class Bot:
             yield Bot()
 
 
+class BotFactory:
+    """
+    Hands out bots already scaled to their opponent's level, reusing the bots that were released.
+
+    The stats per opponent level are computed once with Bot.scaled_stats() and kept in a table, so a bot is scaled
+    exactly once per fight and a training loop that releases its bots allocates nothing once the pool is warm.
+
+    Attributes:
+        created (int): Number of bots the factory had to create because the pool was empty.
+    """
+    __slots__ = ("_table", "_pool", "created")
+
+    def __init__(self, levels: int = 64) -> None:
+        """
+        Args:
+            levels (int): Number of opponent levels, from 0, to precompute. Higher levels are added on demand.
+        """
+        self._table: list[tuple[float, float]] = []
+        self._pool: list[Bot] = []
+        self.created = 0
+        if levels > 0:
+            self.stats(levels - 1)
+
+    def stats(self, opponent_level: int) -> tuple[float, float]:
+        """
+        Returns the health and damage of a bot scaled to an opponent level.
+
+        Args:
+            opponent_level (int): The level of the opponent.
+
+        Raises:
+            ValueError: If the level is negative.
+        """
+        if opponent_level < 0:
+            raise ValueError(f"Opponent level {opponent_level} is negative.")
+        table = self._table
+        while len(table) <= opponent_level:
+            table.append(Bot.scaled_stats(len(table)))
+        return table[opponent_level]
+
+    def acquire(self, opponent_level: int) -> Bot:
+        """
+        Returns a bot scaled to an opponent level, from the pool when it has one.
+
+        Args:
+            opponent_level (int): The level of the opponent.
+        """
+        bot = self._pool.pop() if self._pool else None
+        if bot is None:
+            bot = Bot()
+            self.created += 1
+        bot.reset(*self.stats(opponent_level))
+        return bot
+
+    def release(self, bot: Bot) -> None:
+        """
+        Returns a bot to the pool once its fight is over.
+
+        Args:
+            bot (Bot): A bot from acquire() that is no longer used.
+        """
+        self._pool.append(bot)
+
+
 if __name__ == "__main__":
     ...
@@ -1,23 +1,44 @@
-import random
+import console
+
 from inventory_items import Armory, Inventory, Items
+from migration import restore_state
 
 
 class Character:
     """Base class for a character in the game.
 
+    Base stats are kept apart from the stats used in a fight. The effective health, shield and damage are
+    base stats × the boosts of every equipped item × the level modifier, computed when first read and kept
+    until the armory or the level modifier changes. A fight only records what the character has lost, so
+    restoring a character after a fight just forgets that.
+
     Attributes:
         _inventory (Inventory): Character's inventory.
         _armory (Armory): Character's armory.
         _name (str): Name of the character.
-        _health (int): Health points of the character.
-        _damage (int): Damage points the character can inflict.
-        _shield (int): Shield points for damage absorption.
-        _fatal_prop (float): Probability of causing fatal damage.
-        _fatal_damage (int): Damage points when a fatal hit occurs.
+        _base_health (float): Health points without items and level boosts.
+        _base_damage (float): Damage points without items, level and type boosts.
+        _base_shield (float): Shield points without items and level boosts.
+        _level_modifier (float): Product of all level-dependent boosts received so far.
+        _type_modifier (float): Damage multiplier of the current fight's type advantage.
+        _health (None | float): Health points left in the current fight, None when at full health.
+        _shield (None | float): Shield points left in the current fight, None when at full shield.
+        _stats (None | tuple[float, float, float]): Cached effective health, shield and damage.
+        _stats_version (int): Armory version the cached stats were computed for.
+        _fatal_prop (float): Probability that a strike is fatal, rolled on every strike.
+        _fatal_damage (int): Extra damage points of a fatal strike.
         _experience (int): Current experience points.
         _level (int): Current level of the character.
     """
+    __slots__ = ("_inventory", "_armory", "_name", "_base_health", "_base_damage", "_base_shield", "_level_modifier",
+                 "_type_modifier", "_health", "_shield", "_stats", "_stats_version", "_fatal_prop", "_fatal_damage",
+                 "_experience", "_level")
+    # Slots that are pickled. The rest is fight state or cache.
+    _saved_slots = ("_inventory", "_armory", "_name", "_base_health", "_base_damage", "_base_shield",
+                    "_level_modifier", "_fatal_prop", "_fatal_damage", "_experience", "_level")
     _character_type: None | str = None
+    _fatality_probability: float = 0.0
+    type_boost: float = 1.15
 
     def __init__(self):
         """Initializes a Character with default properties and empty inventory and armory."""
@@ -25,13 +46,99 @@ class Character:
         self._inventory: Inventory = Inventory()
         self._armory: Armory = Armory()
         self._name: None | str = None
-        self._health: None | int = None
-        self._damage: None | int = None
-        self._shield: None | int = None
+        self._base_health: None | float = None
+        self._base_damage: None | float = None
+        self._base_shield: None | float = None
+        self._level_modifier: float = 1.0
         self._fatal_prop: None | float = None
         self._fatal_damage: None | int = None
         self._experience: int = 0
         self._level: int = 1
+        self._stats: None | tuple[float, float, float] = None
+        self._stats_version: int = -1
+        self.restore()
+
+    def __getstate__(self) -> dict:
+        return {key: getattr(self, key) for key in Character._saved_slots}
+
+    def __setstate__(self, state) -> None:
+        """
+        Restores a pickled character.
+
+        Characters saved before base stats were kept separately stored their health, shield and damage with the
+        item and level boosts already applied. Those become the new base stats, divided by the boosts of the
+        equipped items, so that the character keeps the same effective stats. They also stored fatality as a 0/1
+        flag drawn once per process, which is replaced by the class's fatality probability.
+        """
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        state = dict(state)
+        legacy_stats = None
+        if "_base_health" not in state:
+            legacy_stats = tuple(state.pop(key, None) for key in ("_health", "_shield", "_damage"))
+        restore_state(self, {key: value for key, value in state.items() if key not in ("_health", "_shield")})
+        for key in Character._saved_slots:
+            if not hasattr(self, key):
+                object.__setattr__(self, key, None)
+        if self._level_modifier is None:
+            self._level_modifier = 1.0
+        if isinstance(self._fatal_prop, int):
+            self._fatal_prop = type(self)._fatality_probability
+        self._stats = None
+        self._stats_version = -1
+        self.restore()
+        if legacy_stats is not None:
+            self.rebase(*legacy_stats)
+
+    def rebase(self, health: float, shield: float, damage: float) -> None:
+        """
+        Sets the base stats so that the effective stats with the current equipment are the given ones.
+
+        The level modifier is folded into the new base stats.
+
+        Args:
+            health (float): Effective health.
+            shield (float): Effective shield.
+            damage (float): Effective damage.
+        """
+        boost_health = boost_shield = boost_damage = 1.0
+        for item in self._armory.list_items.values():
+            if item:
+                boost_health *= item.boost_health
+                boost_shield *= item.boost_shield
+                boost_damage *= item.boost_damage
+        self._base_health = health / boost_health
+        self._base_shield = shield / boost_shield
+        self._base_damage = damage / boost_damage
+        self._level_modifier = 1.0
+        self._stats = None
+
+    def _compute_stats(self) -> tuple[float, float, float]:
+        """Computes and caches the effective health, shield and damage."""
+        health, shield, damage = self._base_health, self._base_shield, self._base_damage
+        for item in self._armory.list_items.values():
+            if item:
+                health *= item.boost_health
+                shield *= item.boost_shield
+                damage *= item.boost_damage
+        modifier = self._level_modifier
+        self._stats = health * modifier, shield * modifier, damage * modifier
+        self._stats_version = self._armory.version
+        return self._stats
+
+    @property
+    def stats(self) -> tuple[float, float, float]:
+        """Effective health, shield and damage outside of a fight."""
+        stats = self._stats
+        if stats is None or self._stats_version != self._armory.version:
+            stats = self._compute_stats()
+        return stats
+
+    def restore(self) -> None:
+        """Ends the current fight: full health and shield, no type boost."""
+        self._health = None
+        self._shield = None
+        self._type_modifier = 1.0
 
     def level_up(self) -> None:
         """Increases the character's level by 1 for every 100 experience points accumulated."""
@@ -66,6 +173,10 @@ class Character:
     def inventory(self) -> Inventory:
         return self._inventory
 
+    @property
+    def armory(self) -> Armory:
+        return self._armory
+
     @name.setter
     def name(self, name) -> None:
         self._name = name
@@ -83,24 +194,40 @@ class Character:
         return self._level
 
     @property
-    def shield(self) -> int | None:
+    def level_modifier(self) -> float:
+        return self._level_modifier
+
+    @property
+    def experience(self) -> int:
+        return self._experience
+
+    @property
+    def base_stats(self) -> tuple[float, float, float]:
+        return self._base_health, self._base_shield, self._base_damage
+
+    @property
+    def shield(self) -> float:
+        if self._shield is None:
+            return self.stats[1]
         return self._shield
 
     @property
     def type_char(self) -> str | None:
         return self._character_type
 
+    @classmethod
+    def get_character_type(cls) -> str | None:
+        return cls._character_type
+
     @property
-    def health(self) -> int | None:
+    def health(self) -> float:
+        if self._health is None:
+            return self.stats[0]
         return self._health
 
     @property
-    def damage(self) -> int | None:
-        return self._damage
-
-    @damage.setter
-    def damage(self, value) -> None:
-        self._damage = value
+    def damage(self) -> float:
+        return self.stats[2] * self._type_modifier
 
     @shield.setter
     def shield(self, value) -> None:
@@ -115,53 +242,60 @@ class Character:
         self._shield = 0
 
     def type_boost_damage(self) -> None:
-        """Increases the damage by 15%."""
-        self._damage *= 1.15
+        """Increases the damage by 15% until the end of the fight."""
+        self._type_modifier *= Character.type_boost
 
     def reduce_shield(self, value: int) -> None:
         """Reduces the shield by a given value."""
-        self._shield -= value
+        self._shield = self.shield - value
 
     def reduce_health(self, value: int) -> None:
         """Reduces the health by a given value."""
-        self._health -= value
+        self._health = self.health - value
 
     @property
-    def strike(self) -> int | None:
-        return self._damage
+    def strike(self) -> float:
+        return self.damage
 
     def level_dependent_boost(self) -> None:
         """Boosts health, shield, and damage based on the character's level."""
-        self._health += (self._level/100 * self._health)
-        self._shield += (self._level/100 * self._shield)
-        self._damage += (self._level/100 * self._damage)
-
-    def __count_attack_put_on(self, item: Items) -> None:
-        """Boosts character stats based on the item equipped."""
-        self._health *= item.boost_health
-        self._shield *= item.boost_shield
-        self._damage *= item.boost_damage
-
-    def __count_attack_take_off(self, item: Items) -> None:
-        """Reduces character stats based on the item unequipped."""
-        self._health /= item.boost_health
-        self._shield /= item.boost_shield
-        self._damage /= item.boost_damage
+        self._level_modifier += (self._level/100 * self._level_modifier)
+        self._stats = None
+
+    def put_on(self, item: Items) -> None | str:
+        """
+        Equips an item. Its boosts apply through the armory.
+
+        Args:
+            item (Items): An item from the character's inventory.
+
+        Returns:
+            None | str: The armory's message if the item conflicts with an equipped one.
+        """
+        return self._armory.set_item(item)
+
+    def take_off(self, item: Items) -> None:
+        """
+        Unequips an item, removing its boosts.
+
+        Args:
+            item (Items): An item from the character's armory.
+        """
+        self._armory.take_off_item(item)
 
     def check_inventory(self) -> None:
         """Allows the character to equip items from the inventory."""
         while True:
-            list_of_items_to_use = [item for item in self._inventory.inventory if not item.is_on]
+            list_of_items_to_use = self._inventory.unequipped(self._armory)
             result = "\n".join([f"{index + 1}. {item}" for index, item in enumerate(list_of_items_to_use)])
-            print(f"{self._name}, check out your inventory:\n", result)
-            index = input("\nIf you want to put something on - choose index. Else type 'n': ")
+            console.write(f"{self._name}, check out your inventory:\n", result)
+            index = console.read("\nIf you want to put something on - choose index. Else type 'n': ", "equip")
             if index.isdigit():
                 try:
-                    self._armory.set_item(list_of_items_to_use[int(index) - 1])
+                    self.put_on(list_of_items_to_use[int(index) - 1])
                 except IndexError:
-                    print("Incorrect index.")
+                    console.write("Incorrect index.")
                     continue
-                self.__count_attack_put_on(list_of_items_to_use[int(index) - 1])
             else:
                 return
 
@@ -170,15 +304,14 @@ class Character:
         while True:
             list_of_items_on = [item for item in self._armory.list_items.values() if item]
             result = "\n".join([f"{index + 1}. {item}" for index, item in enumerate(list_of_items_on)])
-            print(f"{self._name}, check out your armory:\n", result)
-            index = input("\nIf you want to take something off - choose index. Else type 'n': ")
+            console.write(f"{self._name}, check out your armory:\n", result)
+            index = console.read("\nIf you want to take something off - choose index. Else type 'n': ", "unequip")
             if index.isdigit():
                 try:
-                    self._armory.take_off_item(list_of_items_on[int(index) - 1])
+                    self.take_off(list_of_items_on[int(index) - 1])
                 except IndexError:
-                    print("Incorrect index.")
+                    console.write("Incorrect index.")
                     continue
-                self.__count_attack_take_off(list_of_items_on[int(index) - 1])
             else:
                 return
 
@@ -194,29 +327,30 @@ class Warrior(Character):
         __base_damage (int): Base damage capability of the Warrior.
         __base_shield (int): Base shield capacity of the Warrior.
         __base_health (int): Base health points of the Warrior.
-        __fatality_probability (float): Probability of causing a fatal strike.
+        _fatality_probability (float): Probability of causing a fatal strike.
         __fatality_damage (int): Additional damage points if a fatal strike occurs.
     """
+    __slots__ = ()
     _character_type = "warrior"
     __base_damage = 120
     __base_shield = 200
     __base_health = 1200
-    __fatality_probability = 1 if random.random() <= 0.1 else 0  # 10% probability
+    _fatality_probability = 0.1
     __fatality_damage = 400
 
     def __init__(self) -> None:
         """Initializes the Warrior with predefined base stats and fatality settings."""
 
         super().__init__()
-        self._health = Warrior.__base_health
-        self._damage = Warrior.__base_damage
-        self._shield = Warrior.__base_shield
-        self._fatal_prop = Warrior.__fatality_probability
+        self._base_health = Warrior.__base_health
+        self._base_damage = Warrior.__base_damage
+        self._base_shield = Warrior.__base_shield
+        self._fatal_prop = Warrior._fatality_probability
         self._fatal_damage = Warrior.__fatality_damage
 
     def __str__(self) -> str:
-        return (f"Warrior \nName: {self._name} \nLevel: {self._level} \nHealth: {self._health}"
-                f"\nShield: {self._shield} \nDamage: {self._damage} \nFatality: {self.__fatality_damage}"
+        return (f"Warrior \nName: {self._name} \nLevel: {self._level} \nHealth: {self.health}"
+                f"\nShield: {self.shield} \nDamage: {self.damage} \nFatality: {self.__fatality_damage}"
                 f"\nExperience: {self._experience}")
 
 
@@ -231,29 +365,30 @@ class Mage(Character):
         __base_damage (int): Base magic damage capability of the Mage.
         __base_shield (int): Base magic shield capacity of the Mage.
         __base_health (int): Base health points of the Mage.
-        __fatality_probability (float): Higher probability of magical fatality.
+        _fatality_probability (float): Higher probability of magical fatality.
         __fatality_damage (int): Magical damage points if a fatal strike occurs.
     """
+    __slots__ = ()
     _character_type = "mage"
     __base_damage = 130
     __base_shield = 150
     __base_health = 800
-    __fatality_probability = 1 if random.random() <= 0.15 else 0  # 15% probability
+    _fatality_probability = 0.15
     __fatality_damage = 250
 
     def __init__(self) -> None:
         """Initializes the Mage with specific magical attributes and fatality settings."""
 
         super().__init__()
-        self._health = Mage.__base_health
-        self._damage = Mage.__base_damage
-        self._shield = Mage.__base_shield
-        self._fatal_prop = Mage.__fatality_probability
+        self._base_health = Mage.__base_health
+        self._base_damage = Mage.__base_damage
+        self._base_shield = Mage.__base_shield
+        self._fatal_prop = Mage._fatality_probability
         self._fatal_damage = Mage.__fatality_damage
 
     def __str__(self) -> str:
-        return (f"Mage \nName: {self._name} \nLevel: {self._level} \nHealth: {self._health}"
-                f"\nShield: {self._shield} \nDamage: {self._damage} \nFatality: {self.__fatality_damage}"
+        return (f"Mage \nName: {self._name} \nLevel: {self._level} \nHealth: {self.health}"
+                f"\nShield: {self.shield} \nDamage: {self.damage} \nFatality: {self.__fatality_damage}"
                 f"\nExperience: {self._experience}")
 
 
@@ -268,29 +403,30 @@ class Rogue(Character):
         __base_damage (int): Base quick attack damage capability of the Rogue.
         __base_shield (int): Base agility-based shield capacity of the Rogue.
         __base_health (int): Base health points of the Rogue.
-        __fatality_probability (float): High probability of stealth-based fatality.
+        _fatality_probability (float): High probability of stealth-based fatality.
         __fatality_damage (int): Damage points if a stealth fatal strike occurs.
     """
+    __slots__ = ()
     _character_type = "rogue"
     __base_damage = 110
     __base_shield = 100
     __base_health = 1000
-    __fatality_probability = 1 if random.random() <= 0.2 else 0  # 20% probability
+    _fatality_probability = 0.2
     __fatality_damage = 200
 
     def __init__(self) -> None:
         """Initializes the Rogue with agility-based attributes and high stealth fatality settings."""
 
         super().__init__()
-        self._health = Rogue.__base_health
-        self._damage = Rogue.__base_damage
-        self._shield = Rogue.__base_shield
-        self._fatal_prop = Rogue.__fatality_probability
+        self._base_health = Rogue.__base_health
+        self._base_damage = Rogue.__base_damage
+        self._base_shield = Rogue.__base_shield
+        self._fatal_prop = Rogue._fatality_probability
         self._fatal_damage = Rogue.__fatality_damage
 
     def __str__(self) -> str:
-        return (f"Rogue \nName: {self._name} \nLevel: {self._level} \nHealth: {self._health}"
-                f"\nShield: {self._shield} \nDamage: {self._damage} \nFatality: {self.__fatality_damage}"
+        return (f"Rogue \nName: {self._name} \nLevel: {self._level} \nHealth: {self.health}"
+                f"\nShield: {self.shield} \nDamage: {self.damage} \nFatality: {self.__fatality_damage}"
                 f"\nExperience: {self._experience}")
 
 
@@ -305,29 +441,30 @@ class Paladin(Character):
             __base_damage (int): Base damage capability of the Paladin.
             __base_shield (int): Base shield capacity of the Paladin.
             __base_health (int): Base health points of the Paladin.
-            __fatality_probability (float): Moderate probability of causing a divine strike.
+            _fatality_probability (float): Moderate probability of causing a divine strike.
             __fatality_damage (int): Divine damage points if a fatal strike occurs.
         """
+    __slots__ = ()
     _character_type = "paladin"
     __base_damage = 115
     __base_shield = 180
     __base_health = 1100
-    __fatality_probability = 1 if random.random() <= 0.12 else 0  # 12% probability
+    _fatality_probability = 0.12
     __fatality_damage = 350
 
     def __init__(self) -> None:
         """Initializes the Paladin with divine attributes and balanced fatality settings."""
 
         super().__init__()
-        self._health = Paladin.__base_health
-        self._damage = Paladin.__base_damage
-        self._shield = Paladin.__base_shield
-        self._fatal_prop = Paladin.__fatality_probability
+        self._base_health = Paladin.__base_health
+        self._base_damage = Paladin.__base_damage
+        self._base_shield = Paladin.__base_shield
+        self._fatal_prop = Paladin._fatality_probability
         self._fatal_damage = Paladin.__fatality_damage
 
     def __str__(self) -> str:
-        return (f"Paladin \nName: {self._name} \nLevel: {self._level} \nHealth: {self._health}"
-                f"\nShield: {self._shield} \nDamage: {self._damage} \nFatality: {self.__fatality_damage}"
+        return (f"Paladin \nName: {self._name} \nLevel: {self._level} \nHealth: {self.health}"
+                f"\nShield: {self.shield} \nDamage: {self.damage} \nFatality: {self.__fatality_damage}"
                 f"\nExperience: {self._experience}")
 
 
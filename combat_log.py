@@ -0,0 +1,288 @@
+"""
+Append-only binary log of combat events, and a streaming reader for it.
+
+The file starts with the magic bytes and is followed by fixed-width records of RECORD.size bytes:
+
+    kind (u8), flag (u8), reserved (u16), game (u32), actor (u32), target (u32), value_1 (f64), value_2 (f64)
+
+    SESSION     a writer opened the file; name ids and game numbers start over
+    NAME        actor is a new name id, target the length of the UTF-8 name in the records that follow
+    STRIKE      actor strikes target: value_1 absorbed by the shield, value_2 health lost, flag 1 if fatal
+    OUTCOME     actor beat target after value_1 strikes; flag 1 for a draw, both fell
+    EXPERIENCE  actor has value_1 experience and level value_2
+    DROP        actor picked up the item named target
+
+Names are written once per session and referred to by id, so a strike costs 32 bytes. The reader maps the file
+and unpacks it record by record, so replaying or aggregating a log of any size takes constant memory; a record
+cut short by a crash at the end of the file is ignored, and truncated away when the log is opened for writing.
+"""
+import mmap
+import os
+import struct
+import sys
+import weakref
+
+from typing import Iterator, NamedTuple
+
+from events import ExperienceChanged, FightOver, ItemDropped, Strike, TrainingOver
+
+MAGIC = b"RPGLOG01"
+RECORD = struct.Struct("<BBHIIIdd")
+SESSION, NAME, STRIKE, OUTCOME, EXPERIENCE, DROP = range(6)
+# The event types a CombatLog records when subscribed to the event bus.
+RECORDED_EVENTS: tuple[type, ...] = (Strike, FightOver, TrainingOver, ExperienceChanged, ItemDropped)
+# The same without Strike. Games step through a fight strike by strike while anyone listens for Strike events,
+# so subscribing to these keeps the closed-form resolution of fights.
+OUTCOME_EVENTS: tuple[type, ...] = (FightOver, TrainingOver, ExperienceChanged, ItemDropped)
+
+
+class Event(NamedTuple):
+    """
+    A combat event with its names resolved. See the module docstring for the meaning of the fields per kind.
+    """
+    kind: int
+    game: int
+    actor: str
+    target: None | str
+    flag: int
+    value_1: float
+    value_2: float
+
+
+def _complete_size(file) -> int:
+    """
+    Returns the size of a combat log's header and complete records, the header counted as padded even if the
+    file is shorter. A NAME record is complete only with all of its name.
+    """
+    size = os.fstat(file.fileno()).st_size
+    offset = RECORD.size
+    if size < 2 * RECORD.size:
+        return offset
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        while offset + RECORD.size <= size:
+            kind, _, _, _, _, target, _, _ = RECORD.unpack_from(mapped, offset)
+            following = offset + RECORD.size
+            if kind == NAME:
+                following += -(-target // RECORD.size) * RECORD.size
+            if following > size:
+                break
+            offset = following
+    return offset
+
+
+class CombatLog:
+    """
+    Appends combat events to a log file.
+
+    The log is an event subscriber: events.subscribed(log, *RECORDED_EVENTS) records every game played in the
+    meantime, each with its own game number. Records can also be written directly with strike(), outcome() and so on.
+
+    Records are buffered and written when the buffer fills up, on flush() and on close(). Use the log as a context
+    manager to close it.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16) -> None:
+        """
+        Opens or creates the log. An existing log is cut back to its last complete record, so a record torn by a
+        crash does not shift the records appended after it.
+
+        Args:
+            path (str): Path to the log file.
+            buffer_size (int): Bytes buffered before they are written.
+
+        Raises:
+            ValueError: If the file exists and is not a combat log.
+        """
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'r+b') as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a combat log.")
+                file.truncate(_complete_size(file))
+            self._file = open(path, 'ab')
+            self._buffer = bytearray()
+        else:
+            self._file = open(path, 'ab')
+            self._buffer = bytearray(MAGIC.ljust(RECORD.size, b"\0"))
+        self._buffer_size = buffer_size
+        self._names: dict[str, int] = {}
+        self._games = 0
+        self._game_numbers = weakref.WeakKeyDictionary()
+        self._buffer += RECORD.pack(SESSION, 0, 0, 0, 0, 0, 0.0, 0.0)
+
+    def __enter__(self) -> "CombatLog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _append(self, kind: int, flag: int, game: int, actor: int, target: int, value_1: float,
+                value_2: float) -> None:
+        self._buffer += RECORD.pack(kind, flag, 0, game, actor, target, value_1, value_2)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def __call__(self, event: tuple) -> None:
+        """Records an event from the event bus. Events of other types than RECORDED_EVENTS are ignored."""
+        kind = type(event)
+        if kind not in RECORDED_EVENTS:
+            return
+        number = self._game_numbers.get(event.game)
+        if number is None:
+            number = self._game_numbers[event.game] = self.new_game()
+        if kind is Strike:
+            self.strike(number, event.attacker, event.defender, event.absorbed, event.health_lost, event.fatal)
+        elif kind is FightOver:
+            self.outcome(number, event.winner.name, event.loser.name, event.rounds, event.draw)
+        elif kind is TrainingOver:
+            if event.won or event.draw:
+                self.outcome(number, event.character.name, "bot", 0, event.draw)
+            else:
+                self.outcome(number, "bot", event.character.name, 0)
+        elif kind is ExperienceChanged:
+            self.experience(number, event.character.name, event.experience, event.level)
+        elif kind is ItemDropped:
+            self.drop(number, event.character.name, event.item.item_name)
+
+    def name_id(self, name: str) -> int:
+        """Returns the id of a name, writing a NAME record the first time the session sees it."""
+        number = self._names.get(name)
+        if number is None:
+            number = self._names[name] = len(self._names)
+            encoded = name.encode()
+            padding = -len(encoded) % RECORD.size
+            self._buffer += RECORD.pack(NAME, 0, 0, 0, number, len(encoded), 0.0, 0.0)
+            self._buffer += encoded + b"\0" * padding
+        return number
+
+    def new_game(self) -> int:
+        """Returns the number of the next game of this session."""
+        self._games += 1
+        return self._games
+
+    def strike(self, game: int, attacker: str, defender: str, absorbed: float, health_lost: float,
+               fatal: bool) -> None:
+        """Records a strike: how much of it the shield absorbed, how much health it took, and if it was fatal."""
+        self._append(STRIKE, fatal, game, self.name_id(attacker), self.name_id(defender), absorbed, health_lost)
+
+    def outcome(self, game: int, winner: str, loser: str, rounds: int, draw: bool = False) -> None:
+        """Records the end of a fight. In a draw, winner and loser are simply the two fighters."""
+        self._append(OUTCOME, draw, game, self.name_id(winner), self.name_id(loser), rounds, 0.0)
+
+    def experience(self, game: int, character: str, experience: float, level: int) -> None:
+        """Records a character's experience and level after they changed."""
+        self._append(EXPERIENCE, 0, game, self.name_id(character), 0, experience, level)
+
+    def drop(self, game: int, character: str, item: str) -> None:
+        """Records an item picked up by a character."""
+        self._append(DROP, 0, game, self.name_id(character), self.name_id(item), 0.0, 0.0)
+
+    def flush(self) -> None:
+        """Writes the buffered records to the file."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer.clear()
+
+    def close(self) -> None:
+        """Writes the buffered records and closes the file."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def read_events(path: str, kinds=None) -> Iterator[Event]:
+    """
+    Replays a combat log without loading it into memory.
+
+    Args:
+        path (str): Path to the log file.
+        kinds (Iterable[int]): Kinds of events to yield, e.g. {STRIKE}; every kind but SESSION and NAME by default.
+
+    Yields:
+        Event: The events in the order they were written.
+
+    Raises:
+        ValueError: If the file is not a combat log.
+    """
+    wanted = frozenset((STRIKE, OUTCOME, EXPERIENCE, DROP) if kinds is None else kinds)
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < RECORD.size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a combat log.")
+            records = (len(mapped) - RECORD.size) // RECORD.size
+            view = memoryview(mapped)[RECORD.size:RECORD.size * (records + 1)]
+            try:
+                names: list[str] = []
+                skip = 0
+                for index, (kind, flag, _, game, actor, target, value_1, value_2) in enumerate(
+                        RECORD.iter_unpack(view)):
+                    if skip:
+                        skip -= 1
+                        continue
+                    if kind == NAME:
+                        start = RECORD.size * (index + 1)
+                        if start + target > len(view):
+                            break
+                        names.append(bytes(view[start:start + target]).decode())
+                        skip = -(-target // RECORD.size)
+                        continue
+                    if kind == SESSION:
+                        names = []
+                        continue
+                    if kind in wanted:
+                        yield Event(kind, game, names[actor], names[target] if kind in (STRIKE, OUTCOME, DROP)
+                                    else None, flag, value_1, value_2)
+            finally:
+                view.release()
+
+
+def aggregate(path: str) -> dict[str, dict[str, float]]:
+    """
+    Adds up a combat log per fighter.
+
+    Args:
+        path (str): Path to the log file.
+
+    Returns:
+        dict[str, dict[str, float]]: By name: strikes, fatal strikes, damage dealt and taken (shield and health
+        together), shield absorbed, wins, losses, draws, drops, and the last experience and level seen.
+    """
+    totals: dict[str, dict[str, float]] = {}
+
+    def fighter(name: str) -> dict[str, float]:
+        entry = totals.get(name)
+        if entry is None:
+            entry = totals[name] = dict.fromkeys(("strikes", "fatal_strikes", "damage_dealt", "damage_taken",
+                                                  "shield_absorbed", "wins", "losses", "draws", "drops",
+                                                  "experience", "level"), 0)
+        return entry
+
+    for kind, _, actor, target, flag, value_1, value_2 in read_events(path):
+        if kind == STRIKE:
+            attacker, defender = fighter(actor), fighter(target)
+            attacker["strikes"] += 1
+            attacker["fatal_strikes"] += flag
+            attacker["damage_dealt"] += value_1 + value_2
+            defender["damage_taken"] += value_1 + value_2
+            defender["shield_absorbed"] += value_1
+        elif kind == OUTCOME:
+            if flag:
+                fighter(actor)["draws"] += 1
+                fighter(target)["draws"] += 1
+            else:
+                fighter(actor)["wins"] += 1
+                fighter(target)["losses"] += 1
+        elif kind == EXPERIENCE:
+            entry = fighter(actor)
+            entry["experience"], entry["level"] = value_1, int(value_2)
+        elif kind == DROP:
+            fighter(actor)["drops"] += 1
+    return totals
+
+
+if __name__ == "__main__":
+    for name, values in sorted(aggregate(sys.argv[1] if len(sys.argv) > 1 else "combat.log").items()):
+        print(name, " ".join(f"{key}={value:g}" for key, value in values.items()))
@@ -0,0 +1,115 @@
+"""
+The game's console: every prompt and every message of the game goes through read() and write().
+
+By default they are input() and print(). redirect() swaps in another input source and output sink, so the same
+code paths can run without a terminal, e.g. from headless.py:
+
+    with console.redirect(ScriptedInput({"name": ["Ann", "Bob"]}), NullOutput()):
+        main.play_round()
+
+Every prompt carries a key naming what is asked ('name', 'class', 'equip', 'unequip', 'train', 'continue',
+'again'), so a scripted input source can answer by meaning instead of by prompt text.
+"""
+import contextlib
+
+from typing import Callable
+
+_reader: None | Callable[[str, str], str] = None
+_writer: None | Callable[..., None] = None
+
+
+def read(prompt: str = "", key: str = "") -> str:
+    """
+    Asks the player for a line of input.
+
+    Args:
+        prompt (str): The text shown to the player.
+        key (str): What is asked, for scripted input sources.
+
+    Returns:
+        str: The answer, without the trailing newline.
+
+    Raises:
+        EOFError: If the input source has no more answers.
+    """
+    if _reader is None:
+        return input(prompt)
+    return _reader(prompt, key)
+
+
+def write(*values, sep: str = " ", end: str = "\n") -> None:
+    """Shows a message, with the arguments of print()."""
+    if _writer is None:
+        print(*values, sep=sep, end=end)
+    else:
+        _writer(*values, sep=sep, end=end)
+
+
+@contextlib.contextmanager
+def redirect(reader: None | Callable[[str, str], str] = None, writer: None | Callable[..., None] = None):
+    """
+    Reads from and writes to other places for the duration of a with block.
+
+    Args:
+        reader (None | Callable): Called with (prompt, key) instead of input(); None keeps the current reader.
+        writer (None | Callable): Called with print()'s arguments instead of print(); None keeps the current one.
+    """
+    global _reader, _writer
+    saved = _reader, _writer
+    if reader is not None:
+        _reader = reader
+    if writer is not None:
+        _writer = writer
+    try:
+        yield
+    finally:
+        _reader, _writer = saved
+
+
+class ScriptedInput:
+    """
+    Answers prompts from per-key queues of scripted answers.
+
+    Attributes:
+        answers (dict[str, list[str]]): Remaining answers by prompt key, in the order they are given.
+    """
+
+    def __init__(self, answers: dict[str, list[str]]) -> None:
+        self.answers = {key: list(reversed(values)) for key, values in answers.items()}
+
+    def __call__(self, prompt: str, key: str) -> str:
+        queue = self.answers.get(key)
+        if not queue:
+            raise EOFError(f"No scripted answer left for {key!r}: {prompt.strip()}")
+        return queue.pop()
+
+
+class NullOutput:
+    """Discards everything written."""
+
+    def __call__(self, *values, sep: str = " ", end: str = "\n") -> None:
+        pass
+
+
+class BufferedOutput:
+    """
+    Keeps everything written, to be read back with text().
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+
+    def __call__(self, *values, sep: str = " ", end: str = "\n") -> None:
+        self._parts.append(sep.join(map(str, values)) + end)
+
+    def text(self) -> str:
+        """Returns everything written so far."""
+        return "".join(self._parts)
+
+    def clear(self) -> None:
+        """Forgets everything written so far."""
+        self._parts.clear()
+
+
+if __name__ == "__main__":
+    ...
@@ -0,0 +1,257 @@
+"""
+Event bus between the game logic and whatever shows or records what happens.
+
+Game code builds an event only if someone listens for its type:
+
+    if bus.listening(FightOver):
+        bus.emit(FightOver(game, winner, loser, rounds, False))
+
+so with nobody listening neither the event nor any message text is built. Subscribers are callables taking an
+event. The module subscribes console_renderer, which prints what the game always printed, to the global bus;
+unsubscribe it (or use unsubscribed()) to play silently. Other subscribers here are NullSink, EventWriter (a
+buffered JSON lines file) and EventCounter; combat_log.CombatLog is one too.
+"""
+import collections
+import contextlib
+import json
+
+from typing import Any, Callable, NamedTuple
+
+import console
+
+
+class Strike(NamedTuple):
+    """One strike: how much of it the defender's shield absorbed and how much health it took."""
+    game: Any
+    attacker: str
+    defender: str
+    absorbed: float
+    health_lost: float
+    fatal: bool
+
+
+class FightOver(NamedTuple):
+    """The end of a duel. In a draw both fell, and winner and loser are simply the two characters."""
+    game: Any
+    winner: Any
+    loser: Any
+    rounds: int
+    draw: bool
+
+
+class TrainingOver(NamedTuple):
+    """The end of a forest fight. In a draw both the character and the bot fell."""
+    game: Any
+    character: Any
+    won: bool
+    draw: bool
+
+
+class ExperienceChanged(NamedTuple):
+    """A character's experience and level after a fight."""
+    game: Any
+    character: Any
+    experience: float
+    level: int
+
+
+class ItemDropped(NamedTuple):
+    """An item a defeated bot dropped and the character picked up."""
+    game: Any
+    character: Any
+    item: Any
+
+
+class ItemRefused(NamedTuple):
+    """An item the armory refused to equip, with the reason."""
+    armory: Any
+    item: Any
+    reason: str
+
+
+EVENT_TYPES: tuple[type, ...] = (Strike, FightOver, TrainingOver, ExperienceChanged, ItemDropped, ItemRefused)
+
+
+class EventBus:
+    """
+    Delivers events to the subscribers of their type, in the order they subscribed.
+    """
+
+    def __init__(self) -> None:
+        # Only types with at least one subscriber are keys, so listening() is a single lookup.
+        self._subscribers: dict[type, tuple[Callable, ...]] = {}
+
+    def subscribe(self, subscriber: Callable, *kinds: type) -> None:
+        """
+        Sends events of the given types to a subscriber.
+
+        Args:
+            subscriber (Callable): Called with every event.
+            *kinds (type): Event types, all of EVENT_TYPES if none are given.
+        """
+        for kind in kinds or EVENT_TYPES:
+            subscribers = self._subscribers.get(kind, ())
+            if subscriber not in subscribers:
+                self._subscribers[kind] = subscribers + (subscriber,)
+
+    def unsubscribe(self, subscriber: Callable) -> None:
+        """Stops sending events to a subscriber."""
+        for kind, subscribers in list(self._subscribers.items()):
+            remaining = tuple(other for other in subscribers if other is not subscriber)
+            if remaining:
+                self._subscribers[kind] = remaining
+            else:
+                del self._subscribers[kind]
+
+    def subscriptions(self, subscriber: Callable) -> tuple[type, ...]:
+        """Returns the event types a subscriber gets."""
+        return tuple(kind for kind, subscribers in self._subscribers.items() if subscriber in subscribers)
+
+    def listening(self, kind: type) -> bool:
+        """Returns True if anyone subscribed to events of this type."""
+        return kind in self._subscribers
+
+    def emit(self, event: tuple) -> None:
+        """Delivers an event to the subscribers of its type."""
+        for subscriber in self._subscribers.get(type(event), ()):
+            subscriber(event)
+
+
+class ConsoleRenderer:
+    """
+    Prints the messages the game shows the players, through console.write().
+    """
+
+    def __call__(self, event: tuple) -> None:
+        kind = type(event)
+        if kind is FightOver:
+            if event.draw:
+                console.write("\nBoth characters lost.\n")
+            else:
+                console.write(f"\nThe winner: \n{event.winner}")
+        elif kind is TrainingOver:
+            if event.won:
+                console.write(f"Congrats! You kicked bot's ass!")
+            elif event.draw:
+                console.write("Both characters lost.")
+            else:
+                console.write("You lost to the bot. Loser.")
+        elif kind is ItemDropped:
+            console.write(f"You picked up a new item: \n{event.item}.")
+        elif kind is ItemRefused:
+            console.write(event.reason)
+
+
+class NullSink:
+    """Accepts events and does nothing with them."""
+
+    def __call__(self, event: tuple) -> None:
+        pass
+
+
+class EventCounter:
+    """
+    Counts events by type name.
+
+    Attributes:
+        counts (collections.Counter): Number of events by type name.
+    """
+
+    def __init__(self) -> None:
+        self.counts = collections.Counter()
+
+    def __call__(self, event: tuple) -> None:
+        self.counts[type(event).__name__] += 1
+
+
+def _plain(value):
+    """Turns an event field into something JSON can hold: characters by name, items by item name."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, "item_name"):
+        return value.item_name
+    if hasattr(value, "name"):
+        return value.name
+    return None
+
+
+class EventWriter:
+    """
+    Writes events as JSON lines, {"event": type name, field: value, ...}, buffering them in memory.
+
+    Games and armories are left out; characters are written by name and items by item name.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16) -> None:
+        """
+        Args:
+            path (str): File the events are appended to.
+            buffer_size (int): Characters buffered before they are written.
+        """
+        self._file = open(path, 'a')
+        self._buffer: list[str] = []
+        self._buffered = 0
+        self._buffer_size = buffer_size
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __call__(self, event: tuple) -> None:
+        fields = {"event": type(event).__name__}
+        for field, value in zip(event._fields, event):
+            if field not in ("game", "armory"):
+                fields[field] = _plain(value)
+        line = json.dumps(fields) + "\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered events."""
+        self._file.write("".join(self._buffer))
+        self._file.flush()
+        self._buffer.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        """Writes the buffered events and closes the file."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+@contextlib.contextmanager
+def subscribed(subscriber: Callable, *kinds: type, event_bus: None | EventBus = None):
+    """Subscribes to the bus for the duration of a with block, see EventBus.subscribe()."""
+    event_bus = bus if event_bus is None else event_bus
+    event_bus.subscribe(subscriber, *kinds)
+    try:
+        yield subscriber
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+
+@contextlib.contextmanager
+def unsubscribed(subscriber: Callable, event_bus: None | EventBus = None):
+    """Takes a subscriber off the bus for the duration of a with block, e.g. console_renderer to play silently."""
+    event_bus = bus if event_bus is None else event_bus
+    kinds = event_bus.subscriptions(subscriber)
+    event_bus.unsubscribe(subscriber)
+    try:
+        yield
+    finally:
+        if kinds:
+            event_bus.subscribe(subscriber, *kinds)
+
+
+bus = EventBus()
+console_renderer = ConsoleRenderer()
+bus.subscribe(console_renderer, FightOver, TrainingOver, ItemDropped, ItemRefused)
+
+
+if __name__ == "__main__":
+    ...
@@ -1,5 +1,163 @@
+import math
+
 from character import Character
 from bots import Bot
+from events import bus, ExperienceChanged, FightOver, ItemDropped, Strike, TrainingOver
+from rng import FatalSchedule, Stream, new_seed
+
+# (attacker type, defender type) pairs where the attacker's damage gets the type boost.
+TYPE_ADVANTAGE: frozenset[tuple[str, str]] = frozenset({
+    ("warrior", "mage"),
+    ("mage", "rogue"),
+    ("rogue", "paladin"),
+    ("paladin", "warrior"),
+})
+
+
+def rounds_to_kill(health: float, shield: float, damage: float) -> float:
+    """
+    Counts the strikes of constant damage needed to bring health to zero, the shield absorbing first.
+
+    Args:
+        health (float): Health of the defender.
+        shield (float): Shield of the defender.
+        damage (float): Damage of every strike.
+
+    Returns:
+        float: The number of strikes, or math.inf if the strikes deal no damage.
+    """
+    if damage <= 0:
+        return math.inf
+    estimate = max(1, math.ceil((health + shield) / damage))
+    # Correct the float division so the count agrees with health_shield_after(). With large stats the estimate
+    # can be off by far more than one strike, so search outwards in doubling steps, then bisect.
+    if health_shield_after(health, shield, damage, estimate)[0] <= 0:
+        low, high, step = estimate - 1, estimate, 1
+        while low >= 1 and health_shield_after(health, shield, damage, low)[0] <= 0:
+            high, step = low, step * 2
+            low = high - step
+        low = max(low, 0)
+    else:
+        low, high, step = estimate, estimate + 1, 1
+        while health_shield_after(health, shield, damage, high)[0] > 0:
+            low, step = high, step * 2
+            high = low + step
+    while high - low > 1:
+        middle = (low + high) // 2
+        if health_shield_after(health, shield, damage, middle)[0] <= 0:
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def health_shield_after(health: float, shield: float, damage: float, rounds: int) -> tuple[float, float]:
+    """
+    Computes health and shield after a number of strikes of constant damage.
+
+    Args:
+        health (float): Health of the defender.
+        shield (float): Shield of the defender.
+        damage (float): Damage of every strike.
+        rounds (int): Number of strikes taken.
+
+    Returns:
+        tuple[float, float]: Health and shield left.
+    """
+    total = damage * rounds
+    if total < shield:
+        return health, shield - total
+    return health - (total - shield), 0
+
+
+# For fighters without fatal strikes, e.g. bots.
+NO_FATALITY = FatalSchedule(Stream(0, "no fatality"), 0.0)
+
+
+def resolve_strikes(side_1: tuple, side_2: tuple, rounds: int = 0) -> tuple[int, tuple, tuple]:
+    """
+    Exchanges simultaneous strikes until one side's health drops to zero, skipping over the regular strikes.
+
+    Between two fatal strikes every strike deals the same damage, so those stretches are settled with
+    rounds_to_kill() and health_shield_after(); only the fatal strikes themselves are applied one by one.
+
+    Args:
+        side_1 (tuple): (health, shield, damage, fatal damage, FatalSchedule) of the first side.
+        side_2 (tuple): The same for the second side.
+        rounds (int): Strikes already exchanged, so that the schedules continue where they are.
+
+    Returns:
+        tuple[int, tuple, tuple]: The number of strikes exchanged in total, and (health, shield) of both sides.
+
+    Raises:
+        ValueError: If neither side can deal damage, so the fight would never end.
+    """
+    health_1, shield_1, damage_1, fatal_damage_1, schedule_1 = side_1
+    health_2, shield_2, damage_2, fatal_damage_2, schedule_2 = side_2
+    while True:
+        next_fatal = min(schedule_1.next_after(rounds), schedule_2.next_after(rounds))
+        regular = min(rounds_to_kill(health_1, shield_1, damage_2), rounds_to_kill(health_2, shield_2, damage_1))
+        if regular < next_fatal - rounds:
+            health_1, shield_1 = health_shield_after(health_1, shield_1, damage_2, regular)
+            health_2, shield_2 = health_shield_after(health_2, shield_2, damage_1, regular)
+            return rounds + regular, (health_1, shield_1), (health_2, shield_2)
+        if next_fatal == math.inf:
+            raise ValueError("Neither side can deal damage.")
+
+        if next_fatal - rounds > 1:
+            health_1, shield_1 = health_shield_after(health_1, shield_1, damage_2, next_fatal - rounds - 1)
+            health_2, shield_2 = health_shield_after(health_2, shield_2, damage_1, next_fatal - rounds - 1)
+        rounds = next_fatal
+        strike_1 = damage_1 + fatal_damage_1 if schedule_1.is_fatal(rounds) else damage_1
+        strike_2 = damage_2 + fatal_damage_2 if schedule_2.is_fatal(rounds) else damage_2
+        health_1, shield_1 = health_shield_after(health_1, shield_1, strike_2, 1)
+        health_2, shield_2 = health_shield_after(health_2, shield_2, strike_1, 1)
+        if health_1 <= 0 or health_2 <= 0:
+            return rounds, (health_1, shield_1), (health_2, shield_2)
+
+
+class TrainingReport:
+    """
+    Totals of a batch of forest training fights.
+
+    Attributes:
+        fights (int): Number of bots fought.
+        wins (int): Bots defeated.
+        losses (int): Fights lost to a bot.
+        draws (int): Fights where both the character and the bot fell.
+        levels_gained (int): Levels the character gained during the batch.
+        drops (list[Items]): Items picked up from defeated bots.
+    """
+    def __init__(self) -> None:
+        self.fights = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.levels_gained = 0
+        self.drops = []
+
+    def __str__(self) -> str:
+        return (f"Fights: {self.fights} \nWins: {self.wins} \nLosses: {self.losses} \nDraws: {self.draws}"
+                f"\nLevels gained: {self.levels_gained} \nItems picked up: {len(self.drops)}")
+
+
+class FightResult:
+    """
+    The result returned by Game.check_winner(). Its text, which shows the winner's stats, is only built when it
+    is asked for.
+
+    Attributes:
+        winner (None | Character): The winner, None if both characters lost.
+    """
+    __slots__ = ("winner",)
+
+    def __init__(self, winner: None | Character) -> None:
+        self.winner = winner
+
+    def __str__(self) -> str:
+        if self.winner is None:
+            return "Both characters lost."
+        return f"The winner: \n{self.winner}"
 
 
 class Game:
@@ -9,63 +167,74 @@ class Game:
     Attributes:
         character_1 (Character): The first character in the game.
         character_2 (Character): The second character in the game.
+        rounds (int): Number of strikes exchanged so far.
+        winner (None | Character): The winner found by check_winner(), None before that or after a draw.
+        seed (int): Root seed of the game's random streams.
+        match_id (int | str): Identifies the game among the games played with the same seed.
     """
-    def __init__(self, character_1: Character, character_2: Character) -> None:
+    def __init__(self, character_1: Character, character_2: Character, seed: None | int = None,
+                 match_id: int | str = 0) -> None:
         """
-        Initializes the game with two characters and sets up initial health, shield, and damage.
+        Initializes the game with two characters.
+
+        All random rolls of the game come from streams named by seed and match_id, so the same seed, match id
+        and characters give the same fight in any process.
 
         Args:
             character_1 (Character): The first player's character.
             character_2 (Character): The second player's character.
+            seed (None | int): Root seed, a fresh one if None.
+            match_id (int | str): Identifies the game among the games played with the same seed.
         """
         self.character_1 = character_1
         self.character_2 = character_2
-        self.__char_1_health = None
-        self.__char_2_health = None
-        self.__char_1_shield = None
-        self.__char_2_shield = None
-        self.__char_1_damage = None
-        self.__char_2_damage = None
+        self.rounds = 0
+        self.winner: None | Character = None
+        self.seed = new_seed() if seed is None else seed
+        self.match_id = match_id
+        self._fatal_1 = FatalSchedule(Stream(self.seed, match_id, "fatal", 1), character_1.fatal_prop)
+        self._fatal_2 = FatalSchedule(Stream(self.seed, match_id, "fatal", 2), character_2.fatal_prop)
+        self._forest = Stream(self.seed, match_id, "forest")
+        self._drops = Stream(self.seed, match_id, "drop")
 
-    def save_health_shield_damage(self) -> None:
-        """
-        Saves the current health, shield, and damage states of both characters.
-        """
-        self.__char_1_health = self.character_1.health
-        self.__char_1_shield = self.character_1.shield
-        self.__char_1_damage = self.character_1.damage
+    def _emit_strike(self, attacker: str, defender: str, shield: float, damage: float, fatal: bool) -> None:
+        """Emits a strike before it is applied, split into the part the defender's shield absorbs and the rest."""
+        if damage < shield:
+            bus.emit(Strike(self, attacker, defender, damage, 0.0, fatal))
+        else:
+            bus.emit(Strike(self, attacker, defender, shield, damage - shield, fatal))
 
-        self.__char_2_health = self.character_2.health
-        self.__char_2_shield = self.character_2.shield
-        self.__char_2_damage = self.character_2.damage
+    def _emit_experience(self, *characters: Character) -> None:
+        if bus.listening(ExperienceChanged):
+            for character in characters:
+                bus.emit(ExperienceChanged(self, character, character.experience, character.level))
 
     def restore_health_shield(self) -> None:
         """
-        Restores the health, shield, and damage states of both characters to the last saved state.
+        Ends the fight for both characters: their health and shield go back to full and the type boost is removed.
         """
-        self.character_1.health = self.__char_1_health
-        self.character_1.shield = self.__char_1_shield
-        self.character_1.damage = self.__char_1_damage
-
-        self.character_2.damage = self.__char_2_damage
-        self.character_2.health = self.__char_2_health
-        self.character_2.shield = self.__char_2_shield
+        self.character_1.restore()
+        self.character_2.restore()
 
-    @staticmethod
-    def forest_training(character: Character, bot: Bot) -> None:
+    def forest_training(self, character: Character, bot: Bot) -> None:
         """
         Simulates a training session in a forest scenario where a character fights a bot.
 
+        The bot is not scaled here: it should come scaled to the character's level, see BotFactory.acquire().
+
         Args:
             character (Character): The player's character.
             bot (Character): The bot character used for training.
         """
         char_strike_damage = character.strike
-        bot.boost_bot(character.level)
         bot_strike_damage = bot.attack
 
-        if character.fatal_prop:
+        fatal = self._forest.chance(character.fatal_prop)
+        if fatal:
             char_strike_damage += character.fatal_damage
+        if bus.listening(Strike):
+            self._emit_strike("bot", character.name, character.shield, bot_strike_damage, False)
+            self._emit_strike(character.name, "bot", 0, char_strike_damage, fatal)
 
         if bot_strike_damage < character.shield:
             character.reduce_shield(bot_strike_damage)
@@ -76,8 +245,7 @@ class Game:
 
         bot.reduce_health(char_strike_damage)
 
-    @staticmethod
-    def forest_train_winner(character: Character, bot: Bot) -> None | str:
+    def forest_train_winner(self, character: Character, bot: Bot) -> None | str:
         """
         Determines the winner of a forest training session and updates experience and inventory accordingly.
 
@@ -92,20 +260,117 @@ class Game:
             character.experience_add(bot.level)
             character.level_up()
 
-            prize = bot.drop_item()
+            prize = bot.drop_item(self._drops)
             if prize:
                 character.inventory.add_item(prize)
-            print(f"Congrats! You kicked bot's ass!")
+                if bus.listening(ItemDropped):
+                    bus.emit(ItemDropped(self, character, prize))
+            if bus.listening(TrainingOver):
+                bus.emit(TrainingOver(self, character, True, False))
+            self._emit_experience(character)
             return f"Congrats! You kicked bot's ass!"
         elif character.health <= 0 < bot.health:
             character.experience_drop()
-            print("You lost to the bot. Loser.")
+            if bus.listening(TrainingOver):
+                bus.emit(TrainingOver(self, character, False, False))
+            self._emit_experience(character)
             return "You lost to the bot. Loser."
         elif character.health <= 0 >= bot.health:
             character.experience_drop()
-            print("Both characters lost.")
+            if bus.listening(TrainingOver):
+                bus.emit(TrainingOver(self, character, False, True))
+            self._emit_experience(character)
             return "Both characters lost."
 
+    @classmethod
+    def train_in_forest(cls, character: Character, bots: int, seed: None | int = None) -> TrainingReport:
+        """
+        Fights the character against a number of bots in one call, without printing.
+
+        Every bot is scaled once to the character's level at the start of its fight, and every bot fight starts
+        fresh from the character's health and shield at the start of the batch. This differs from
+        main.forest_training(), where the damage taken from one bot carries over to the next and the character is
+        only restored after all the training. Experience goes through experience_add()/level_up(), and drops are
+        added to the character's inventory. The batch ends with an ExperienceChanged event whose game is the report.
+
+        Fight k rolls its fatal strikes from Stream(seed, "train", k, "fatal") and all drops come from
+        Stream(seed, "train", "drop"). When the character wins without any fatal strike, or loses even if every
+        strike is fatal, the fight is settled without rolling.
+
+        Args:
+            character (Character): The player's character.
+            bots (int): Number of bots to fight.
+            seed (None | int): Root seed of the batch, a fresh one if None.
+
+        Returns:
+            TrainingReport: Totals of the batch.
+        """
+        seed = new_seed() if seed is None else seed
+        drops = Stream(seed, "train", "drop")
+        report = TrainingReport()
+        start_level = character.level
+        health, shield, char_damage = character.health, character.shield, character.strike
+        fatal_prop, fatal_damage = character.fatal_prop, character.fatal_damage
+        outcome_level = None
+        sure_win = sure_loss = False
+
+        while report.fights < bots:
+            if character.level != outcome_level:
+                outcome_level = character.level
+                bot_health, bot_damage = Bot.scaled_stats(outcome_level)
+                char_rounds = rounds_to_kill(health, shield, bot_damage)
+                sure_win = rounds_to_kill(bot_health, 0, char_damage) < char_rounds
+                best_case = rounds_to_kill(bot_health, 0, char_damage + (fatal_damage if fatal_prop > 0 else 0))
+                sure_loss = char_rounds < best_case
+                if char_rounds == best_case == math.inf:
+                    raise ValueError("Neither the character nor the bot can deal damage.")
+
+            if sure_win:
+                won = True
+            elif sure_loss:
+                # A lost fight does not change the level, so every remaining fight ends the same way.
+                remaining = bots - report.fights
+                character.experience_drop()
+                report.fights = bots
+                report.losses += remaining
+                break
+            else:
+                schedule = FatalSchedule(Stream(seed, "train", report.fights, "fatal"), fatal_prop)
+                _, (char_health, _), (bot_left, _) = resolve_strikes(
+                    (health, shield, char_damage, fatal_damage, schedule), (bot_health, 0, bot_damage, 0, NO_FATALITY))
+                won = char_health > 0 >= bot_left
+                if not won:
+                    report.fights += 1
+                    character.experience_drop()
+                    if char_health <= 0 < bot_left:
+                        report.losses += 1
+                    else:
+                        report.draws += 1
+                    continue
+
+            report.fights += 1
+            report.wins += 1
+            character.experience_add("bot")
+            character.level_up()
+            prize = Bot.roll_drop(drops)
+            if prize:
+                character.inventory.add_item(prize)
+                report.drops.append(prize)
+
+        report.levels_gained = character.level - start_level
+        if bus.listening(ExperienceChanged):
+            bus.emit(ExperienceChanged(report, character, character.experience, character.level))
+        return report
+
+    @staticmethod
+    def has_type_advantage(type_1: None | str, type_2: None | str) -> bool:
+        """
+        Checks whether a character of type_1 gets its damage boosted against a character of type_2.
+
+        Warriors beat mages, mages beat rogues, rogues beat paladins and paladins beat warriors (see TYPE_ADVANTAGE).
+        """
+        return (type_1, type_2) in TYPE_ADVANTAGE
+
     def boost_char_damage(self) -> None:
         """
         Boosts _damage of the character based on the type advantage in matchups between character_1 and character_2.
@@ -113,65 +378,95 @@ class Game:
         char_1_type = self.character_1.type_char
         char_2_type = self.character_2.type_char
 
-        if char_1_type == "warrior" and char_2_type == "mage":
+        if self.has_type_advantage(char_1_type, char_2_type):
             self.character_1.type_boost_damage()
-        elif char_1_type == "mage" and char_2_type == "rogue":
-            self.character_1.type_boost_damage()
-        elif char_1_type == "rogue" and char_2_type == "paladin":
-            self.character_1.type_boost_damage()
-        elif char_1_type == "paladin" and char_2_type == "warrior":
-            self.character_1.type_boost_damage()
-
-        elif char_2_type == "warrior" and char_1_type == "mage":
-            self.character_2.type_boost_damage()
-        elif char_2_type == "mage" and char_1_type == "rogue":
-            self.character_2.type_boost_damage()
-        elif char_2_type == "rogue" and char_1_type == "paladin":
-            self.character_2.type_boost_damage()
-        elif char_2_type == "paladin" and char_1_type == "warrior":
+        elif self.has_type_advantage(char_2_type, char_1_type):
             self.character_2.type_boost_damage()
 
-    def check_winner(self) -> None | str:
+    def check_winner(self) -> None | FightResult:
         """
         Checks for a winner based on the health of the characters after a confrontation.
 
         Returns:
-            None | str: A message indicating the winner or if both characters lost.
+            None | FightResult: The result if the fight is over, whose text names the winner or says that both
+            characters lost.
         """
         if self.character_1.health > 0 >= self.character_2.health:
-            self.restore_health_shield()
-            self.character_1.experience_add(self.character_2.level)
-            self.character_1.level_up()
-            self.character_1.level_dependent_boost()
-            self.character_2.experience_drop()
-            print(f"\nThe winner: \n{self.character_1}")
-            return f"The winner: \n{self.character_1}"
+            winner, loser = self.character_1, self.character_2
         elif self.character_1.health <= 0 < self.character_2.health:
-            self.restore_health_shield()
-            self.character_2.experience_add(self.character_1.level)
-            self.character_2.level_up()
-            self.character_2.level_dependent_boost()
-            self.character_1.experience_drop()
-            print(f"\nThe winner: \n{self.character_2}")
-            return f"The winner: \n{self.character_2}"
+            winner, loser = self.character_2, self.character_1
         elif self.character_1.health <= 0 >= self.character_2.health:
             self.restore_health_shield()
             self.character_2.experience_drop()
             self.character_1.experience_drop()
-            print("\nBoth characters lost.\n")
-            return "Both characters lost."
+            if bus.listening(FightOver):
+                bus.emit(FightOver(self, self.character_1, self.character_2, self.rounds, True))
+            self._emit_experience(self.character_1, self.character_2)
+            return FightResult(None)
+        else:
+            return None
+
+        self.restore_health_shield()
+        winner.experience_add(loser.level)
+        winner.level_up()
+        winner.level_dependent_boost()
+        loser.experience_drop()
+        self.winner = winner
+        if bus.listening(FightOver):
+            bus.emit(FightOver(self, winner, loser, self.rounds, False))
+        self._emit_experience(self.character_1, self.character_2)
+        return FightResult(winner)
+
+    def resolve_fight(self) -> None | FightResult:
+        """
+        Fast alternative to looping take_a_strike() until check_winner() returns.
+
+        Regular strikes deal the same damage, so only the fatal strikes are played one by one and the strikes in
+        between are settled arithmetically (see resolve_strikes()). The fatal strikes are the same ones
+        take_a_strike() would roll. When someone listens for Strike events every strike has to be emitted, so the
+        fight is stepped through take_a_strike() instead.
+
+        Returns:
+            None | FightResult: The result of check_winner().
+
+        Raises:
+            ValueError: If neither character can deal damage, so the fight would never end.
+        """
+        if bus.listening(Strike):
+            if (self.character_1.strike <= 0 and self.character_2.strike <= 0
+                    and self._fatal_1.next_after(self.rounds) == self._fatal_2.next_after(self.rounds) == math.inf):
+                raise ValueError("Neither side can deal damage.")
+            while self.character_1.health > 0 and self.character_2.health > 0:
+                self.take_a_strike()
+            return self.check_winner()
+        self.rounds, (health_1, shield_1), (health_2, shield_2) = resolve_strikes(
+            (self.character_1.health, self.character_1.shield, self.character_1.strike,
+             self.character_1.fatal_damage, self._fatal_1),
+            (self.character_2.health, self.character_2.shield, self.character_2.strike,
+             self.character_2.fatal_damage, self._fatal_2),
+            self.rounds)
+        self.character_1.health, self.character_1.shield = health_1, shield_1
+        self.character_2.health, self.character_2.shield = health_2, shield_2
+        return self.check_winner()
 
     def take_a_strike(self) -> None:
         """
         Processes the damage exchange between character_1 and character_2 during a fight.
         """
+        self.rounds += 1
         char_1_strike_damage = self.character_1.strike
-        char_2_strike_damage = self.character_2.strike
-
-        if self.character_1.fatal_prop:
+        fatal_1 = self._fatal_1.is_fatal(self.rounds)
+        if fatal_1:
             char_1_strike_damage += self.character_1.fatal_damage
-        if self.character_2.fatal_prop:
+        char_2_strike_damage = self.character_2.strike
+        fatal_2 = self._fatal_2.is_fatal(self.rounds)
+        if fatal_2:
             char_2_strike_damage += self.character_2.fatal_damage
+        if bus.listening(Strike):
+            self._emit_strike(self.character_1.name, self.character_2.name, self.character_2.shield,
+                              char_1_strike_damage, fatal_1)
+            self._emit_strike(self.character_2.name, self.character_1.name, self.character_1.shield,
+                              char_2_strike_damage, fatal_2)
 
         if char_2_strike_damage < self.character_1.shield:
             self.character_1.reduce_shield(char_2_strike_damage)
@@ -0,0 +1,232 @@
+"""
+Non-interactive driver for main.play_round(), for soak testing and throughput measurements.
+
+Sessions come from a JSON lines file, one session per line:
+
+    {"players": [{"name": "Ann", "class": 1, "equip": [1, 2], "unequip": [], "bots": 3}, {"name": "Bob"}],
+     "seed": 7}
+
+Every session is one main.play_round(): 'class' (an index, as typed at the prompt) is used only if the player
+is new, 'equip' and 'unequip' are the indices typed at the inventory and armory prompts, and 'bots' is the
+number of forest bots fought. All fields but the names are optional. The answers go through console.read(), so
+the sessions run the same code as a player at the terminal. A script of raw answers, one per line, can be
+replayed through the loop of main.main() instead with --script.
+
+    python headless.py sessions.jsonl
+    python headless.py --generate 10000 --store soak.db
+    python headless.py --script answers.txt --output buffered
+
+One JSON result per session is written to stdout as soon as the session ends, and the throughput in sessions per
+second to stderr.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from typing import Iterable, Iterator
+
+import console
+import events
+import main
+
+from combat_log import CombatLog, RECORDED_EVENTS
+from console import BufferedOutput, NullOutput, ScriptedInput
+from rng import derive
+
+
+class SessionInput(ScriptedInput):
+    """
+    Answers the prompts of one play_round() from a session. The class prompt is answered with the class of the
+    player whose name was given last.
+    """
+
+    def __init__(self, session: dict) -> None:
+        players = session["players"]
+        super().__init__({
+            "name": [player["name"] for player in players],
+            "equip": [str(index) for player in players for index in [*player.get("equip", ()), "n"]],
+            "unequip": [str(index) for player in players for index in [*player.get("unequip", ()), "n"]],
+            "train": ["y" if player.get("bots", 0) > 0 else "n" for player in players],
+            "continue": [answer for player in players
+                         for answer in ["y"] * (player.get("bots", 0) - 1) + ["n"] * (player.get("bots", 0) > 0)],
+        })
+        self._classes = {player["name"]: str(player.get("class", 1)) for player in players}
+        self._name = None
+
+    def __call__(self, prompt: str, key: str) -> str:
+        if key == "class":
+            answer = self._classes.pop(self._name, None)
+            if answer is None:
+                raise EOFError(f"No scripted class left for {self._name}.")
+            return answer
+        answer = super().__call__(prompt, key)
+        if key == "name":
+            self._name = answer
+        return answer
+
+
+def read_sessions(path: str) -> Iterator[dict]:
+    """Yields the sessions of a JSON lines file, '-' for stdin. Blank lines are skipped."""
+    file = sys.stdin if path == "-" else open(path)
+    try:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def generate_sessions(count: int, seed: int = 0, roster: int = 100, max_bots: int = 3) -> Iterator[dict]:
+    """
+    Yields random sessions between the players of a fixed roster.
+
+    Args:
+        count (int): Number of sessions.
+        seed (int): Seed of the random choices.
+        roster (int): Number of different player names.
+        max_bots (int): Most forest bots a player fights in a session.
+    """
+    generator = random.Random(seed)
+    for _ in range(count):
+        names = generator.sample(range(roster), 2)
+        yield {"players": [{"name": f"player{name}", "class": generator.randint(1, 4),
+                            "equip": [generator.randint(1, 3) for _ in range(generator.randint(0, 2))],
+                            "unequip": [1] * generator.randint(0, 1), "bots": generator.randint(0, max_bots)}
+                           for name in names]}
+
+
+def _player_result(player) -> dict:
+    return {"name": player.name, "class": player.type_char, "level": player.level, "experience": player.experience}
+
+
+def _listeners(output: str, log: None | CombatLog) -> contextlib.ExitStack:
+    """Sets up the event subscribers for a session: no console renderer for null output, the combat log if any."""
+    stack = contextlib.ExitStack()
+    if output != "buffered":
+        stack.enter_context(events.unsubscribed(events.console_renderer))
+    if log is not None:
+        stack.enter_context(events.subscribed(log, *RECORDED_EVENTS))
+    return stack
+
+
+def run_sessions(sessions: Iterable[dict], seed: int = 0, output: str = "null",
+                 log: None | CombatLog = None) -> Iterator[dict]:
+    """
+    Plays sessions one after another through main.play_round().
+
+    Args:
+        sessions (Iterable[dict]): The sessions, see the module docstring.
+        seed (int): Root seed; session n without a 'seed' of its own plays with derive(seed, "session", n).
+        output (str): 'null' to discard the game's output, 'buffered' to return it with each result. With 'null'
+            no game messages are even formatted.
+        log (None | CombatLog): The combat log to record the games in.
+
+    Yields:
+        dict: The result of each session: the winner, the number of strikes and the players after the fight, or
+        the error that stopped it.
+    """
+    sink = BufferedOutput() if output == "buffered" else NullOutput()
+    for number, session in enumerate(sessions):
+        result = {"session": number}
+        try:
+            with console.redirect(SessionInput(session), sink), _listeners(output, log):
+                game = main.play_round(session.get("seed", derive(seed, "session", number)))
+        except (EOFError, KeyError, TypeError, ValueError) as error:
+            result["error"] = f"{type(error).__name__}: {error}"
+        else:
+            result["winner"] = None if game.winner is None else game.winner.name
+            result["rounds"] = game.rounds
+            result["players"] = [_player_result(game.character_1), _player_result(game.character_2)]
+        if output == "buffered":
+            result["output"] = sink.text()
+            sink.clear()
+        yield result
+
+
+def run_script(lines: Iterable[str], output: str = "null", log: None | CombatLog = None) -> tuple[int, str]:
+    """
+    Replays raw answers, one per prompt, through the loop of main.main() until the players stop or the answers
+    run out.
+
+    Args:
+        lines (Iterable[str]): The answers.
+        output (str): 'null' to discard the game's output, 'buffered' to return it.
+        log (None | CombatLog): The combat log to record the games in.
+
+    Returns:
+        tuple[int, str]: The number of rounds finished, and the game's output if buffered.
+    """
+    answers = (line.rstrip("\n") for line in lines)
+
+    def reader(prompt: str, key: str) -> str:
+        answer = next(answers, None)
+        if answer is None:
+            raise EOFError("The script has no more answers.")
+        return answer
+
+    sink = BufferedOutput() if output == "buffered" else NullOutput()
+    rounds = 0
+    with console.redirect(reader, sink), _listeners(output, log):
+        try:
+            while True:
+                main.play_round()
+                rounds += 1
+                if console.read("One more fight? y/n ", "again") == "n":
+                    break
+        except EOFError:
+            pass
+    return rounds, sink.text() if output == "buffered" else ""
+
+
+def use_store(path: str) -> None:
+    """Points main at a player store, without importing the legacy pickle roster into it."""
+    if main.players is not None:
+        main.players.close()
+    main.players, main.file_name, main.legacy_file_name = None, path, path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays scripted sessions without a terminal.")
+    parser.add_argument("sessions", nargs="?", help="JSON lines file of sessions, '-' for stdin.")
+    parser.add_argument("--generate", type=int, metavar="N", help="Play N random sessions instead.")
+    parser.add_argument("--script", help="Replay a file of raw answers through main.main() instead.")
+    parser.add_argument("--store", help="Player store to use, a temporary one by default.")
+    parser.add_argument("--combat-log", help="Record the games in this combat log.")
+    parser.add_argument("--output", choices=("null", "buffered"), default="null")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+    if arguments.sessions is None and arguments.generate is None and arguments.script is None:
+        parser.error("give a sessions file, --generate or --script")
+
+    with tempfile.TemporaryDirectory() as directory:
+        use_store(arguments.store or os.path.join(directory, "players.db"))
+        combat_log = None if arguments.combat_log is None else CombatLog(arguments.combat_log)
+        started = time.perf_counter()
+        played = 0
+        try:
+            if arguments.script is not None:
+                with open(arguments.script) as script:
+                    played, text = run_script(script, arguments.output, combat_log)
+                sys.stdout.write(text)
+            else:
+                if arguments.generate is not None:
+                    source = generate_sessions(arguments.generate, arguments.seed)
+                else:
+                    source = read_sessions(arguments.sessions)
+                for outcome in run_sessions(source, arguments.seed, arguments.output, combat_log):
+                    sys.stdout.write(json.dumps(outcome) + "\n")
+                    played += 1
+        finally:
+            seconds = time.perf_counter() - started
+            if combat_log is not None:
+                combat_log.close()
+            if main.players is not None:
+                main.players.close()
+                main.players = None
+        print(f"{played} sessions in {seconds:.2f} s, {played / seconds:.1f} sessions/s", file=sys.stderr)
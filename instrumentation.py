@@ -0,0 +1,230 @@
+"""
+Opt-in call counters and timers for the hot paths of a session.
+
+    import instrumentation
+    instrumentation.enable()
+    ...
+    print(instrumentation.report())
+
+enable() replaces the operations in TARGETS with wrappers that count calls and add up their time, and disable()
+puts the original functions back. A session that never enables instrumentation runs the original code, so it
+pays nothing. Times are inclusive: resolve_fight includes the check_winner call it makes. 'console' covers all
+console output, see console.write().
+
+Results can be exported as JSON lines (one snapshot per line) or as a Prometheus text file, which
+node_exporter's textfile collector can pick up; Reporter writes them periodically from a background thread.
+Setting RPG_INSTRUMENT=<path> before running main.py does all of this, see from_environment().
+
+    python instrumentation.py stats.jsonl      prints the last snapshot of a JSON lines export
+"""
+import atexit
+import functools
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+from types import ModuleType
+
+# Operation name -> (module, class or None, attribute).
+TARGETS: dict[str, tuple[str, None | str, str]] = {
+    "open_file": ("main", None, "open_file"),
+    "save_file": ("main", None, "save_file"),
+    "take_a_strike": ("game", "Game", "take_a_strike"),
+    "resolve_fight": ("game", "Game", "resolve_fight"),
+    "check_winner": ("game", "Game", "check_winner"),
+    "forest_training": ("game", "Game", "forest_training"),
+    "boost_bot": ("bots", "Bot", "boost_bot"),
+    "drop_item": ("bots", "Bot", "drop_item"),
+    "level_up": ("character", "Character", "level_up"),
+    "console": ("console", None, "write"),
+}
+
+# Operation name -> [calls, seconds]. The wrappers update the lists in place.
+_stats: dict[str, list] = {name: [0, 0.0] for name in TARGETS}
+# Operation name -> (owner, attribute, original), for the operations that are patched.
+_patched: dict[str, tuple[object, str, object]] = {}
+
+
+def _timed(function, stats: list):
+    """Wraps a function so that every call adds 1 to stats[0] and its duration to stats[1]."""
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += clock() - started
+    return wrapper
+
+
+def enable(names=None, main_module: None | ModuleType = None) -> None:
+    """
+    Starts counting calls of the given operations. Enabling an operation twice does nothing.
+
+    Args:
+        names (Iterable[str]): Operations from TARGETS, all of them by default.
+        main_module (None | ModuleType): The module to patch for 'main' operations. Pass sys.modules["__main__"]
+            when main.py runs as a script, since that is a different module object from an imported 'main'.
+
+    Raises:
+        KeyError: If an operation is not in TARGETS.
+    """
+    for name in TARGETS if names is None else names:
+        module_name, class_name, attribute = TARGETS[name]
+        if name in _patched:
+            continue
+        if module_name == "main" and main_module is not None:
+            owner = main_module
+        else:
+            owner = importlib.import_module(module_name)
+        if class_name is not None:
+            owner = getattr(owner, class_name)
+        original = vars(owner)[attribute]
+        if isinstance(original, staticmethod):
+            wrapped = staticmethod(_timed(original.__func__, _stats[name]))
+        elif isinstance(original, classmethod):
+            wrapped = classmethod(_timed(original.__func__, _stats[name]))
+        else:
+            wrapped = _timed(original, _stats[name])
+        setattr(owner, attribute, wrapped)
+        _patched[name] = (owner, attribute, original)
+
+
+def disable() -> None:
+    """Puts every original function back. The counters keep their values."""
+    for name, (owner, attribute, original) in list(_patched.items()):
+        setattr(owner, attribute, original)
+        del _patched[name]
+
+
+def enabled() -> bool:
+    """Returns True if any operation is instrumented."""
+    return bool(_patched)
+
+
+def reset() -> None:
+    """Sets every counter back to zero."""
+    for stats in _stats.values():
+        stats[0], stats[1] = 0, 0.0
+
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """
+    Returns the counters.
+
+    Returns:
+        dict[str, dict[str, float]]: {"calls": ..., "seconds": ...} by operation name.
+    """
+    return {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in _stats.items()}
+
+
+def report() -> str:
+    """Returns the counters as a table, the operations that took the most time first."""
+    lines = [f"{'operation':>16} {'calls':>10} {'seconds':>10} {'us/call':>10}"]
+    for name, (calls, seconds) in sorted(_stats.items(), key=lambda entry: -entry[1][1]):
+        if calls:
+            lines.append(f"{name:>16} {calls:>10} {seconds:>10.4f} {seconds / calls * 1e6:>10.2f}")
+    return "\n".join(lines)
+
+
+def write_json_line(path: str) -> None:
+    """Appends a snapshot of the counters, with a Unix timestamp, to a JSON lines file."""
+    with open(path, 'a') as file:
+        file.write(json.dumps({"time": time.time(), "operations": snapshot()}) + "\n")
+
+
+def write_prometheus(path: str) -> None:
+    """
+    Writes the counters in the Prometheus text format.
+
+    The file is written next to the target and renamed over it, so a collector never reads half a file.
+    """
+    lines = ["# HELP rpg_calls_total Calls of an instrumented operation.", "# TYPE rpg_calls_total counter"]
+    lines += [f'rpg_calls_total{{operation="{name}"}} {calls}' for name, (calls, _) in _stats.items()]
+    lines += ["# HELP rpg_seconds_total Time spent in an instrumented operation.",
+              "# TYPE rpg_seconds_total counter"]
+    lines += [f'rpg_seconds_total{{operation="{name}"}} {seconds:.9f}' for name, (_, seconds) in _stats.items()]
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as file:
+        file.write("\n".join(lines) + "\n")
+    os.replace(temporary, path)
+
+
+def write(path: str) -> None:
+    """Exports the counters: Prometheus text for '.prom' files, JSON lines otherwise."""
+    if path.endswith(".prom"):
+        write_prometheus(path)
+    else:
+        write_json_line(path)
+
+
+class Reporter:
+    """
+    Exports the counters every few seconds from a daemon thread, and once more when stopped.
+
+    Attributes:
+        path (str): The export file, see write().
+        interval (float): Seconds between exports.
+    """
+
+    def __init__(self, path: str, interval: float = 10.0) -> None:
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="instrumentation-reporter", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            write(self.path)
+
+    def start(self) -> "Reporter":
+        """Starts the thread and returns the reporter."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the thread and writes the final counters."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        write(self.path)
+
+
+def from_environment(main_module: None | ModuleType = None) -> None | Reporter:
+    """
+    Enables instrumentation if RPG_INSTRUMENT names an export file.
+
+    RPG_INSTRUMENT_INTERVAL sets the seconds between exports, 10 by default. The counters are also written when
+    the interpreter exits.
+
+    Args:
+        main_module (None | ModuleType): See enable().
+
+    Returns:
+        None | Reporter: The running reporter, None if RPG_INSTRUMENT is not set.
+    """
+    path = os.environ.get("RPG_INSTRUMENT")
+    if not path:
+        return None
+    enable(main_module=main_module)
+    reporter = Reporter(path, float(os.environ.get("RPG_INSTRUMENT_INTERVAL", 10.0))).start()
+    atexit.register(reporter.stop)
+    return reporter
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as export:
+            last = None
+            for line in export:
+                last = json.loads(line)
+        if last is not None:
+            for operation, values in last["operations"].items():
+                _stats[operation] = [values["calls"], values["seconds"]]
+            print(report())
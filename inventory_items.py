@@ -1,10 +1,24 @@
+import bisect
+
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Mapping
+
+from events import bus, ItemRefused
+from migration import restore_state
+
+
 class Items:
     """
     Base class for items in a game, defining common attributes and methods for all items.
 
+    Items are immutable values, so a single instance can be shared by any number of bots, inventories and
+    armories. Whether an item is equipped is tracked by the owner's Armory, not by the item.
+
     Attributes:
         _item_type (str): Specifies the type of item.
     """
+    __slots__ = ("_name", "_boost_damage", "_boost_health", "_boost_shield", "_text", "_hash")
     _item_type = None
 
     def __init__(self, name=None, boost_damage=None, boost_health=None, boost_shield=None) -> None:
@@ -17,18 +31,52 @@ class Items:
             boost_health (float): Health enhancement factor.
             boost_shield (float): Shield enhancement factor.
         """
-        self._boost_damage = boost_damage
-        self._boost_health = boost_health
-        self._boost_shield = boost_shield
-        self._name = name
-        self._is_on = False
+        object.__setattr__(self, "_boost_damage", boost_damage)
+        object.__setattr__(self, "_boost_health", boost_health)
+        object.__setattr__(self, "_boost_shield", boost_shield)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_text", None)
+        object.__setattr__(self, "_hash", hash((self._item_type, self._values())))
+
+    def __setattr__(self, key, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
 
     def __str__(self) -> str:
         """
         Returns a string representation of the item showing its type, name, and enhancements.
+
+        Items never change, so the text is built once.
         """
-        return (f"Type: {self._item_type} \nName: {self._name} \nBoost damage: {self._boost_damage},"
-                f"boost health: {self._boost_health}, boost shield: {self._boost_shield}.")
+        if self._text is None:
+            object.__setattr__(self, "_text", f"Type: {self._item_type} \nName: {self._name} \nBoost damage: "
+                                              f"{self._boost_damage},boost health: {self._boost_health}, "
+                                              f"boost shield: {self._boost_shield}.")
+        return self._text
+
+    def __eq__(self, other) -> bool:
+        if other is self:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        """Pickles catalog items as a reference to the shared prototype."""
+        if ITEM_CATALOG.get(self._item_type) == self:
+            return catalog_item, (self._item_type,)
+        return type(self), self._values()
+
+    def __setstate__(self, state) -> None:
+        """Restores items pickled before items became immutable (their state also held '_is_on')."""
+        restore_state(self, state)
+        object.__setattr__(self, "_text", None)
+        object.__setattr__(self, "_hash", hash((self._item_type, self._values())))
+
+    def _values(self) -> tuple:
+        return self._name, self._boost_damage, self._boost_health, self._boost_shield
 
     @property
     def boost_damage(self) -> None | float:
@@ -50,18 +98,10 @@ class Items:
     def get_item_type(cls) -> None | str:
         return cls._item_type
 
-    @property
-    def is_on(self) -> bool:
-        """Checks if the item is currently equipped."""
-        return self._is_on
-
-    def is_off(self) -> None:
-        """Sets the item to unequipped state."""
-        self._is_on = False
-
 
 class Helmet(Items):
     """Represents a helmet with specific enhancements."""
+    __slots__ = ()
     _item_type = "helmet"
 
     def __init__(self, name="Usual helmet", boost_damage=1.0, boost_health=1.0, boost_shield=1.2) -> None:
@@ -70,6 +110,7 @@ class Helmet(Items):
 
 class LHandWeapon(Items):
     """Represents a left-hand weapon with specific enhancements."""
+    __slots__ = ()
     _item_type = "l_hand_weapon"
 
     def __init__(self, name="Simple left hand sword", boost_damage=1.2, boost_health=1.0, boost_shield=0.9) -> None:
@@ -78,6 +119,7 @@ class LHandWeapon(Items):
 
 class RHandWeapon(Items):
     """Represents a right-hand weapon with specific enhancements."""
+    __slots__ = ()
     _item_type = "r_hand_weapon"
 
     def __init__(self, name="Simple right hand axe", boost_damage=1.25, boost_health=1.0, boost_shield=0.85) -> None:
@@ -86,6 +128,7 @@ class RHandWeapon(Items):
 
 class Shield(Items):
     """Represents a shield with specific enhancements."""
+    __slots__ = ()
     _item_type = "shield"
 
     def __init__(self, name="Metal shield", boost_damage=1.05, boost_health=1.0, boost_shield=1.3) -> None:
@@ -94,6 +137,7 @@ class Shield(Items):
 
 class Shoes(Items):
     """Represents shoes with specific enhancements."""
+    __slots__ = ()
     _item_type = "shoes"
 
     def __init__(self, name="Leather shoes", boost_damage=1.05, boost_health=1.1, boost_shield=1.05) -> None:
@@ -102,38 +146,240 @@ class Shoes(Items):
 
 class Ring(Items):
     """Represents a ring with specific magical enhancements."""
+    __slots__ = ()
     _item_type = "ring"
 
     def __init__(self, name="Ring of Sun", boost_damage=1.1, boost_health=1.2, boost_shield=0.9) -> None:
         super().__init__(name, boost_damage, boost_health, boost_shield)
 
 
+ITEM_CATALOG: dict[str, Items] = {
+    item.get_item_type(): item for item in (Helmet(), LHandWeapon(), RHandWeapon(), Shield(), Shoes(), Ring())
+}
+
+
+def catalog_item(item_type: str) -> Items:
+    """
+    Returns the shared prototype of the standard item of a type.
+
+    Args:
+        item_type (str): One of the Armory slot names, e.g. 'helmet'.
+    """
+    return ITEM_CATALOG[item_type]
+
+
+ITEM_TYPES: dict[str, type[Items]] = {item_type: type(item) for item_type, item in ITEM_CATALOG.items()}
+
+
+def item_spec(item: Items) -> str | list:
+    """
+    Returns a JSON-friendly description of an item: the slot name for catalog items, otherwise
+    [type, name, boost damage, boost health, boost shield].
+
+    Args:
+        item (Items): The item to describe.
+    """
+    if ITEM_CATALOG.get(item.get_item_type()) == item:
+        return item.get_item_type()
+    return [item.get_item_type(), item.item_name, item.boost_damage, item.boost_health, item.boost_shield]
+
+
+def item_from_spec(spec: str | list) -> Items:
+    """
+    Rebuilds an item from item_spec() output.
+
+    Args:
+        spec (str | list): The item description.
+    """
+    if isinstance(spec, str):
+        return catalog_item(spec)
+    item_type, *values = spec
+    return ITEM_TYPES[item_type](*values)
+
+
+def intern_item(item: Items) -> Items:
+    """
+    Replaces an item by its catalog prototype if they are equal.
+
+    Args:
+        item (Items): Any item, e.g. one restored from an old save file.
+    """
+    prototype = ITEM_CATALOG.get(item.get_item_type())
+    return prototype if prototype == item else item
+
+
+def rank_key(item: Items) -> tuple:
+    """
+    Sort key that puts items with larger combined boosts first.
+
+    Items of a slot are ranked by the product of their three boosts, then by name and by the single boosts so
+    that distinct items never tie.
+    """
+    return (-(item.boost_damage * item.boost_health * item.boost_shield), str(item.item_name),
+            -item.boost_damage, -item.boost_health, -item.boost_shield)
+
+
 class Inventory:
     """
     Represents a collection of items, typically held by a character or within a storage.
+
+    Equal items are stored once with a count, so adding, removing and counting an item is a dictionary operation.
+    The distinct items of every slot are kept ranked by rank_key(), best first, from the first ranked() or best()
+    call on, and the list of unequipped items is cached until the inventory or the armory changes.
     """
+    __slots__ = ("__counts", "__ranked", "__size", "__version", "__unequipped")
+
     def __init__(self) -> None:
         """Initializes an empty inventory."""
-        self.__items = list()
+        self.__counts: dict[Items, int] = {}
+        self.__ranked: None | dict[str, list[tuple[tuple, Items]]] = None
+        self.__size = 0
+        self.__version = 0
+        self.__unequipped = None
 
-    def add_item(self, *args) -> None:
-        """Adds items to the inventory."""
+    def __getstate__(self) -> dict:
+        return {"counts": list(self.__counts.items())}
+
+    def __setstate__(self, state) -> None:
+        """
+        Restores the inventory, sharing catalog prototypes instead of the pickled copies.
+
+        Inventories saved before items were counted hold a plain list of items.
+        """
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.__init__()
+        if "counts" in state:
+            for item, count in state["counts"]:
+                self.add_item(intern_item(item), count=count)
+        else:
+            self.add_item(*(intern_item(item) for item in state.get("_Inventory__items", ())))
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __contains__(self, item: Items) -> bool:
+        return item in self.__counts
+
+    def add_item(self, *args, count: int = 1) -> None:
+        """
+        Adds items to the inventory.
+
+        Args:
+            *args (Items): The items to add.
+            count (int): How many of every item to add.
+        """
         for item in args:
-            self.__items.append(item)
+            held = self.__counts.get(item, 0)
+            if not held and self.__ranked is not None:
+                bisect.insort(self.__ranked.setdefault(item.get_item_type(), []), (rank_key(item), item),
+                              key=itemgetter(0))
+            self.__counts[item] = held + count
+            self.__size += count
+        self.__version += 1
 
     def remove_item(self, item) -> None:
-        """Removes an item from the inventory."""
-        self.__items.remove(item)
+        """
+        Removes one copy of an item from the inventory.
+
+        Raises:
+            ValueError: If the inventory holds no such item.
+        """
+        held = self.__counts.get(item)
+        if not held:
+            raise ValueError("The item is not in the inventory.")
+        if held == 1:
+            del self.__counts[item]
+            if self.__ranked is not None:
+                ranked = self.__ranked[item.get_item_type()]
+                ranked.pop(bisect.bisect_left(ranked, rank_key(item), key=itemgetter(0)))
+        else:
+            self.__counts[item] = held - 1
+        self.__size -= 1
+        self.__version += 1
+
+    def clear(self) -> None:
+        """Removes every item."""
+        self.__init__()
+
+    def count(self, item: Items) -> int:
+        """Returns how many copies of an item the inventory holds."""
+        return self.__counts.get(item, 0)
+
+    def counts(self) -> Mapping[Items, int]:
+        """Returns a read-only view of every distinct item and its count, in the order they were first added."""
+        return MappingProxyType(self.__counts)
+
+    def __slot_ranking(self, item_type: str) -> list[tuple[tuple, Items]]:
+        if self.__ranked is None:
+            self.__ranked = {}
+            for item in self.__counts:
+                self.__ranked.setdefault(item.get_item_type(), []).append((rank_key(item), item))
+            for ranked in self.__ranked.values():
+                ranked.sort(key=itemgetter(0))
+        return self.__ranked.get(item_type, [])
+
+    def ranked(self, item_type: str) -> list[Items]:
+        """
+        Returns the distinct items of a slot, best first.
+
+        Args:
+            item_type (str): One of the Armory slot names, e.g. 'helmet'.
+        """
+        return [item for _, item in self.__slot_ranking(item_type)]
+
+    def available(self, item: Items, armory: "Armory") -> int:
+        """Returns how many copies of an item are not put on."""
+        return self.__counts.get(item, 0) - (armory.list_items.get(item.get_item_type()) == item)
+
+    def best(self, item_type: str, armory: "Armory") -> None | Items:
+        """
+        Returns the best item of a slot that is not put on.
+
+        Args:
+            item_type (str): One of the Armory slot names.
+            armory (Armory): The armory of the inventory's owner.
+        """
+        for _, item in self.__slot_ranking(item_type):
+            if self.available(item, armory):
+                return item
+        return None
+
+    def unequipped(self, armory: "Armory") -> tuple[Items, ...]:
+        """
+        Returns the items that are not put on, copies of an item next to each other.
+
+        The result is cached, so asking again before the inventory or the armory changes costs nothing.
+
+        Args:
+            armory (Armory): The armory of the inventory's owner.
+        """
+        key = self.__version, armory, armory.version
+        if self.__unequipped is not None and self.__unequipped[0] == key:
+            return self.__unequipped[1]
+        result = []
+        for item in self.__counts:
+            result.extend([item] * self.available(item, armory))
+        self.__unequipped = key, tuple(result)
+        return self.__unequipped[1]
 
     @property
     def inventory(self) -> list:
-        return self.__items
+        """Every item, copies next to each other. This is a new list; change the inventory with its methods."""
+        return [item for item, count in self.__counts.items() for _ in range(count)]
 
 
 class Armory:
     """
     Represents a set of equipped items, with logic to manage conflicts between item types.
+
+    Attributes:
+        _items_on (dict[str, None | Items]): The equipped item of every slot.
+        _version (int): Bumped whenever an item is put on or taken off, so that stats derived from the armory
+            know when to recompute.
     """
+    __slots__ = ("_items_on", "_version")
+
     def __init__(self) -> None:
         """Initializes an armory with placeholders for each type of item."""
 
@@ -145,11 +391,44 @@ class Armory:
             "shoes": None,
             "ring": None
         }
+        self._version = 0
+
+    def __getstate__(self) -> dict:
+        """Pickles only the slots that hold an item."""
+        return {slot: item for slot, item in self._items_on.items() if item}
+
+    def __setstate__(self, state) -> None:
+        """Restores the armory, sharing catalog prototypes instead of the pickled copies."""
+        if "_items_on" in state or isinstance(state, tuple):
+            restore_state(self, state)
+            state = self._items_on
+        self.__init__()
+        self._items_on.update((slot, intern_item(item)) for slot, item in state.items() if item)
 
     @property
     def list_items(self) -> dict[str, None | Items]:
         return self._items_on
 
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def set_items(self, items: dict[str, Items]) -> None:
+        """
+        Replaces the whole armory without conflict checks, e.g. when restoring a saved state.
+
+        Args:
+            items (dict[str, Items]): The equipped item of every occupied slot.
+        """
+        for slot in self._items_on:
+            self._items_on[slot] = items.get(slot)
+        self._version += 1
+
+    def __refuse(self, item: Items, reason: str) -> str:
+        if bus.listening(ItemRefused):
+            bus.emit(ItemRefused(self, item, reason))
+        return reason
+
     def set_item(self, item: Items) -> None | str:
         """
         Equips an item, respecting rules about item conflicts (e.g., shields and weapons).
@@ -162,26 +441,24 @@ class Armory:
         """
 
         if item.get_item_type() == "shield" and self._items_on["l_hand_weapon"]:
-            print("You can't hold shield. Take off left hand weapon first.")
-            return "You can't hold shield. Take off left hand weapon first."
+            return self.__refuse(item, "You can't hold shield. Take off left hand weapon first.")
 
         elif item.get_item_type() == "l_hand_weapon" and self._items_on["shield"]:
-            print("You can't hold left hand weapon. Take off shield first.")
-            return "You can't hold left hand weapon. Take off shield first."
+            return self.__refuse(item, "You can't hold left hand weapon. Take off shield first.")
 
         if not self._items_on.get(item.get_item_type()):
-            item._is_on = True
             self._items_on[item.get_item_type()] = item
+            self._version += 1
 
     def take_off_item(self, item: Items) -> None:
         """
-        Removes an item from being equipped, setting it to the unequipped state.
+        Removes an item from being equipped.
 
         Args:
             item (Items): The item to unequip.
         """
-        self._items_on[item.get_item_type()].is_off()
         self._items_on[item.get_item_type()] = None
+        self._version += 1
 
 
 if __name__ == "__main__":
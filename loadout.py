@@ -0,0 +1,170 @@
+"""
+Best-gear solver: picks at most one item per armory slot to maximize an objective.
+
+Every objective has the form weight_1 · Π p(item) + weight_2 · Π q(item), where p and q are products of an
+item's boosts:
+
+    'damage'        damage · Π boost_damage
+    'effective_hp'  health · Π boost_health + shield · Π boost_shield
+    'duel'          (health · Π boost_health + shield · Π boost_shield) · damage · Π boost_damage
+
+'duel' grows with both the strikes a character survives and the damage it deals, so it ranks loadouts the way
+they fare in Game.resolve_fight() against an unknown opponent.
+
+In log space every item is a point (log p, log q), a loadout is the sum of its items' points, and the objective
+is convex and increasing in both coordinates. Its maximum is therefore a vertex of the upper-right convex hull of
+all reachable sums. That hull is the Minkowski sum of the per-slot hulls, built by merging their edges by slope,
+so the solver looks at a few dozen candidate loadouts instead of every combination. Shields and left-hand weapons
+exclude each other (see Armory.set_item), so they are treated as one slot.
+"""
+import math
+
+from character import Character
+from inventory_items import Items
+
+OBJECTIVES: tuple[str, ...] = ("damage", "effective_hp", "duel")
+# Slots that share one pick because Armory.set_item() refuses to fill them together.
+SLOT_GROUPS: tuple[tuple[str, ...], ...] = (("helmet",), ("l_hand_weapon", "shield"), ("r_hand_weapon",),
+                                            ("shoes",), ("ring",))
+
+
+def _weights(character: Character, objective: str) -> tuple[float, float]:
+    """Returns the weights of Π p and Π q for the character's unequipped stats."""
+    health, shield, damage = (stat * character.level_modifier for stat in character.base_stats)
+    if objective == "damage":
+        return damage, 0.0
+    if objective == "effective_hp":
+        return health, shield
+    if objective == "duel":
+        return health * damage, shield * damage
+    raise ValueError(f"Unknown objective: {objective}. Choose one of {', '.join(OBJECTIVES)}.")
+
+
+def _point(item: Items, objective: str) -> tuple[float, float]:
+    """Returns (log p, log q) of an item."""
+    if objective == "damage":
+        value = math.log(item.boost_damage)
+        return value, value
+    if objective == "effective_hp":
+        return math.log(item.boost_health), math.log(item.boost_shield)
+    damage = math.log(item.boost_damage)
+    return math.log(item.boost_health) + damage, math.log(item.boost_shield) + damage
+
+
+def _cross(origin: tuple, point_1: tuple, point_2: tuple) -> float:
+    return ((point_1[0] - origin[0]) * (point_2[1] - origin[1])
+            - (point_1[1] - origin[1]) * (point_2[0] - origin[0]))
+
+
+def _upper_right_hull(points: list[tuple[float, float, None | Items]]) -> list[tuple[float, float, None | Items]]:
+    """
+    Returns the hull vertices that maximize some non-negative combination of both coordinates.
+
+    They run from the highest point to the rightmost one, with edge slopes decreasing.
+    """
+    points = sorted(points, key=lambda point: (point[0], point[1]))
+    upper = []
+    for point in points:
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], point) >= 0:
+            upper.pop()
+        upper.append(point)
+    top = max(range(len(upper)), key=lambda index: (upper[index][1], index))
+    return upper[top:]
+
+
+def score(character: Character, loadout: dict[str, Items], objective: str = "duel") -> float:
+    """
+    Evaluates an objective for a character wearing the given items.
+
+    Args:
+        character (Character): The character, whose base stats and level are used.
+        loadout (dict[str, Items]): Item per slot.
+        objective (str): One of OBJECTIVES.
+
+    Returns:
+        float: The objective value.
+    """
+    weight_1, weight_2 = _weights(character, objective)
+    x = y = 0.0
+    for item in loadout.values():
+        dx, dy = _point(item, objective)
+        x += dx
+        y += dy
+    return weight_1 * math.exp(x) + weight_2 * math.exp(y)
+
+
+def best_loadout(character: Character, items=None, objective: str = "duel") -> tuple[dict[str, Items], float]:
+    """
+    Finds the loadout that maximizes the objective.
+
+    Args:
+        character (Character): The character to dress.
+        items (Iterable[Items]): Items to choose from. Defaults to the character's whole inventory, equipped
+            items included.
+        objective (str): One of OBJECTIVES.
+
+    Returns:
+        tuple[dict[str, Items], float]: The item per occupied slot and the objective value.
+
+    Raises:
+        ValueError: If the objective is unknown.
+    """
+    weight_1, weight_2 = _weights(character, objective)
+    if items is None:
+        items = character.inventory.counts()
+
+    # Items with the same boosts are interchangeable, so every slot keeps one of each.
+    distinct: dict[tuple, Items] = {}
+    for item in items:
+        distinct.setdefault((item.get_item_type(), item.boost_damage, item.boost_health, item.boost_shield), item)
+
+    slot_group = {slot: index for index, group in enumerate(SLOT_GROUPS) for slot in group}
+    candidates = [[(0.0, 0.0, None)] for _ in SLOT_GROUPS]
+    for (slot, *_), item in distinct.items():
+        candidates[slot_group[slot]].append((*_point(item, objective), item))
+    hulls = [_upper_right_hull(points) for points in candidates]
+
+    # Walk the Minkowski sum of the hulls: start from the sum of their highest points and take the edges in
+    # order of decreasing slope. Every prefix of that walk is a vertex of the combined hull.
+    x = sum(hull[0][0] for hull in hulls)
+    y = sum(hull[0][1] for hull in hulls)
+    edges = sorted(((hull[index + 1][1] - hull[index][1]) / (hull[index + 1][0] - hull[index][0]), group, index + 1)
+                   for group, hull in enumerate(hulls) for index in range(len(hull) - 1))
+    edges.reverse()
+    position = [0] * len(hulls)
+    best_value, best_position = weight_1 * math.exp(x) + weight_2 * math.exp(y), list(position)
+    for _, group, index in edges:
+        hull = hulls[group]
+        x += hull[index][0] - hull[index - 1][0]
+        y += hull[index][1] - hull[index - 1][1]
+        position[group] = index
+        value = weight_1 * math.exp(x) + weight_2 * math.exp(y)
+        if value > best_value:
+            best_value, best_position = value, list(position)
+
+    loadout = {}
+    for group, index in enumerate(best_position):
+        item = hulls[group][index][2]
+        if item is not None:
+            loadout[item.get_item_type()] = item
+    return loadout, score(character, loadout, objective)
+
+
+def equip_best(character: Character, objective: str = "duel") -> dict[str, Items]:
+    """
+    Replaces the character's armory with the best loadout from its inventory.
+
+    Args:
+        character (Character): The character to dress.
+        objective (str): One of OBJECTIVES.
+
+    Returns:
+        dict[str, Items]: The item per occupied slot.
+    """
+    loadout, _ = best_loadout(character, objective=objective)
+    character.armory.set_items(loadout)
+    return loadout
+
+
+if __name__ == "__main__":
+    ...
@@ -1,28 +1,63 @@
-import pickle
+import os
+import sys
+
+import console
+import events
+import instrumentation
 
 from character import Character, Warrior, Mage, Rogue, Paladin
-from bots import Bot
-from inventory_items import Helmet, LHandWeapon, RHandWeapon, Shoes, Shield, Ring
+from bots import BotFactory
+from combat_log import CombatLog, OUTCOME_EVENTS, RECORDED_EVENTS
+from inventory_items import ITEM_CATALOG
 from game import Game
+from storage import PlayerStore, open_store, import_pickle
 
-players = dict()
-file_name: str = 'players.pkl'
+players: None | PlayerStore = None
+file_name: str = 'players.db'
+legacy_file_name: str = 'players.pkl'
+combat_log_file_name: str = 'combat.log'
+bot_factory: BotFactory = BotFactory()
 
 
 def open_file() -> None:
-    """Open and load the player's data file if it exists."""
+    """
+    Open the player store, importing the legacy pickle roster the first time.
+
+    Players are loaded from the store on demand; reopening only drops the cached ones.
+    """
     global players
-    try:
-        with open(file_name, 'rb') as file:
-            players = pickle.load(file)
-    except FileNotFoundError:
-        print("Creating a new file...")
+    if players is not None:
+        players.reload()
+        return
+    is_new = not os.path.exists(file_name)
+    players = open_store(file_name)
+    if is_new:
+        if file_name != legacy_file_name and os.path.exists(legacy_file_name):
+            import_pickle(legacy_file_name, players)
+        else:
+            console.write("Creating a new file...")
 
 
 def save_file() -> None:
-    """Save the current state of players' data to a file."""
-    with open(file_name, 'wb') as file:
-        pickle.dump(players, file)
+    """Save the players that changed since they were loaded."""
+    players.save()
+
+
+def create_character(name: str, character_class: type[Character]) -> Character:
+    """
+    Creates a named character of the given class with the standard equipment in its inventory.
+
+    Args:
+        name (str): The name of the player.
+        character_class (type[Character]): Warrior, Paladin, Mage or Rogue.
+
+    Returns:
+        Character: The new character.
+    """
+    player = character_class()
+    player.name = name
+    player.inventory.add_item(*ITEM_CATALOG.values())
+    return player
 
 
 def choose_characters(name) -> Character:
@@ -35,28 +70,17 @@ def choose_characters(name) -> Character:
     Returns:
         Character: The character chosen by the player, fully equipped.
     """
-    characters = Warrior(), Paladin(), Mage(), Rogue()
-    equipment = {
-        'helmet': Helmet(),
-        'sword': LHandWeapon(),
-        'axe': RHandWeapon(),
-        'shield': Shield(),
-        'shoes': Shoes(),
-        'ring': Ring()
-    }
-    result = "\n".join([f"{i + 1}: {k.type_char}" for i, k in enumerate(characters)])
-    print(result)
+    characters = Warrior, Paladin, Mage, Rogue
+    result = "\n".join([f"{i + 1}: {k.get_character_type()}" for i, k in enumerate(characters)])
+    console.write(result)
     while True:
-        index = input(f"{name}, choose a type for your character. Enter an index: ")
+        index = console.read(f"{name}, choose a type for your character. Enter an index: ", "class")
         try:
-            player = characters[int(index) - 1]
+            character_class = characters[int(index) - 1]
             break
         except (ValueError, IndexError):
-            print("Incorrect index. Try again.")
-    player.name = name
-    for item in equipment.values():
-        player.inventory.add_item(item)
-    return player
+            console.write("Incorrect index. Try again.")
+    return create_character(name, character_class)
 
 
 def forest_training(player, game) -> None:
@@ -67,63 +91,88 @@ def forest_training(player, game) -> None:
         player (Character): The player's character who is training.
         game (Game): The game session where the training occurs.
     """
-    go_forest = input(f"{player.name}, do you want to train in the forest? y/n ")
+    go_forest = console.read(f"{player.name}, do you want to train in the forest? y/n ", "train")
     if go_forest == "y":
         while True:
-            new_bot = next(Bot.gen_bot())
+            new_bot = bot_factory.acquire(player.level)
             while True:
                 game.forest_training(player, new_bot)
                 if game.forest_train_winner(player, new_bot):
                     break
-            cont = input("Do you want to continue: y/n ")
+            bot_factory.release(new_bot)
+            cont = console.read("Do you want to continue: y/n ", "continue")
             if cont == "n":
                 break
 
 
-def main() -> None:
+def choose_player(prompt: str) -> Character:
     """
-    Main function to handle game setup, play, and teardown.
+    Asks for a character's name and loads the character, creating it if it is not in the store yet.
+
+    Args:
+        prompt (str): The question asked for the name.
+
+    Returns:
+        Character: The player's character.
     """
-    while True:
-        open_file()
-        player1_name = input("Player1, your character's name: ")
-        if not players.get(player1_name):
-            player1 = choose_characters(player1_name)
-            players[player1.name] = player1
-        player1 = players[player1_name]
+    name = console.read(prompt, "name")
+    if not players.get(name):
+        player = choose_characters(name)
+        players[player.name] = player
+    return players[name]
 
-        player2_name = input("Player2, your character's name: ")
-        if not players.get(player2_name):
-            player2 = choose_characters(player2_name)
-            players[player2.name] = player2
-        player2 = players[player2_name]
 
-        player1.check_inventory()
-        player1.check_armory()
+def play_round(seed: None | int = None) -> Game:
+    """
+    Plays one round: both players are chosen, dress, may train in the forest and fight each other, and the
+    players that changed are saved.
 
-        player2.check_inventory()
-        player2.check_armory()
+    Args:
+        seed (None | int): Root seed of the game's random streams, a fresh one if None.
 
-        new_game = Game(player1, player2)
-        new_game.save_health_shield_damage()
+    Returns:
+        Game: The game that was played.
+    """
+    open_file()
+    player1 = choose_player("Player1, your character's name: ")
+    player2 = choose_player("Player2, your character's name: ")
 
-        forest_training(player1, new_game)
-        forest_training(player2, new_game)
+    player1.check_inventory()
+    player1.check_armory()
 
-        new_game.restore_health_shield()
-        new_game.boost_char_damage()
+    player2.check_inventory()
+    player2.check_armory()
 
-        while True:
+    new_game = Game(player1, player2, seed=seed)
 
-            new_game.take_a_strike()
-            if new_game.check_winner():
-                break
+    forest_training(player1, new_game)
+    forest_training(player2, new_game)
 
-        save_file()
-        another_round = input("One more fight? y/n ")
-        if another_round == "n":
-            break
+    new_game.restore_health_shield()
+    new_game.boost_char_damage()
+    new_game.resolve_fight()
+
+    save_file()
+    return new_game
+
+
+def main(log_strikes: bool = False) -> None:
+    """
+    Main function to handle game setup, play, and teardown. Fights are recorded in the combat log.
+
+    Args:
+        log_strikes (bool): Also record every strike. Fights are then played one strike at a time instead of
+            being resolved in closed form. Setting RPG_LOG_STRIKES=1 turns this on.
+    """
+    with CombatLog(combat_log_file_name) as log, events.subscribed(
+            log, *(RECORDED_EVENTS if log_strikes else OUTCOME_EVENTS)):
+        while True:
+            play_round()
+            another_round = console.read("One more fight? y/n ", "again")
+            if another_round == "n":
+                break
 
 
 if __name__ == "__main__":
-    main()
+    instrumentation.from_environment(sys.modules[__name__])
+    main(os.environ.get("RPG_LOG_STRIKES") == "1")
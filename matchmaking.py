@@ -0,0 +1,177 @@
+import bisect
+import random
+import sys
+
+import events
+
+from character import Character, Mage, Paladin, Rogue, Warrior
+from events import ExperienceChanged
+from game import Game
+
+
+class MatchmakingIndex:
+    """
+    Queue of characters waiting for an opponent, bucketed by level.
+
+    Every queued character sits in a bucket for its level and in a bucket for its (type, level), and the
+    non-empty levels of each group are kept sorted. Finding the nearest-level opponent is a binary search over
+    the levels plus a walk to the neighbouring buckets, and queueing or removing a character touches two buckets.
+    Within a bucket, the character that has waited longest comes first.
+
+    Levels change after fights, and the index only knows a level once it is filed. Subscribe the index to
+    ExperienceChanged events, bus.subscribe(index, ExperienceChanged), to re-file characters whenever a level
+    changes: Game, Game.train_in_forest(), Tournament, BattleRoyale, TeamGame and Roster all emit them. Call
+    update() after changing a level any other way, e.g. calling level_up() directly. A character left in the bucket of an old level is found at that level: searches can then return a farther
+    opponent than the nearest one, or miss the stale character. A stale character that a search runs into is
+    re-filed.
+    """
+    def __init__(self) -> None:
+        self._buckets: dict[tuple, dict[str, Character]] = {}
+        self._levels: dict[None | str, list[int]] = {}
+        self._filed: dict[str, tuple[None | str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._filed)
+
+    def __contains__(self, character: Character) -> bool:
+        return character.name in self._filed
+
+    def _add(self, group: None | str, level: int, character: Character) -> None:
+        bucket = self._buckets.setdefault((group, level), {})
+        if not bucket:
+            bisect.insort(self._levels.setdefault(group, []), level)
+        bucket[character.name] = character
+
+    def _discard(self, group: None | str, level: int, name: str) -> None:
+        bucket = self._buckets[(group, level)]
+        del bucket[name]
+        if not bucket:
+            del self._buckets[(group, level)]
+            levels = self._levels[group]
+            levels.pop(bisect.bisect_left(levels, level))
+
+    def enqueue(self, character: Character) -> None:
+        """
+        Adds a character to the queue, or re-files it if it is already queued.
+
+        Args:
+            character (Character): A named character.
+        """
+        self.dequeue(character)
+        self._add(None, character.level, character)
+        self._add(character.type_char, character.level, character)
+        self._filed[character.name] = character.type_char, character.level
+
+    def dequeue(self, character: Character) -> bool:
+        """
+        Removes a character from the queue.
+
+        Returns:
+            bool: False if the character was not queued.
+        """
+        filed = self._filed.pop(character.name, None)
+        if filed is None:
+            return False
+        character_type, level = filed
+        self._discard(None, level, character.name)
+        self._discard(character_type, level, character.name)
+        return True
+
+    def update(self, character: Character) -> None:
+        """Moves a queued character to the bucket of its current level."""
+        filed = self._filed.get(character.name)
+        if filed is not None and filed != (character.type_char, character.level):
+            self.enqueue(character)
+
+    def __call__(self, event: tuple) -> None:
+        """Re-files the character of an ExperienceChanged event from the event bus. Other events are ignored."""
+        if type(event) is ExperienceChanged:
+            self.update(event.character)
+
+    def find_opponent(self, character: Character, opponent_type: None | str = None,
+                      max_level_gap: None | int = None) -> None | Character:
+        """
+        Finds the queued character whose level is nearest to the given character's level, without dequeuing it.
+
+        Args:
+            character (Character): The character looking for a fight. It is never returned itself.
+            opponent_type (None | str): Only consider characters of this type.
+            max_level_gap (None | int): Only consider characters at most this many levels away.
+
+        Returns:
+            None | Character: The opponent, or None if nobody suitable is queued.
+        """
+        level = character.level
+        while True:
+            levels = self._levels.get(opponent_type, [])
+            above = bisect.bisect_left(levels, level)
+            below = above - 1
+            stale = None
+            while stale is None and (below >= 0 or above < len(levels)):
+                # Take the nearer of the two neighbouring levels, preferring the higher one on a tie.
+                if above < len(levels) and (below < 0 or levels[above] - level <= level - levels[below]):
+                    candidate_level, above = levels[above], above + 1
+                else:
+                    candidate_level, below = levels[below], below - 1
+                if max_level_gap is not None and abs(candidate_level - level) > max_level_gap:
+                    break
+                for opponent in self._buckets[(opponent_type, candidate_level)].values():
+                    if opponent.level != candidate_level:
+                        stale = opponent
+                        break
+                    if opponent is not character:
+                        return opponent
+            if stale is None:
+                return None
+            # The level list changes when a stale character is re-filed, so start over.
+            self.enqueue(stale)
+
+    def match(self, character: Character, opponent_type: None | str = None,
+              max_level_gap: None | int = None) -> None | Character:
+        """
+        Finds an opponent like find_opponent() and removes both characters from the queue.
+
+        Returns:
+            None | Character: The opponent, or None if nobody suitable is queued. The character stays
+            queued if no opponent is found.
+        """
+        opponent = self.find_opponent(character, opponent_type, max_level_gap)
+        if opponent is not None:
+            self.dequeue(opponent)
+            self.dequeue(character)
+        return opponent
+
+
+def check_refiling(characters: int = 20, seed: int = 0) -> list[str]:
+    """
+    Queues characters, trains them with Game.train_in_forest() and checks that the index re-filed them at their
+    new levels. Run this after changing where ExperienceChanged events are emitted.
+
+    Args:
+        characters (int): Number of characters, of random classes, each fighting a random number of bots.
+        seed (int): Seed of the characters and of the training.
+
+    Returns:
+        list[str]: The characters filed at a level other than their own.
+    """
+    generator = random.Random(seed)
+    index = MatchmakingIndex()
+    trainees = []
+    for number in range(characters):
+        character = generator.choice((Warrior, Mage, Rogue, Paladin))()
+        character.name = f"trainee{number}"
+        index.enqueue(character)
+        trainees.append(character)
+    with events.subscribed(index, ExperienceChanged):
+        for character in trainees:
+            Game.train_in_forest(character, generator.randint(1, 100), seed)
+    return [character.name for character in trainees
+            if index._filed[character.name] != (character.type_char, character.level)]
+
+
+if __name__ == "__main__":
+    stale = check_refiling()
+    print(f"{len(stale)} trained characters filed at a stale level.")
+    if stale:
+        print("First ones:", stale[:10])
+        sys.exit(1)
@@ -0,0 +1,222 @@
+"""
+Class × loadout matchup matrix: the win rate of every class with every legal loadout against every other one.
+
+Every cell is simulated once with simulation.simulate_duels() and cached on disk together with a fingerprint of
+its inputs: both fighters' stats (which follow from the class and item definitions), the type advantage, the
+level and the simulation settings. Loading the cache and asking for a cell is a dictionary lookup; after a class
+or item is rebalanced only the cells whose fingerprint changed are simulated again.
+
+    python matchups.py --level 5
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+import rng
+import simulation
+from character import Character, Warrior, Mage, Rogue, Paladin
+from game import Game
+from inventory_items import Armory, ITEM_CATALOG, Items, item_spec
+
+CLASSES: tuple[type[Character], ...] = (Warrior, Mage, Rogue, Paladin)
+# Slots that Armory.set_item() refuses to fill together.
+EXCLUSIVE_SLOTS: tuple[tuple[str, str], ...] = (("shield", "l_hand_weapon"),)
+
+
+def legal_loadouts(items=None) -> list[tuple[Items, ...]]:
+    """
+    Enumerates every armory content allowed by Armory.set_item(), from the empty armory up.
+
+    Args:
+        items (Iterable[Items]): Items to choose from, at most one per slot. Defaults to the item catalog,
+            which gives 48 loadouts.
+
+    Returns:
+        list[tuple[Items, ...]]: Loadouts with their items in armory slot order.
+    """
+    items = list(ITEM_CATALOG.values() if items is None else items)
+    per_slot = [[None] + [item for item in items if item.get_item_type() == slot] for slot in Armory().list_items]
+    loadouts = []
+    for choice in itertools.product(*per_slot):
+        slots = {item.get_item_type() for item in choice if item}
+        if any(slot_1 in slots and slot_2 in slots for slot_1, slot_2 in EXCLUSIVE_SLOTS):
+            continue
+        loadouts.append(tuple(item for item in choice if item))
+    return loadouts
+
+
+def loadout_key(loadout: tuple[Items, ...]) -> str:
+    """Returns a readable identifier of a loadout, e.g. '["helmet", "ring"]' for catalog items."""
+    return json.dumps([item_spec(item) for item in loadout])
+
+
+def build_fighter(character_class: type[Character], loadout: tuple[Items, ...], level: int = 1) -> Character:
+    """
+    Creates a character wearing the given loadout at the given level.
+
+    The character reaches the level by beating opponents of its own level, so it carries the level-dependent
+    boosts of those wins.
+    """
+    character = character_class()
+    character.armory.set_items({item.get_item_type(): item for item in loadout})
+    while character.level < level:
+        character.experience_add(character.level)
+        character.level_up()
+        character.level_dependent_boost()
+    return character
+
+
+class MatchupMatrix:
+    """
+    Win rates of class/loadout pairs, cached on disk.
+
+    A win counts 1, a draw or an unresolved duel 0.5, averaged over `samples` duels per cell. Fighter stats are
+    read once per matrix object, so create a new one after changing class or item definitions.
+
+    Attributes:
+        path (None | str): JSON cache file, None to keep the matrix in memory only.
+        loadouts (list[tuple[Items, ...]]): The loadout axis of the matrix.
+        samples (int): Duels simulated per cell.
+        seed (int): Seed for the fatality rolls.
+        max_rounds (int): Strikes after which a duel counts as unresolved.
+        computed (int): Cells simulated since the matrix was created.
+    """
+    def __init__(self, path: None | str = "matchups.json", loadouts: None | list[tuple[Items, ...]] = None,
+                 samples: int = 64, seed: int = 0, max_rounds: int = 10_000) -> None:
+        self.path = path
+        self.loadouts = legal_loadouts() if loadouts is None else loadouts
+        self.samples = samples
+        self.seed = seed
+        self.max_rounds = max_rounds
+        self.computed = 0
+        self._cells: dict[str, list] = {}
+        self._fighters: dict[tuple, tuple] = {}
+        self._keys: dict[tuple, tuple] = {}
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self._cells = json.load(file)["cells"]
+
+    def save(self) -> None:
+        """Writes the cache file."""
+        if not self.path:
+            return
+        with open(self.path + ".tmp", 'w') as file:
+            json.dump({"cells": self._cells}, file)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _fighter(self, character_class: type[Character], loadout: tuple[Items, ...], level: int) -> tuple:
+        """Returns (type, health, shield, damage, fatal chance, fatal damage) of a class/loadout/level."""
+        key = character_class, loadout, level
+        record = self._fighters.get(key)
+        if record is None:
+            character = build_fighter(character_class, loadout, level)
+            record = (character.type_char, *character.stats, character.fatal_prop, character.fatal_damage)
+            self._fighters[key] = record
+        return record
+
+    def _cell(self, class_1: type[Character], loadout_1: tuple[Items, ...], class_2: type[Character],
+              loadout_2: tuple[Items, ...], level: int) -> tuple[str, str, tuple, tuple]:
+        """Returns the cache key, the input fingerprint and both fighter records of a cell."""
+        cell = self._keys.get((class_1, loadout_1, class_2, loadout_2, level))
+        if cell is not None:
+            return cell
+        record_1 = self._fighter(class_1, loadout_1, level)
+        record_2 = self._fighter(class_2, loadout_2, level)
+        inputs = [record_1, record_2, Game.has_type_advantage(record_1[0], record_2[0]),
+                  Game.has_type_advantage(record_2[0], record_1[0]), Character.type_boost,
+                  self.samples, self.seed, self.max_rounds]
+        fingerprint = hashlib.blake2b(json.dumps(inputs).encode(), digest_size=8).hexdigest()
+        key = "|".join((record_1[0], loadout_key(loadout_1), record_2[0], loadout_key(loadout_2), str(level)))
+        cell = self._keys[(class_1, loadout_1, class_2, loadout_2, level)] = key, fingerprint, record_1, record_2
+        return cell
+
+    def _simulate(self, cells: list[tuple[str, str, tuple, tuple]]) -> None:
+        """Simulates the given cells in one batch and stores their win rates."""
+        if not cells:
+            return
+
+        def fighters(records: list[tuple]) -> simulation.Fighters:
+            columns = list(zip(*records))
+            return simulation.Fighters(
+                *(np.repeat(column, self.samples) for column in columns[1:]),
+                np.repeat([simulation.TYPE_CODES.get(type_char, -1) for type_char in columns[0]], self.samples),
+            )
+
+        # Sample k of a cell is the match label_value(cell key) + k, so a cell gets the same rolls whatever
+        # else is simulated in the same batch.
+        match_ids = (np.array([rng.label_value(cell[0]) for cell in cells], dtype=np.uint64)[:, None]
+                     + np.arange(self.samples, dtype=np.uint64)).ravel()
+        results = simulation.simulate_duels(fighters([cell[2] for cell in cells]),
+                                            fighters([cell[3] for cell in cells]), self.seed, self.max_rounds,
+                                            match_ids)
+        wins = results.wins.reshape(len(cells), self.samples).sum(axis=1)
+        losses = results.losses.reshape(len(cells), self.samples).sum(axis=1)
+        rates = (wins + (self.samples - wins - losses) / 2) / self.samples
+        for (key, fingerprint, _, _), rate in zip(cells, rates):
+            self._cells[key] = [fingerprint, float(rate)]
+        self.computed += len(cells)
+
+    def _lookup(self, cells: list[tuple[str, str, tuple, tuple]]) -> list[float]:
+        """Returns the win rates of the given cells, simulating the missing and outdated ones."""
+        self._simulate([cell for cell in cells if self._cells.get(cell[0], (None,))[0] != cell[1]])
+        return [self._cells[cell[0]][1] for cell in cells]
+
+    def win_rate(self, class_1: type[Character], loadout_1: tuple[Items, ...], class_2: type[Character],
+                 loadout_2: tuple[Items, ...], level: int = 1) -> float:
+        """
+        Returns how often class_1 wearing loadout_1 beats class_2 wearing loadout_2, both at the given level.
+
+        Args:
+            class_1 (type[Character]): Class of the first fighter.
+            loadout_1 (tuple[Items, ...]): Items worn by the first fighter.
+            class_2 (type[Character]): Class of the second fighter.
+            loadout_2 (tuple[Items, ...]): Items worn by the second fighter.
+            level (int): Level of both fighters.
+
+        Returns:
+            float: Between 0 and 1. Draws count as half a win.
+        """
+        return self._lookup([self._cell(class_1, loadout_1, class_2, loadout_2, level)])[0]
+
+    def matrix(self, level: int = 1, classes: tuple[type[Character], ...] = CLASSES) -> np.ndarray:
+        """
+        Returns the whole matrix for a level, simulating the missing and outdated cells in one batch.
+
+        Args:
+            level (int): Level of both fighters.
+            classes (tuple[type[Character], ...]): The class axis of the matrix.
+
+        Returns:
+            np.ndarray: Win rates indexed by [class_1, loadout_1, class_2, loadout_2], in the order of
+            `classes` and `self.loadouts`.
+        """
+        axis = [(character_class, loadout) for character_class in classes for loadout in self.loadouts]
+        cells = [self._cell(class_1, loadout_1, class_2, loadout_2, level)
+                 for class_1, loadout_1 in axis for class_2, loadout_2 in axis]
+        shape = (len(classes), len(self.loadouts)) * 2
+        return np.array(self._lookup(cells)).reshape(shape)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Class × loadout matchup matrix.")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--cache", default="matchups.json")
+    parser.add_argument("--samples", type=int, default=64)
+    arguments = parser.parse_args()
+
+    matchups = MatchupMatrix(arguments.cache, samples=arguments.samples)
+    started = time.perf_counter()
+    rates = matchups.matrix(arguments.level)
+    elapsed = time.perf_counter() - started
+    matchups.save()
+    print(f"{rates.size} cells, {matchups.computed} simulated in {elapsed:.2f}s")
+    names = [character_class.get_character_type() for character_class in CLASSES]
+    print("Mean win rate over all loadouts (row against column):")
+    print(" " * 9 + "".join(f"{name:>9}" for name in names))
+    for index, name in enumerate(names):
+        print(f"{name:>9}" + "".join(f"{rate:9.3f}" for rate in rates[index].mean(axis=(0, 2))))
@@ -0,0 +1,29 @@
+def _mangle(cls: type, name: str) -> str:
+    """Returns the attribute name Python uses for a slot declared in cls."""
+    if name.startswith("__") and not name.endswith("__"):
+        return f"_{cls.__name__.lstrip('_')}{name}"
+    return name
+
+
+def restore_state(obj: object, state: dict | tuple) -> None:
+    """
+    Restores a pickled object into a __slots__ class, whichever layout it was saved with.
+
+    Objects saved before the class had __slots__ carry a plain __dict__ state, slotted objects carry
+    a (None, slots) tuple. Attributes the class no longer has are dropped.
+
+    Args:
+        obj (object): The object being unpickled.
+        state (dict | tuple): The state pickle passes to __setstate__.
+    """
+    if isinstance(state, tuple):
+        dict_state, slots_state = state
+        state = {**(dict_state or {}), **(slots_state or {})}
+    slots = {_mangle(cls, name) for cls in type(obj).__mro__ for name in cls.__dict__.get("__slots__", ())}
+    for key, value in state.items():
+        if key in slots:
+            object.__setattr__(obj, key, value)
+
+
+if __name__ == "__main__":
+    ...
@@ -0,0 +1,144 @@
+"""
+Seeded random streams for fights.
+
+Every random decision of a fight is read from a stream identified by a root seed and a few labels, e.g.
+Stream(seed, match_id, "fatal", 1) for the fatality rolls of the first fighter of a match. Values are computed
+from the stream key and a counter with the splitmix64 mixing function, not drawn from shared generator state, so
+a fight gives the same result whichever process plays it, in whatever order, and simulation.py reproduces the
+same numbers with NumPy.
+"""
+import functools
+import hashlib
+import math
+import random
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(value: int) -> int:
+    """The splitmix64 finalizer: a bijective scramble of a 64-bit integer."""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+@functools.lru_cache(maxsize=1024)
+def _string_label(label: str) -> int:
+    return int.from_bytes(hashlib.blake2b(label.encode(), digest_size=8).digest(), "little")
+
+
+def label_value(label: int | str) -> int:
+    """Turns a stream label into a 64-bit integer. Strings are hashed, so they give the same value everywhere."""
+    if isinstance(label, str):
+        return _string_label(label)
+    return label & MASK64
+
+
+def derive(root_seed: int, *labels: int | str) -> int:
+    """
+    Returns the key of the stream named by a root seed and labels.
+
+    Args:
+        root_seed (int): The seed of the whole run.
+        *labels (int | str): E.g. a match id and the purpose of the stream.
+    """
+    key = mix64(root_seed & MASK64)
+    for label in labels:
+        key = mix64(key ^ label_value(label))
+    return key
+
+
+def uniform(key: int, index: int) -> float:
+    """Returns the index-th value of a stream, uniform in [0, 1)."""
+    return (mix64((key + (index + 1) * GOLDEN_GAMMA) & MASK64) >> 11) * 2.0 ** -53
+
+
+def geometric_gap(value: float, probability: float) -> float:
+    """
+    Turns a uniform value into the number of trials up to and including the next success.
+
+    Args:
+        value (float): Uniform in [0, 1).
+        probability (float): Success probability of a trial.
+
+    Returns:
+        float: At least 1, math.inf if the probability is 0.
+    """
+    if probability <= 0:
+        return math.inf
+    if probability >= 1:
+        return 1
+    return 1 + math.floor(math.log(1.0 - value) / math.log(1.0 - probability))
+
+
+def new_seed() -> int:
+    """Returns a fresh root seed from the random module, for callers that do not pass one."""
+    return random.getrandbits(64)
+
+
+class Stream:
+    """
+    A sequence of uniform values named by a root seed and labels.
+
+    Attributes:
+        key (int): The stream key, see derive().
+        position (int): Number of values read with random() so far.
+    """
+    __slots__ = ("key", "position")
+
+    def __init__(self, root_seed: int, *labels: int | str) -> None:
+        self.key = derive(root_seed, *labels)
+        self.position = 0
+
+    def random(self) -> float:
+        """Returns the next value, uniform in [0, 1)."""
+        value = uniform(self.key, self.position)
+        self.position += 1
+        return value
+
+    def chance(self, probability: float) -> bool:
+        """Returns True with the given probability."""
+        return self.random() < probability
+
+    def choice(self, options: tuple | list):
+        """Returns one of the options, all equally likely."""
+        return options[int(self.random() * len(options))]
+
+
+class FatalSchedule:
+    """
+    The strike numbers, counted from 1, on which a fighter's strike is fatal.
+
+    Each strike is fatal with the same probability, independently. The gaps between fatal strikes are drawn
+    from the stream with geometric_gap(), so the next fatal strike is known in advance and
+    Game.resolve_fight() can skip over the regular strikes in between. Stepping strike by strike and skipping
+    ahead read the same schedule, so they see the same fatal strikes.
+    """
+    __slots__ = ("_key", "_probability", "_gaps", "_next")
+
+    def __init__(self, stream: Stream, probability: float) -> None:
+        """
+        Args:
+            stream (Stream): The stream the gaps are read from, counting from its start.
+            probability (float): Probability of a fatal strike.
+        """
+        self._key = stream.key
+        self._probability = probability
+        self._gaps = 1
+        self._next = geometric_gap(uniform(self._key, 0), probability)
+
+    def next_after(self, strike: int) -> float:
+        """Returns the first fatal strike after the given one, math.inf if there is none."""
+        while self._next <= strike:
+            self._next += geometric_gap(uniform(self._key, self._gaps), self._probability)
+            self._gaps += 1
+        return self._next
+
+    def is_fatal(self, strike: int) -> bool:
+        """Returns True if the given strike is fatal."""
+        return self.next_after(strike - 1) == strike
+
+
+if __name__ == "__main__":
+    ...
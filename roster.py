@@ -0,0 +1,351 @@
+"""
+Array-backed roster: one row per character in NumPy columns, for operations that touch every character at once.
+
+    roster = Roster(characters)
+    veterans = roster.where(roster.level > 10)
+    roster.level_dependent_boost(veterans)
+    roster.experience_drop()
+    health, shield, damage = roster.stats()
+
+The characters in a roster are views over their row: the level, experience, level modifier, base stats and
+fatality parameters are read from and written to the columns, so the usual properties and methods (level_up(),
+experience_add(), put_on(), a fight in game.Game) keep working on a single character, and the bulk operations
+above change every view at once. Inventory, armory and the state of the current fight stay on the view.
+
+Effective stats are kept as base stats × item boosts, times the level modifier, multiplied in the same order as
+Character does, so a bulk stats() equals the stats of every character read one by one. Equipment changes through
+put_on() and take_off() update the row right away; call refresh_equipment() after equipping through an armory
+directly.
+
+A view pickles as a plain character of its class, so views can be saved to a player store as they are.
+"""
+import numpy as np
+
+from character import Character, Mage, Paladin, Rogue, Warrior
+from events import bus, ExperienceChanged
+from inventory_items import Items
+from simulation import TYPE_CODES
+
+# Column name -> dtype.
+COLUMNS: dict[str, type] = {
+    "level": np.int64,
+    "experience": np.float64,
+    # Experience is an int in a plain character until a level difference makes it a float.
+    "experience_is_float": np.bool_,
+    "level_modifier": np.float64,
+    "base_health": np.float64,
+    "base_shield": np.float64,
+    "base_damage": np.float64,
+    "boosted_health": np.float64,
+    "boosted_shield": np.float64,
+    "boosted_damage": np.float64,
+    "fatal_prop": np.float64,
+    "fatal_damage": np.int64,
+    "type_code": np.int8,
+}
+# Character slot -> the column it lives in for a view.
+SLOT_COLUMNS: dict[str, str] = {
+    "_level": "level",
+    "_experience": "experience",
+    "_level_modifier": "level_modifier",
+    "_base_health": "base_health",
+    "_base_shield": "base_shield",
+    "_base_damage": "base_damage",
+    "_fatal_prop": "fatal_prop",
+    "_fatal_damage": "fatal_damage",
+}
+# Type code -> character class.
+CLASSES: tuple[type, ...] = tuple(sorted((Warrior, Mage, Rogue, Paladin),
+                                         key=lambda cls: TYPE_CODES[cls.get_character_type()]))
+
+
+def _boosted(character: Character) -> tuple[float, float, float]:
+    """Returns a character's base stats × the boosts of its equipped items, in Character._compute_stats() order."""
+    health, shield, damage = character._base_health, character._base_shield, character._base_damage
+    for item in character._armory.list_items.values():
+        if item:
+            health *= item.boost_health
+            shield *= item.boost_shield
+            damage *= item.boost_damage
+    return health, shield, damage
+
+
+def _column_slot(column: str) -> property:
+    """A property standing in for a Character slot, reading and writing the view's row of a column."""
+
+    def get(self):
+        return self._roster._columns[column][self._row].item()
+
+    def set(self, value) -> None:
+        self._roster._columns[column][self._row] = value
+
+    return property(get, set, doc=f"The {column} column of the view's row.")
+
+
+def _experience_slot() -> property:
+    """The _experience slot of a view, an int or a float like in a plain character."""
+
+    def get(self):
+        columns, row = self._roster._columns, self._row
+        value = columns["experience"][row].item()
+        return value if columns["experience_is_float"][row] else int(value)
+
+    def set(self, value) -> None:
+        columns, row = self._roster._columns, self._row
+        columns["experience"][row] = value
+        columns["experience_is_float"][row] = isinstance(value, float)
+
+    return property(get, set, doc="The experience column of the view's row.")
+
+
+class RosterRow:
+    """
+    Turns a character class into a view over a roster row. Mixed into the view classes made by view_class().
+
+    The slots in SLOT_COLUMNS are replaced by properties over the roster's columns; the rest of Character's slots
+    are still kept on the object.
+    """
+    __slots__ = ()
+
+    def __reduce__(self) -> tuple:
+        """Pickles as a plain character of the view's class."""
+        return object.__new__, (type(self).character_class,), self.__getstate__()
+
+    @property
+    def row(self) -> int:
+        """The view's row in its roster."""
+        return self._row
+
+    @property
+    def roster(self) -> "Roster":
+        return self._roster
+
+    def _compute_stats(self) -> tuple[float, float, float]:
+        """Computes and caches the effective stats, and stores the item-boosted stats in the row."""
+        roster, row = self._roster, self._row
+        health, shield, damage = _boosted(self)
+        columns = roster._columns
+        columns["boosted_health"][row] = health
+        columns["boosted_shield"][row] = shield
+        columns["boosted_damage"][row] = damage
+        modifier = self._level_modifier
+        self._stats = health * modifier, shield * modifier, damage * modifier
+        self._stats_version = self._armory.version
+        self._generation = roster._generation
+        return self._stats
+
+    @property
+    def stats(self) -> tuple[float, float, float]:
+        """Effective health, shield and damage outside of a fight, recomputed after bulk operations."""
+        stats = self._stats
+        if (stats is None or self._stats_version != self._armory.version
+                or self._generation != self._roster._generation):
+            stats = self._compute_stats()
+        return stats
+
+    def put_on(self, item: Items) -> None | str:
+        message = super().put_on(item)
+        self._compute_stats()
+        return message
+
+    def take_off(self, item: Items) -> None:
+        super().take_off(item)
+        self._compute_stats()
+
+
+for _slot, _column in SLOT_COLUMNS.items():
+    setattr(RosterRow, _slot, _experience_slot() if _column == "experience" else _column_slot(_column))
+
+_view_classes: dict[type, type] = {}
+
+
+def view_class(cls: type) -> type:
+    """Returns the view class of a character class, e.g. RosterWarrior for Warrior."""
+    view = _view_classes.get(cls)
+    if view is None:
+        view = _view_classes[cls] = type(f"Roster{cls.__name__}", (RosterRow, cls), {
+            "__slots__": ("_roster", "_row", "_generation"),
+            "__module__": __name__,
+            "character_class": cls,
+        })
+    return view
+
+
+class Roster:
+    """
+    Characters stored column by column, with vectorized bulk operations.
+
+    Bulk operations take the rows to work on: an array of row numbers such as where() returns, a boolean mask of
+    len(roster), or None for every row.
+
+    Attributes:
+        _columns (dict[str, np.ndarray]): The columns of COLUMNS, with room for more rows than are used.
+        _views (list[Character]): The view of every row.
+        _generation (int): Bumped by every bulk operation, so that the views know their cached stats are stale.
+    """
+
+    def __init__(self, characters=(), capacity: int = 64) -> None:
+        """
+        Args:
+            characters (Iterable[Character]): Characters to copy into the roster, see add().
+            capacity (int): Rows to make room for up front.
+        """
+        capacity = max(capacity, 1)
+        self._columns: dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype)
+                                                for name, dtype in COLUMNS.items()}
+        self._views: list[Character] = []
+        self._generation = 0
+        for character in characters:
+            self.add(character)
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def __getitem__(self, row: int) -> Character:
+        return self._views[row]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def _grow(self) -> None:
+        for name, column in self._columns.items():
+            grown = np.zeros(2 * len(column), dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[name] = grown
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns the used part of a column, without copying it. Writing to it changes the characters, but the
+        views' cached stats only notice after a bulk operation or touch().
+
+        Raises:
+            KeyError: If there is no such column.
+        """
+        return self._columns[name][:len(self._views)]
+
+    @property
+    def level(self) -> np.ndarray:
+        return self.column("level")
+
+    @property
+    def experience(self) -> np.ndarray:
+        return self.column("experience")
+
+    @property
+    def level_modifier(self) -> np.ndarray:
+        return self.column("level_modifier")
+
+    @property
+    def type_code(self) -> np.ndarray:
+        return self.column("type_code")
+
+    def add(self, character: Character) -> Character:
+        """
+        Copies a character into a new row.
+
+        Args:
+            character (Character): A Warrior, Mage, Rogue or Paladin. It is left as it was; use the returned view
+                from now on. Its inventory and armory are shared with the view, its fight state is not.
+
+        Returns:
+            Character: The view over the new row, an instance of the character's class.
+        """
+        cls = getattr(type(character), "character_class", type(character))
+        row = len(self._views)
+        if row == len(self._columns["level"]):
+            self._grow()
+        view = object.__new__(view_class(cls))
+        view._roster, view._row, view._generation = self, row, -1
+        self._views.append(view)
+        for slot in SLOT_COLUMNS:
+            setattr(view, slot, getattr(character, slot))
+        self._columns["type_code"][row] = TYPE_CODES[cls.get_character_type()]
+        view._inventory, view._armory, view._name = character._inventory, character._armory, character._name
+        view._stats, view._stats_version = None, -1
+        view.restore()
+        view._compute_stats()
+        return view
+
+    def extend(self, characters) -> list[Character]:
+        """Copies characters into new rows and returns their views, see add()."""
+        return [self.add(character) for character in characters]
+
+    def _rows(self, rows) -> slice | np.ndarray:
+        if rows is None:
+            return slice(0, len(self._views))
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if len(rows) != len(self._views):
+                raise ValueError(f"The mask has {len(rows)} entries for {len(self._views)} rows.")
+            return np.flatnonzero(rows)
+        return rows
+
+    def touch(self) -> None:
+        """Makes every view recompute its cached stats, e.g. after writing to a column directly."""
+        self._generation += 1
+
+    def where(self, condition: np.ndarray) -> np.ndarray:
+        """
+        Returns the rows where a condition over the columns holds, e.g. roster.where(roster.level > 10).
+        """
+        return np.flatnonzero(condition)
+
+    def characters(self, rows=None) -> list[Character]:
+        """Returns the views of the given rows."""
+        if rows is None:
+            return list(self._views)
+        views = self._views
+        return [views[row] for row in self._rows(rows).tolist()]
+
+    def level_dependent_boost(self, rows=None) -> None:
+        """Character.level_dependent_boost() for every given row."""
+        rows = self._rows(rows)
+        modifier = self._columns["level_modifier"]
+        modifier[rows] += self._columns["level"][rows] / 100 * modifier[rows]
+        self.touch()
+
+    def _emit_experience(self, rows) -> None:
+        """Emits an ExperienceChanged event, whose game is the roster, for the view of every given row."""
+        if bus.listening(ExperienceChanged):
+            views = self._views
+            for row in np.arange(len(views))[rows].tolist():
+                view = views[row]
+                bus.emit(ExperienceChanged(self, view, view.experience, view.level))
+
+    def experience_drop(self, rows=None) -> None:
+        """Character.experience_drop() for every given row, with an ExperienceChanged event per row."""
+        rows = self._rows(rows)
+        self._columns["experience"][rows] = 0
+        self._columns["experience_is_float"][rows] = False
+        self._emit_experience(rows)
+
+    def level_up(self, rows=None) -> None:
+        """
+        Character.level_up() for every given row: a level for the rows with at least 100 experience. The rows
+        that level up get an ExperienceChanged event.
+        """
+        rows = self._rows(rows)
+        experience, level = self._columns["experience"], self._columns["level"]
+        ready = experience[rows] >= 100
+        experience[rows] -= np.where(ready, 100, 0)
+        level[rows] += ready
+        self._emit_experience(np.arange(len(self._views))[rows][ready])
+
+    def stats(self, rows=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the effective health, shield and damage of the given rows, equal to each view's stats.
+        """
+        rows = self._rows(rows)
+        columns = self._columns
+        modifier = columns["level_modifier"][rows]
+        return (columns["boosted_health"][rows] * modifier, columns["boosted_shield"][rows] * modifier,
+                columns["boosted_damage"][rows] * modifier)
+
+    def refresh_equipment(self) -> None:
+        """Recomputes the item-boosted stats of every row from its armory."""
+        for view in self._views:
+            view._compute_stats()
+
+
+if __name__ == "__main__":
+    ...
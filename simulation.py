@@ -0,0 +1,360 @@
+import argparse
+import random
+import sys
+
+import numpy as np
+
+import events
+import rng
+
+from character import Character, Mage, Paladin, Rogue, Warrior
+from game import Game, TYPE_ADVANTAGE
+
+
+TYPE_CODES: dict[str, int] = {"warrior": 0, "mage": 1, "rogue": 2, "paladin": 3}
+# ADVANTAGE[code_1, code_2] is True when code_1 gets the type boost against code_2 (see Game.boost_char_damage).
+ADVANTAGE = np.zeros((len(TYPE_CODES), len(TYPE_CODES)), dtype=bool)
+for _type_1, _type_2 in TYPE_ADVANTAGE:
+    ADVANTAGE[TYPE_CODES[_type_1], TYPE_CODES[_type_2]] = True
+TYPE_BOOST: float = Character.type_boost
+
+DRAW = 0
+FIRST_WON = 1
+SECOND_WON = 2
+UNRESOLVED = -1
+
+_FATAL_LABEL = np.uint64(rng.label_value("fatal"))
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Vectorized rng.mix64() on uint64 arrays. Multiplications wrap around like the masked ones in rng."""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _uniform(keys: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Vectorized rng.uniform()."""
+    counters = (index.astype(np.uint64) + np.uint64(1)) * np.uint64(rng.GOLDEN_GAMMA)
+    return (_mix64(keys + counters) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def _geometric_gap(values: np.ndarray, probability: np.ndarray) -> np.ndarray:
+    """Vectorized rng.geometric_gap()."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gaps = 1 + np.floor(np.log(1.0 - values) / np.log(1.0 - probability))
+    return np.where(probability <= 0, np.inf, np.where(probability >= 1, 1.0, gaps))
+
+
+def fatal_keys(seed: int, match_ids: np.ndarray, side: int) -> np.ndarray:
+    """
+    Returns the keys of Stream(seed, match_id, "fatal", side) for every match id.
+
+    Args:
+        seed (int): Root seed.
+        match_ids (np.ndarray): Non-negative integer match ids.
+        side (int): 1 or 2.
+    """
+    keys = _mix64(np.uint64(rng.mix64(seed & rng.MASK64)) ^ match_ids.astype(np.uint64))
+    return _mix64(_mix64(keys ^ _FATAL_LABEL) ^ np.uint64(side))
+
+
+class FatalSchedules:
+    """
+    Vectorized rng.FatalSchedule: the fatal strikes of many fighters, each reading its own stream.
+
+    Attributes:
+        keys (np.ndarray): Stream key of every fighter.
+        probability (np.ndarray): Probability of a fatal strike of every fighter.
+        next_fatal (np.ndarray): The next fatal strike of every fighter, counted from 1; inf if there is none.
+        gaps (np.ndarray): Number of gaps read from every stream so far.
+    """
+    def __init__(self, keys: np.ndarray, probability) -> None:
+        self.keys = np.asarray(keys, dtype=np.uint64)
+        self.probability = np.asarray(probability, dtype=np.float64)
+        self.gaps = np.ones(len(self.keys), dtype=np.int64)
+        self.next_fatal = _geometric_gap(_uniform(self.keys, np.zeros(len(self.keys), dtype=np.int64)),
+                                         self.probability)
+
+    @classmethod
+    def numbered(cls, probability, seed: int, *labels: int | str) -> "FatalSchedules":
+        """
+        Returns the schedules of fighters 0, 1, 2... reading Stream(seed, *labels, n) for fighter n.
+
+        Args:
+            probability (ArrayLike): Probability of a fatal strike of every fighter.
+            seed (int): Root seed.
+            *labels (int | str): Labels of the streams before the fighter number.
+        """
+        probability = np.asarray(probability, dtype=np.float64)
+        base = np.uint64(rng.derive(seed, *labels))
+        return cls(_mix64(base ^ np.arange(len(probability), dtype=np.uint64)), probability)
+
+    def roll(self, strike: int, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns which of the given fighters strike fatally on a strike, and moves their schedules past it.
+
+        Every fighter has to be rolled on every strike it makes, in order, like FatalSchedule.is_fatal().
+
+        Args:
+            strike (int): The strike number, counted from 1.
+            rows (np.ndarray): The fighters striking.
+
+        Returns:
+            np.ndarray: True for the rows whose strike is fatal.
+        """
+        fatal = self.next_fatal[rows] == strike
+        rolled = rows[fatal]
+        if rolled.size:
+            self.next_fatal[rolled] += _geometric_gap(_uniform(self.keys[rolled], self.gaps[rolled]),
+                                                      self.probability[rolled])
+            self.gaps[rolled] += 1
+        return fatal
+
+
+class Fighters:
+    """
+    A batch of fighters stored column-wise, one row per fighter.
+
+    Attributes:
+        health (np.ndarray): Health points of every fighter.
+        shield (np.ndarray): Shield points of every fighter.
+        damage (np.ndarray): Damage dealt by a regular strike.
+        fatal_chance (np.ndarray): Probability that a strike is fatal, rolled on every strike.
+        fatal_damage (np.ndarray): Extra damage added by a fatal strike.
+        type_code (np.ndarray): Index into TYPE_CODES, -1 for an unknown type.
+    """
+    def __init__(self, health, shield, damage, fatal_chance, fatal_damage, type_code) -> None:
+        """
+        Initializes the batch from array-likes of equal length.
+
+        Args:
+            health (ArrayLike): Health points.
+            shield (ArrayLike): Shield points.
+            damage (ArrayLike): Damage points.
+            fatal_chance (ArrayLike): Fatality probability per strike.
+            fatal_damage (ArrayLike): Fatality damage points.
+            type_code (ArrayLike): Character type codes.
+        """
+        self.health = np.asarray(health, dtype=np.float64)
+        self.shield = np.asarray(shield, dtype=np.float64)
+        self.damage = np.asarray(damage, dtype=np.float64)
+        self.fatal_chance = np.asarray(fatal_chance, dtype=np.float64)
+        self.fatal_damage = np.asarray(fatal_damage, dtype=np.float64)
+        self.type_code = np.asarray(type_code, dtype=np.int8)
+
+        size = self.health.shape
+        for column in (self.shield, self.damage, self.fatal_chance, self.fatal_damage, self.type_code):
+            if column.shape != size:
+                raise ValueError("All fighter columns must have the same length.")
+
+    def __len__(self) -> int:
+        return len(self.health)
+
+    @classmethod
+    def from_characters(cls, characters: list[Character]) -> "Fighters":
+        """
+        Builds a batch from the current stats of the given characters.
+
+        Args:
+            characters (list[Character]): Characters to copy the stats from.
+
+        Returns:
+            Fighters: One row per character, in the same order.
+        """
+        return cls(
+            [character.health for character in characters],
+            [character.shield for character in characters],
+            [character.damage for character in characters],
+            [character.fatal_prop for character in characters],
+            [character.fatal_damage for character in characters],
+            [TYPE_CODES.get(character.type_char, -1) for character in characters],
+        )
+
+
+class DuelResults:
+    """
+    Outcome of a batch of duels, one row per duel.
+
+    Attributes:
+        winner (np.ndarray): FIRST_WON, SECOND_WON, DRAW or UNRESOLVED.
+        rounds (np.ndarray): Number of strikes exchanged.
+        health_1, shield_1, health_2, shield_2 (np.ndarray): Stats left after the last strike.
+    """
+    def __init__(self, winner, rounds, health_1, shield_1, health_2, shield_2) -> None:
+        self.winner = winner
+        self.rounds = rounds
+        self.health_1 = health_1
+        self.shield_1 = shield_1
+        self.health_2 = health_2
+        self.shield_2 = shield_2
+
+    def __len__(self) -> int:
+        return len(self.winner)
+
+    @property
+    def wins(self) -> np.ndarray:
+        """Duels won by the first fighter."""
+        return self.winner == FIRST_WON
+
+    @property
+    def losses(self) -> np.ndarray:
+        """Duels lost by the first fighter."""
+        return self.winner == SECOND_WON
+
+    @property
+    def draws(self) -> np.ndarray:
+        """Duels where both fighters dropped to zero health on the same strike."""
+        return self.winner == DRAW
+
+
+def type_advantage(type_1: np.ndarray, type_2: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Game.boost_char_damage check.
+
+    Args:
+        type_1 (np.ndarray): Type codes of the attackers.
+        type_2 (np.ndarray): Type codes of their opponents.
+
+    Returns:
+        np.ndarray: True where the attacker gets the type damage boost.
+    """
+    known = (type_1 >= 0) & (type_2 >= 0)
+    return known & ADVANTAGE[np.where(known, type_1, 0), np.where(known, type_2, 0)]
+
+
+def _apply_strike(health: np.ndarray, shield: np.ndarray, damage: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Shield-then-health damage rule of Game.take_a_strike."""
+    absorbed = damage < shield
+    new_shield = np.where(absorbed, shield - damage, 0.0)
+    new_health = np.where(absorbed, health, health - (damage - shield))
+    return new_health, new_shield
+
+
+def simulate_duels(fighters_1: Fighters, fighters_2: Fighters, seed: int | None = None,
+                   max_rounds: int = 100_000, match_ids=None) -> DuelResults:
+    """
+    Resolves fighters_1[i] against fighters_2[i] for every i at once.
+
+    Follows main.main(): the type-advantaged side gets its damage boosted, then both sides strike
+    simultaneously until Game.check_winner() would report a result. Duel i rolls its fatal strikes like
+    Game(seed=seed, match_id=match_ids[i]), so both give the same fight.
+
+    Args:
+        fighters_1 (Fighters): First fighter of every duel.
+        fighters_2 (Fighters): Second fighter of every duel.
+        seed (int | None): Root seed for the fatality rolls, a fresh one if None.
+        max_rounds (int): Duels still running after this many strikes are marked UNRESOLVED.
+        match_ids (None | ArrayLike): Non-negative integer match id of every duel, defaults to 0, 1, 2...
+
+    Returns:
+        DuelResults: Winners, round counts and final health/shield of every duel.
+    """
+    if len(fighters_1) != len(fighters_2):
+        raise ValueError("Both sides must have the same number of fighters.")
+    size = len(fighters_1)
+    seed = rng.new_seed() if seed is None else seed
+    match_ids = np.arange(size, dtype=np.uint64) if match_ids is None else np.asarray(match_ids, dtype=np.uint64)
+
+    schedules_1 = FatalSchedules(fatal_keys(seed, match_ids, 1), fighters_1.fatal_chance)
+    schedules_2 = FatalSchedules(fatal_keys(seed, match_ids, 2), fighters_2.fatal_chance)
+
+    health_1, shield_1 = fighters_1.health.copy(), fighters_1.shield.copy()
+    health_2, shield_2 = fighters_2.health.copy(), fighters_2.shield.copy()
+    damage_1 = np.where(type_advantage(fighters_1.type_code, fighters_2.type_code),
+                        fighters_1.damage * TYPE_BOOST, fighters_1.damage)
+    damage_2 = np.where(type_advantage(fighters_2.type_code, fighters_1.type_code),
+                        fighters_2.damage * TYPE_BOOST, fighters_2.damage)
+
+    winner = np.full(size, UNRESOLVED, dtype=np.int8)
+    rounds = np.zeros(size, dtype=np.int64)
+    active = np.arange(size)
+
+    for round_number in range(1, max_rounds + 1):
+        if not active.size:
+            break
+        strike_1 = damage_1[active]
+        strike_2 = damage_2[active]
+        fatal_1 = schedules_1.roll(round_number, active)
+        fatal_2 = schedules_2.roll(round_number, active)
+        strike_1 = np.where(fatal_1, strike_1 + fighters_1.fatal_damage[active], strike_1)
+        strike_2 = np.where(fatal_2, strike_2 + fighters_2.fatal_damage[active], strike_2)
+
+        h_1, s_1 = _apply_strike(health_1[active], shield_1[active], strike_2)
+        h_2, s_2 = _apply_strike(health_2[active], shield_2[active], strike_1)
+        health_1[active], shield_1[active] = h_1, s_1
+        health_2[active], shield_2[active] = h_2, s_2
+
+        down_1 = h_1 <= 0
+        down_2 = h_2 <= 0
+        finished = down_1 | down_2
+        done = active[finished]
+        rounds[done] = round_number
+        winner[done] = np.where(down_1[finished] & down_2[finished], DRAW,
+                                np.where(down_2[finished], FIRST_WON, SECOND_WON))
+        active = active[~finished]
+
+    rounds[active] = max_rounds
+    return DuelResults(winner, rounds, health_1, shield_1, health_2, shield_2)
+
+
+def simulate_matchups(characters_1: list[Character], characters_2: list[Character], seed: int | None = None,
+                      max_rounds: int = 100_000) -> DuelResults:
+    """
+    Convenience wrapper around simulate_duels() for lists of Character objects.
+
+    The characters are not modified.
+    """
+    return simulate_duels(Fighters.from_characters(characters_1), Fighters.from_characters(characters_2),
+                          seed, max_rounds)
+
+
+def check_against_game(duels: int = 2_000, seed: int = 0) -> list[int]:
+    """
+    Plays random duels both with simulate_matchups() and with Game.resolve_fight() and compares them.
+
+    The two must agree on a fixed seed: same winner and same number of strikes in every duel. Run this after
+    changing rng.py, Game or this module.
+
+    Args:
+        duels (int): Number of duels, between characters of random classes and levels.
+        seed (int): Seed of the characters and of the fights.
+
+    Returns:
+        list[int]: The duels where they disagree.
+    """
+    generator = random.Random(seed)
+
+    def character() -> Character:
+        fighter = generator.choice((Warrior, Mage, Rogue, Paladin))()
+        for _ in range(generator.randint(0, 8)):
+            fighter.experience_add(fighter.level)
+            fighter.level_up()
+            fighter.level_dependent_boost()
+        return fighter
+
+    characters_1 = [character() for _ in range(duels)]
+    characters_2 = [character() for _ in range(duels)]
+    results = simulate_matchups(characters_1, characters_2, seed)
+    mismatches = []
+    with events.unsubscribed(events.console_renderer):
+        for number, (character_1, character_2) in enumerate(zip(characters_1, characters_2)):
+            game = Game(character_1, character_2, seed=seed, match_id=number)
+            game.boost_char_damage()
+            game.resolve_fight()
+            winner = DRAW if game.winner is None else FIRST_WON if game.winner is character_1 else SECOND_WON
+            if (winner, game.rounds) != (results.winner[number], results.rounds[number]):
+                mismatches.append(number)
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that simulate_duels() agrees with Game on a fixed seed.")
+    parser.add_argument("--duels", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+    disagreeing = check_against_game(arguments.duels, arguments.seed)
+    print(f"{len(disagreeing)} of {arguments.duels} duels disagree with Game.resolve_fight().")
+    if disagreeing:
+        print("First ones:", disagreeing[:10])
+        sys.exit(1)
@@ -0,0 +1,661 @@
+import abc
+import base64
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import time
+
+from collections import Counter
+from typing import Iterable, Iterator
+
+from character import Character
+from inventory_items import item_from_spec, item_spec
+
+
+class PlayerStore(abc.ABC):
+    """
+    Base class for player storage backends.
+
+    A store works like a dict of player name -> Character. Players are loaded the first time they are looked
+    up and kept in a cache, and save() writes back only the cached players whose pickled state changed since
+    they were loaded or last saved.
+
+    Backends implement the abstract methods _read(), _write() and _names().
+    """
+    def __init__(self) -> None:
+        self._cache: dict[str, Character] = {}
+        self._saved: dict[str, bytes] = {}
+
+    @abc.abstractmethod
+    def _read(self, name: str) -> None | bytes:
+        """Returns the pickled player, or None if there is no such player."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _write(self, rows: dict[str, tuple[Character, bytes]]) -> None:
+        """Writes the given players in a single transaction."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _names(self) -> Iterator[str]:
+        """Yields the names of all stored players."""
+        raise NotImplementedError
+
+    def get(self, name: str, default=None) -> None | Character:
+        """
+        Returns a player, loading it from storage on first access.
+
+        Args:
+            name (str): The player's name.
+            default: Returned if there is no such player.
+        """
+        if name in self._cache:
+            return self._cache[name]
+        data = self._read(name)
+        if data is None:
+            return default
+        player = pickle.loads(data)
+        self._cache[name] = player
+        self._saved[name] = data
+        return player
+
+    def __getitem__(self, name: str) -> Character:
+        player = self.get(name)
+        if player is None:
+            raise KeyError(name)
+        return player
+
+    def __setitem__(self, name: str, player: Character) -> None:
+        self._cache[name] = player
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._names()
+        yield from (name for name in self._cache if name not in self._saved)
+
+    def changed(self, names: None | Iterable[str] = None) -> dict[str, tuple[Character, bytes]]:
+        """
+        Returns the cached players whose state differs from storage, with their new pickled state.
+
+        Args:
+            names (None | Iterable[str]): Only check these players instead of the whole cache.
+        """
+        rows = {}
+        for name in self._cache if names is None else names:
+            player = self._cache[name]
+            data = pickle.dumps(player)
+            if data != self._saved.get(name):
+                rows[name] = player, data
+        return rows
+
+    def save(self, names: None | Iterable[str] = None) -> int:
+        """
+        Writes the changed players.
+
+        Args:
+            names (None | Iterable[str]): Only save these players, e.g. the two that just fought.
+
+        Returns:
+            int: The number of players written.
+        """
+        rows = self.changed(names)
+        if rows:
+            self._write(rows)
+            for name, (_, data) in rows.items():
+                self._saved[name] = data
+        return len(rows)
+
+    def reload(self) -> None:
+        """Drops the cache so players are read again from storage. Unsaved changes are lost."""
+        self._cache.clear()
+        self._saved.clear()
+
+    def close(self) -> None:
+        """Releases the backend's resources."""
+
+
+class SQLitePlayerStore(PlayerStore):
+    """
+    Stores one row per player in an SQLite database.
+
+    Besides the pickled player, every row keeps the character type and level so they can be queried.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Opens or creates the database.
+
+        Args:
+            path (str): Path to the database file.
+        """
+        super().__init__()
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            "name TEXT PRIMARY KEY, type TEXT, level INTEGER, data BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _read(self, name: str) -> None | bytes:
+        row = self._connection.execute("SELECT data FROM players WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, rows: dict[str, tuple[Character, bytes]]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO players (name, type, level, data) VALUES (?, ?, ?, ?)",
+                [(name, player.type_char, player.level, data) for name, (player, data) in rows.items()],
+            )
+
+    def _names(self) -> Iterator[str]:
+        for (name,) in self._connection.execute("SELECT name FROM players"):
+            yield name
+
+    def __len__(self) -> int:
+        stored = self._connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+        return stored + sum(1 for name in self._cache if name not in self._saved)
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class PicklePlayerStore(PlayerStore):
+    """
+    Legacy backend: the whole roster is a single pickled dict that is rewritten on every save.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Loads the roster file if it exists.
+
+        Args:
+            path (str): Path to the pickle file.
+        """
+        super().__init__()
+        self._path = path
+        self._players: dict[str, Character] = {}
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                self._players = pickle.load(file)
+
+    def _read(self, name: str) -> None | bytes:
+        player = self._players.get(name)
+        return None if player is None else pickle.dumps(player)
+
+    def _write(self, rows: dict[str, tuple[Character, bytes]]) -> None:
+        for name, (player, _) in rows.items():
+            self._players[name] = player
+        with open(self._path, 'wb') as file:
+            pickle.dump(self._players, file)
+
+    def _names(self) -> Iterator[str]:
+        yield from self._players
+
+    def __len__(self) -> int:
+        return len(self._players) + sum(1 for name in self._cache if name not in self._players)
+
+
+class IndexedFilePlayerStore(PlayerStore):
+    """
+    File-based roster that never reads more than the players it is asked for.
+
+    Players are appended to a data file as [data length, name length, name, pickled player] records. A sorted
+    index file of (name hash, record offset) entries is memory-mapped and binary searched, so opening the store
+    reads only the index header, whatever the number of players. Records appended after the index was last
+    written are found by a short scan on open and folded into the index once there are enough of them.
+    """
+    __magic = b"RPGIDX01"
+    __header = struct.Struct("<8sQQ")  # magic, number of entries, data file size covered by the index
+    __entry = struct.Struct("<QQ")  # name hash, record offset
+    __record = struct.Struct("<IH")  # pickled player length, name length
+
+    def __init__(self, path: str, reindex_after: int = 4096) -> None:
+        """
+        Opens or creates the roster.
+
+        Args:
+            path (str): Path to the data file. The index is stored next to it with an '.idx' suffix.
+            reindex_after (int): Number of unindexed records that triggers rewriting the index.
+        """
+        super().__init__()
+        self._path = path
+        self._index_path = path + ".idx"
+        self._reindex_after = reindex_after
+        self._data = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._index = None
+        self._count = 0
+        self._tail: dict[str, int] = {}
+        # Players in the tail that the index does not have, so len() needs no scan.
+        self._unindexed = 0
+        self._open_index()
+
+    @staticmethod
+    def _hash(name: str) -> int:
+        return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+    def _open_index(self) -> None:
+        """Maps the index file and scans the data records it does not cover yet."""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        self._count, covered = 0, 0
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path) > self.__header.size:
+            with open(self._index_path, 'rb') as file:
+                self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self._count, covered = self.__header.unpack_from(self._index)
+            if magic != self.__magic:
+                raise ValueError(f"{self._index_path} is not a roster index.")
+        self._tail = dict(self._scan(covered))
+        self._unindexed = sum(1 for name in self._tail if self._find_indexed(name) is None)
+
+    def _scan(self, offset: int) -> Iterator[tuple[str, int]]:
+        """
+        Yields (name, offset) of every complete record from offset to the end of the data file.
+
+        A record cut short by a crash during a save is truncated away, so the next save appends where it began.
+        """
+        end = self._data.seek(0, os.SEEK_END)
+        while offset < end:
+            self._data.seek(offset)
+            header = self._data.read(self.__record.size)
+            if len(header) == self.__record.size:
+                size, name_size = self.__record.unpack(header)
+                if offset + self.__record.size + name_size + size <= end:
+                    yield self._data.read(name_size).decode(), offset
+                    offset += self.__record.size + name_size + size
+                    continue
+            self._data.truncate(offset)
+            self._data.flush()
+            return
+
+    def _read_record(self, offset: int) -> tuple[str, bytes]:
+        self._data.seek(offset)
+        size, name_size = self.__record.unpack(self._data.read(self.__record.size))
+        return self._data.read(name_size).decode(), self._data.read(size)
+
+    def _entry(self, position: int) -> tuple[int, int]:
+        return self.__entry.unpack_from(self._index, self.__header.size + position * self.__entry.size)
+
+    def _find(self, name: str) -> None | int:
+        """Returns the offset of the latest record of a player, or None."""
+        if name in self._tail:
+            return self._tail[name]
+        return self._find_indexed(name)
+
+    def _find_indexed(self, name: str) -> None | int:
+        """Binary searches the index for a player."""
+        key = self._hash(name)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self._count:
+            entry_key, offset = self._entry(low)
+            if entry_key != key:
+                break
+            if self._read_record(offset)[0] == name:
+                return offset
+            low += 1
+        return None
+
+    def _read(self, name: str) -> None | bytes:
+        offset = self._find(name)
+        return None if offset is None else self._read_record(offset)[1]
+
+    def _write(self, rows: dict[str, tuple[Character, bytes]]) -> None:
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        for name, (_, data) in rows.items():
+            encoded = name.encode()
+            self._data.write(self.__record.pack(len(data), len(encoded)) + encoded + data)
+            if name not in self._tail and name not in self._saved and self._find_indexed(name) is None:
+                self._unindexed += 1
+            self._tail[name] = offset
+            offset += self.__record.size + len(encoded) + len(data)
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        if len(self._tail) >= self._reindex_after:
+            self.reindex()
+
+    def _indexed_names(self) -> Iterator[tuple[str, int]]:
+        for position in range(self._count):
+            offset = self._entry(position)[1]
+            yield self._read_record(offset)[0], offset
+
+    def _names(self) -> Iterator[str]:
+        for name, _ in self._indexed_names():
+            if name not in self._tail:
+                yield name
+        yield from self._tail
+
+    def __len__(self) -> int:
+        return self._count + self._unindexed + sum(1 for name in self._cache if name not in self._saved)
+
+    def reindex(self) -> None:
+        """Rewrites the index so that it covers every record in the data file."""
+        stale = {self._find_indexed(name) for name in self._tail} - {None}
+        indexed = (entry for entry in map(self._entry, range(self._count)) if entry[1] not in stale)
+        appended = sorted((self._hash(name), offset) for name, offset in self._tail.items())
+        self._write_index(heapq.merge(indexed, appended))
+
+    def compact(self) -> None:
+        """Rewrites the data file without the records that later saves replaced, then rebuilds the index."""
+        latest = dict(self._indexed_names())
+        latest.update(self._tail)
+        offsets = {}
+        with open(self._path + ".tmp", 'wb') as file:
+            for name, offset in latest.items():
+                _, data = self._read_record(offset)
+                encoded = name.encode()
+                offsets[name] = file.tell()
+                file.write(self.__record.pack(len(data), len(encoded)) + encoded + data)
+            file.flush()
+            os.fsync(file.fileno())
+        self._data.close()
+        os.replace(self._path + ".tmp", self._path)
+        self._data = open(self._path, 'r+b')
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        self._count = 0
+        self._write_index(sorted((self._hash(name), offset) for name, offset in offsets.items()))
+
+    def _write_index(self, entries: Iterator[tuple[int, int]]) -> None:
+        """Writes sorted (name hash, offset) entries as the new index file."""
+        self._data.seek(0, os.SEEK_END)
+        with open(self._index_path + ".tmp", 'wb') as file:
+            file.write(self.__header.pack(self.__magic, 0, self._data.tell()))
+            count = 0
+            for entry in entries:
+                file.write(self.__entry.pack(*entry))
+                count += 1
+            file.seek(0)
+            file.write(self.__header.pack(self.__magic, count, self._data.tell()))
+            file.flush()
+            os.fsync(file.fileno())
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        os.replace(self._index_path + ".tmp", self._index_path)
+        self._open_index()
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        self._data.close()
+
+
+class JournalPlayerStore(PlayerStore):
+    """
+    Pickle roster plus an append-only journal of fight results.
+
+    The roster file is a snapshot in the legacy players.pkl format. save() appends one JSON line per changed
+    player to '<path>.journal' instead of rewriting the snapshot. A line holds the player's new experience,
+    level, level modifier, base stats, inventory and armory, but only the fields that changed. Opening the store
+    loads the snapshot and replays the journal on top of it, and compact() folds the journal back into the
+    snapshot.
+
+    All journal fields are absolute values, so replaying a line twice (e.g. after a crash during compaction)
+    gives the same state.
+
+    The store keeps the saved state of every player apart from the cached players handed out by get(), which are
+    copies, so compact() writes only what was journaled and never an unsaved change to a cached player.
+
+    Sync policies:
+        'always': fsync after every save.
+        'batch': fsync once sync_every lines or sync_interval seconds have been written since the last fsync.
+        'never': leave it to the operating system.
+    """
+    sync_policies = ("always", "batch", "never")
+
+    def __init__(self, path: str, sync: str = "batch", sync_every: int = 64, sync_interval: float = 1.0,
+                 compact_after: None | int = 100_000) -> None:
+        """
+        Loads the snapshot and replays the journal.
+
+        Args:
+            path (str): Path to the snapshot file.
+            sync (str): One of sync_policies.
+            sync_every (int): Lines written between fsyncs with the 'batch' policy.
+            sync_interval (float): Seconds between fsyncs with the 'batch' policy.
+            compact_after (None | int): Journal length that triggers compact() on save, None to only compact
+                on demand.
+        """
+        if sync not in self.sync_policies:
+            raise ValueError(f"Unknown sync policy: {sync}. Use one of {self.sync_policies}.")
+        super().__init__()
+        self._path = path
+        self._journal_path = path + ".journal"
+        self._sync = sync
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._compact_after = compact_after
+        self._players: dict[str, Character] = {}
+        self._states: dict[str, dict] = {}
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lines = 0
+
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                self._players = pickle.load(file)
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path, 'r+b') as file:
+                complete = 0
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._replay(line)
+                    complete += len(line)
+                # Drop a last line cut short by a crash, so the next record does not get glued onto it.
+                file.truncate(complete)
+        self._journal = open(self._journal_path, 'ab')
+
+    @staticmethod
+    def _state(player: Character) -> dict:
+        """Returns the journaled fields of a player."""
+        inventory = Counter()
+        for item, count in player.inventory.counts().items():
+            inventory[json.dumps(item_spec(item))] += count
+        return {
+            "exp": player.experience,
+            "lvl": player.level,
+            "mod": player.level_modifier,
+            "base": list(player.base_stats),
+            "inv": [[json.loads(spec), count] for spec, count in sorted(inventory.items())],
+            "arm": {slot: item_spec(item) for slot, item in player.armory.list_items.items() if item},
+        }
+
+    @staticmethod
+    def _apply(player: Character, delta: dict) -> None:
+        """Sets the journaled fields of a player."""
+        if "exp" in delta:
+            player._experience = delta["exp"]
+        if "lvl" in delta:
+            player._level = delta["lvl"]
+        if "inv" in delta:
+            player.inventory.clear()
+            for spec, count in delta["inv"]:
+                player.inventory.add_item(item_from_spec(spec), count=count)
+        if "arm" in delta:
+            player.armory.set_items({slot: item_from_spec(spec) for slot, spec in delta["arm"].items()})
+        if "base" in delta:
+            player._base_health, player._base_shield, player._base_damage = delta["base"]
+        if "mod" in delta:
+            player._level_modifier = delta["mod"]
+        if {"hp", "sh", "dmg"} & delta.keys():
+            # Written before base stats were kept separately: the stats include the item and level boosts.
+            health, shield, damage = player.stats
+            player.rebase(delta.get("hp", health), delta.get("sh", shield), delta.get("dmg", damage))
+
+    def _replay(self, line: bytes) -> None:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return  # A damaged line.
+        self._lines += 1
+        name = record.pop("name")
+        if "new" in record:
+            self._players[name] = pickle.loads(base64.b64decode(record["new"]))
+        else:
+            self._apply(self._players[name], record)
+
+    def get(self, name: str, default=None) -> None | Character:
+        if name not in self._cache and name in self._players:
+            self._cache[name] = pickle.loads(pickle.dumps(self._players[name]))
+            if name not in self._states:
+                self._states[name] = self._state(self._players[name])
+        return self._cache.get(name, default)
+
+    def _names(self) -> Iterator[str]:
+        yield from self._players
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._players
+        yield from (name for name in self._cache if name not in self._players)
+
+    def __len__(self) -> int:
+        return len(self._players) + sum(1 for name in self._cache if name not in self._players)
+
+    def changed(self, names: None | Iterable[str] = None) -> dict[str, dict]:
+        """
+        Returns a journal record for every cached player that changed since it was last journaled.
+
+        Args:
+            names (None | Iterable[str]): Only check these players instead of the whole cache.
+        """
+        records = {}
+        for name in self._cache if names is None else names:
+            player = self._cache[name]
+            if name not in self._states:
+                records[name] = {"name": name, "new": base64.b64encode(pickle.dumps(player)).decode()}
+                continue
+            state, old = self._state(player), self._states[name]
+            delta = {key: value for key, value in state.items() if old[key] != value}
+            if delta:
+                records[name] = {"name": name, **delta}
+        return records
+
+    def save(self, names: None | Iterable[str] = None) -> int:
+        """
+        Appends the changed players to the journal.
+
+        Args:
+            names (None | Iterable[str]): Only save these players.
+
+        Returns:
+            int: The number of players written.
+        """
+        records = self.changed(names)
+        if records:
+            self._append(records, {name: pickle.loads(pickle.dumps(self._cache[name])) for name in records})
+        return len(records)
+
+    def _read(self, name: str) -> None | bytes:
+        player = self._players.get(name)
+        return None if player is None else pickle.dumps(player)
+
+    def _write(self, rows: dict[str, tuple[Character, bytes]]) -> None:
+        """Journals the given players as whole new records."""
+        self._append({name: {"name": name, "new": base64.b64encode(data).decode()} for name, (_, data) in rows.items()},
+                     {name: pickle.loads(data) for name, (_, data) in rows.items()})
+
+    def _append(self, records: dict[str, dict], players: dict[str, Character]) -> None:
+        """
+        Appends journal records, records the players as saved, then syncs and compacts as configured.
+
+        Args:
+            records (dict[str, dict]): Journal record per player name.
+            players (dict[str, Character]): Copies of the saved players, not the cached ones.
+        """
+        self._journal.write(b"".join(json.dumps(record).encode() + b"\n" for record in records.values()))
+        self._journal.flush()
+        for name, player in players.items():
+            self._players[name] = player
+            self._states[name] = self._state(player)
+        self._lines += len(records)
+        self._unsynced += len(records)
+        if self._sync == "always" or (self._sync == "batch" and (
+                self._unsynced >= self._sync_every or time.monotonic() - self._last_sync >= self._sync_interval)):
+            self.sync()
+        if self._compact_after is not None and self._lines >= self._compact_after:
+            self.compact()
+
+    def sync(self) -> None:
+        """Forces the journal to disk."""
+        os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self) -> None:
+        """Writes a new snapshot with the journal folded in and empties the journal."""
+        with open(self._path + ".tmp", 'wb') as file:
+            pickle.dump(self._players, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(self._path + ".tmp", self._path)
+        self._journal.truncate(0)
+        self.sync()
+        self._lines = 0
+
+    def reload(self) -> None:
+        """
+        Drops the unchanged players from the cache. Players added or changed since they were last saved stay
+        cached, so their changes are kept for the next save.
+        """
+        unsaved = self.changed()
+        self._cache = {name: player for name, player in self._cache.items() if name in unsaved}
+
+    def close(self) -> None:
+        if self._unsynced:
+            self.sync()
+        self._journal.close()
+
+
+def import_pickle(path: str, store: PlayerStore) -> int:
+    """
+    Copies every player from a legacy pickle roster into another store.
+
+    Args:
+        path (str): Path to the pickle file.
+        store (PlayerStore): The destination store.
+
+    Returns:
+        int: The number of players written.
+    """
+    with open(path, 'rb') as file:
+        players = pickle.load(file)
+    for name, player in players.items():
+        store[name] = player
+    return store.save()
+
+
+def open_store(path: str, journal: bool = False) -> PlayerStore:
+    """
+    Opens the store backend matching the file extension: '.pkl' for the legacy pickle roster, '.roster' for the
+    indexed file roster, SQLite otherwise.
+
+    Args:
+        path (str): Path to the roster file.
+        journal (bool): Open a '.pkl' roster in journal mode instead of rewriting it on every save.
+    """
+    if path.endswith(".pkl"):
+        return JournalPlayerStore(path) if journal else PicklePlayerStore(path)
+    if path.endswith(".roster"):
+        return IndexedFilePlayerStore(path)
+    return SQLitePlayerStore(path)
+
+
+if __name__ == "__main__":
+    ...
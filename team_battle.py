@@ -0,0 +1,256 @@
+"""
+Team battles: two teams of mixed classes fight until one team has no one standing.
+
+    game = TeamGame(Team("Red", red_members), Team("Blue", blue_members), seed=7)
+    result = game.resolve_fight()
+
+Every round, member k of a team standing strikes member k mod n of the other team's n members standing, so the
+strikes are spread over the whole team. A strike follows the rules of a duel: the type boost when the attacker has
+the advantage over its target (see Game.boost_char_damage()), and an extra fatal_damage on the member's fatal
+strikes, member n of team t rolling them from Stream(seed, match_id, "fatal", t, n). All strikes of a round are
+gathered first and summed per target, and the sums are applied in one vectorized step over the teams' health and
+shield arrays, the shield absorbing first as in take_a_strike(). Both teams strike at the same time, so a member
+struck down in a round still strikes in it.
+
+Team results generalize Game.check_winner(): when only one team has members standing it wins, every winning
+member gains experience as for beating the highest-level member of the other team, levels up and gets the
+winner's level-dependent boost, and every losing member loses its experience; when both teams fall in the same
+round, everyone loses their experience. Health and shield live in the game's arrays during the fight, and every
+member is restored when it ends. Strike events are not emitted: a round's strikes are applied all at once.
+
+    python team_battle.py 1000 --seed 7
+"""
+import argparse
+import time
+
+import numpy as np
+
+from character import Character, Mage, Paladin, Rogue, Warrior
+from events import bus, FightOver
+from game import FightResult, Game
+from rng import Stream
+from simulation import FatalSchedules, Fighters, type_advantage, TYPE_BOOST
+
+
+class Team:
+    """
+    A named group of characters fighting together.
+
+    Attributes:
+        name (str): Name of the team.
+        members (list[Character]): The members, in striking order.
+    """
+
+    def __init__(self, name: str, members: list[Character]) -> None:
+        """
+        Raises:
+            ValueError: If the team has no members.
+        """
+        if not members:
+            raise ValueError(f"Team {name} has no members.")
+        self.name = name
+        self.members = list(members)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    @property
+    def level(self) -> int:
+        """The highest level in the team."""
+        return max(member.level for member in self.members)
+
+    def __str__(self) -> str:
+        return (f"Team {self.name} \nMembers: {len(self.members)} \nLevels: "
+                f"{min(member.level for member in self.members)}-{self.level}")
+
+
+class TeamResult(FightResult):
+    """The result returned by TeamGame.check_winner(); winner is the winning Team, None if both teams lost."""
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        if self.winner is None:
+            return "Both teams lost."
+        return f"The winner: \n{self.winner}"
+
+
+class _Side:
+    """
+    A team's columns during a fight.
+
+    Attributes:
+        fighters (Fighters): Health, shield, damage, fatality parameters and type code of every member.
+        schedules (FatalSchedules): The members' fatal strikes.
+        standing (np.ndarray): Row numbers of the members standing, in striking order.
+    """
+
+    def __init__(self, team: Team, seed: int, match_id: int | str, number: int) -> None:
+        self.fighters = Fighters.from_characters(team.members)
+        self.schedules = FatalSchedules.numbered(self.fighters.fatal_chance, seed, match_id, "fatal", number)
+        self.standing = np.arange(len(team))
+
+    def strikes(self, strike: int, targets: "_Side") -> np.ndarray:
+        """
+        Returns the total damage the members standing deal to each of the other side's members standing.
+
+        Args:
+            strike (int): The strike number of the round.
+            targets (_Side): The other side.
+
+        Returns:
+            np.ndarray: Damage per target, in the order of targets.standing.
+        """
+        attackers, defenders = self.standing, targets.standing
+        positions = np.arange(len(attackers)) % len(defenders)
+        aimed = defenders[positions]
+        damage = self.fighters.damage[attackers]
+        damage = np.where(type_advantage(self.fighters.type_code[attackers], targets.fighters.type_code[aimed]),
+                          damage * TYPE_BOOST, damage)
+        fatal = self.schedules.roll(strike, attackers)
+        damage = np.where(fatal, damage + self.fighters.fatal_damage[attackers], damage)
+        return np.bincount(positions, damage, len(defenders))
+
+    def take(self, damage: np.ndarray) -> None:
+        """Applies the total damage per member standing, shield first, and drops the members that fell."""
+        rows = self.standing
+        health, shield = self.fighters.health[rows], self.fighters.shield[rows]
+        absorbed = damage < shield
+        self.fighters.shield[rows] = np.where(absorbed, shield - damage, 0.0)
+        health = np.where(absorbed, health, health - (damage - shield))
+        self.fighters.health[rows] = health
+        self.standing = rows[health > 0]
+
+    def can_strike(self) -> bool:
+        """Returns True if a member standing deals damage or has a fatal strike to come."""
+        rows = self.standing
+        fighters = self.fighters
+        return bool(np.any(fighters.damage[rows] > 0)
+                    or np.any((fighters.fatal_damage[rows] > 0) & np.isfinite(self.schedules.next_fatal[rows])))
+
+
+class TeamGame(Game):
+    """
+    A Game between two teams. character_1 and character_2 are the first members of the teams.
+
+    Attributes:
+        team_1 (Team): The first team.
+        team_2 (Team): The second team.
+        rounds (int): Rounds fought so far.
+        winner (None | Team): The winning team found by check_winner(), None before that or after a draw.
+    """
+
+    def __init__(self, team_1: Team, team_2: Team, seed: None | int = None, match_id: int | str = 0) -> None:
+        """
+        Args:
+            team_1 (Team): The first team.
+            team_2 (Team): The second team.
+            seed (None | int): Root seed, a fresh one if None.
+            match_id (int | str): Identifies the game among the games played with the same seed.
+        """
+        super().__init__(team_1.members[0], team_2.members[0], seed, match_id)
+        self.team_1 = team_1
+        self.team_2 = team_2
+        self.winner: None | Team = None
+        self._side_1 = _Side(team_1, self.seed, match_id, 1)
+        self._side_2 = _Side(team_2, self.seed, match_id, 2)
+
+    def standing(self) -> tuple[list[Character], list[Character]]:
+        """Returns the members of both teams still standing."""
+        return ([self.team_1.members[row] for row in self._side_1.standing.tolist()],
+                [self.team_2.members[row] for row in self._side_2.standing.tolist()])
+
+    def restore_health_shield(self) -> None:
+        """Ends the fight for every member of both teams."""
+        for member in self.team_1.members + self.team_2.members:
+            member.restore()
+
+    def boost_char_damage(self) -> None:
+        """Does nothing: in a team battle the type boost depends on each strike's target, see take_a_strike()."""
+
+    def take_a_strike(self) -> None:
+        """
+        Plays one round: every member standing strikes, then the summed strikes are applied to both teams at once.
+        """
+        self.rounds += 1
+        damage_2 = self._side_1.strikes(self.rounds, self._side_2)
+        damage_1 = self._side_2.strikes(self.rounds, self._side_1)
+        self._side_1.take(damage_1)
+        self._side_2.take(damage_2)
+
+    def check_winner(self) -> None | TeamResult:
+        """
+        Checks whether one or both teams have no one standing, and hands out experience like Game.check_winner().
+
+        Returns:
+            None | TeamResult: The result if the fight is over, whose text names the winning team or says that
+            both teams lost.
+        """
+        standing_1, standing_2 = len(self._side_1.standing), len(self._side_2.standing)
+        if standing_1 and standing_2:
+            return None
+        self.restore_health_shield()
+        if not standing_1 and not standing_2:
+            for member in self.team_1.members + self.team_2.members:
+                member.experience_drop()
+            if bus.listening(FightOver):
+                bus.emit(FightOver(self, self.team_1, self.team_2, self.rounds, True))
+            self._emit_experience(*self.team_1.members, *self.team_2.members)
+            return TeamResult(None)
+
+        winner, loser = (self.team_1, self.team_2) if standing_1 else (self.team_2, self.team_1)
+        opponent_level = loser.level
+        for member in winner.members:
+            member.experience_add(opponent_level)
+            member.level_up()
+            member.level_dependent_boost()
+        for member in loser.members:
+            member.experience_drop()
+        self.winner = winner
+        if bus.listening(FightOver):
+            bus.emit(FightOver(self, winner, loser, self.rounds, False))
+        self._emit_experience(*self.team_1.members, *self.team_2.members)
+        return TeamResult(winner)
+
+    def resolve_fight(self) -> None | TeamResult:
+        """
+        Plays rounds until a team has no one standing.
+
+        Returns:
+            None | TeamResult: The result of check_winner().
+
+        Raises:
+            ValueError: If neither team can deal damage, so the fight would never end.
+        """
+        while len(self._side_1.standing) and len(self._side_2.standing):
+            if not (self._side_1.can_strike() or self._side_2.can_strike()):
+                raise ValueError("Neither team can deal damage.")
+            self.take_a_strike()
+        return self.check_winner()
+
+
+def random_team(name: str, size: int, seed: int) -> Team:
+    """Returns a team of new characters of random classes, named after the team."""
+    classes = Stream(seed, name, "classes")
+    members = []
+    for number in range(size):
+        member = classes.choice((Warrior, Mage, Rogue, Paladin))()
+        member.name = f"{name}{number}"
+        members.append(member)
+    return Team(name, members)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays a battle between two teams of random characters.")
+    parser.add_argument("size", type=int, nargs="?", default=1000, help="Members per team.")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    red, blue = random_team("red", arguments.size, arguments.seed), random_team("blue", arguments.size, arguments.seed)
+    started = time.perf_counter()
+    game = TeamGame(red, blue, arguments.seed)
+    game.resolve_fight()
+    seconds = time.perf_counter() - started
+    print(f"{game.rounds} rounds in {seconds * 1000:.1f} ms.")
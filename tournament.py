@@ -0,0 +1,227 @@
+"""
+Round-robin and Swiss tournaments over a roster, with the duels spread over a process pool.
+
+Workers never see Character objects. Every fighter is shipped once per worker as a compact record (a tuple of
+numbers and the type name), duels are resolved with the arithmetic of Game.resolve_fight(), and each shard comes
+back as an array of outcome codes. Every duel rolls its fatal strikes from streams named by the tournament seed
+and the pairing, and the results are applied to the characters in pairing order, so the final experience and
+levels do not depend on the number of workers or on which shard finished first.
+"""
+import math
+import os
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Iterator
+
+from character import Character
+from events import bus, ExperienceChanged
+from game import Game, resolve_strikes
+from rng import FatalSchedule, Stream, new_seed
+
+DRAW = 0
+FIRST_WON = 1
+SECOND_WON = 2
+
+_worker_records: list[tuple] = []
+_worker_seed: int = 0
+
+
+def fighter_record(character: Character) -> tuple:
+    """
+    Returns the compact record a worker needs to resolve a character's duels.
+
+    Args:
+        character (Character): The character to describe.
+
+    Returns:
+        tuple: (health, shield, damage, fatality probability, fatality damage, type, level).
+    """
+    return (character.health, character.shield, character.strike, character.fatal_prop, character.fatal_damage,
+            character.type_char, character.level)
+
+
+def duel_outcome(record_1: tuple, record_2: tuple, seed: int, *match_id: int | str) -> int:
+    """
+    Resolves a duel between two fighter records the way main() does: type boost, then strikes until one falls.
+
+    The fatal strikes come from the same streams as in Game(seed=seed, match_id=...), with the match id
+    labels given here.
+
+    Returns:
+        int: FIRST_WON, SECOND_WON or DRAW.
+    """
+    health_1, shield_1, damage_1, fatal_prop_1, fatal_damage_1, type_1, _ = record_1
+    health_2, shield_2, damage_2, fatal_prop_2, fatal_damage_2, type_2, _ = record_2
+    if Game.has_type_advantage(type_1, type_2):
+        damage_1 *= Character.type_boost
+    elif Game.has_type_advantage(type_2, type_1):
+        damage_2 *= Character.type_boost
+    schedule_1 = FatalSchedule(Stream(seed, *match_id, "fatal", 1), fatal_prop_1)
+    schedule_2 = FatalSchedule(Stream(seed, *match_id, "fatal", 2), fatal_prop_2)
+    _, (health_1, _), (health_2, _) = resolve_strikes((health_1, shield_1, damage_1, fatal_damage_1, schedule_1),
+                                                      (health_2, shield_2, damage_2, fatal_damage_2, schedule_2))
+    if health_1 <= 0 and health_2 <= 0:
+        return DRAW
+    return FIRST_WON if health_2 <= 0 else SECOND_WON
+
+
+def _init_worker(records: list[tuple], seed: int) -> None:
+    global _worker_records, _worker_seed
+    _worker_records = records
+    _worker_seed = seed
+
+
+def _play_rows(start: int, stop: int) -> array:
+    """Plays every round-robin pairing (i, j) with start <= i < stop and j > i, in order."""
+    records, seed = _worker_records, _worker_seed
+    outcomes = array('b')
+    for i in range(start, stop):
+        record = records[i]
+        outcomes.extend(duel_outcome(record, records[j], seed, "round robin", i, j)
+                        for j in range(i + 1, len(records)))
+    return outcomes
+
+
+def _play_pairs(round_number: int, pairs: list[tuple[int, int]]) -> array:
+    """Plays the given pairings of a Swiss round, in order."""
+    records, seed = _worker_records, _worker_seed
+    return array('b', (duel_outcome(records[i], records[j], seed, "swiss", round_number, i, j) for i, j in pairs))
+
+
+def _row_shards(size: int, shards: int) -> list[tuple[int, int]]:
+    """Splits round-robin rows into ranges holding about the same number of pairings."""
+    total = size * (size - 1) // 2
+    bounds, start, count = [], 0, 0
+    for i in range(size):
+        count += size - 1 - i
+        if count >= total / shards * (len(bounds) + 1) or i == size - 1:
+            bounds.append((start, i + 1))
+            start = i + 1
+    return bounds
+
+
+class Tournament:
+    """
+    Plays tournaments over a list of characters and keeps the standings.
+
+    Attributes:
+        characters (list[Character]): The participants.
+        points (list[float]): Tournament points per participant: 1 per win, 0.5 per draw.
+        matches (int): Number of duels played.
+        seed (int): Root seed of the duels' random streams.
+    """
+    def __init__(self, characters: list[Character], workers: None | int = None, shard_size: int = 20_000,
+                 seed: None | int = None) -> None:
+        """
+        Takes a snapshot of the participants' stats.
+
+        Args:
+            characters (list[Character]): The participants.
+            workers (None | int): Number of worker processes, defaults to the number of CPUs.
+                With 1, duels run in this process.
+            shard_size (int): Approximate number of duels sent to a worker at once.
+            seed (None | int): Root seed, a fresh one if None. The same seed and roster give the same results.
+        """
+        self.characters = characters
+        self.points = [0.0] * len(characters)
+        self.matches = 0
+        self._records = [fighter_record(character) for character in characters]
+        self._workers = workers or os.cpu_count() or 1
+        self._shard_size = shard_size
+        self.seed = new_seed() if seed is None else seed
+        self._swiss_rounds = 0
+
+    def _executor(self) -> Executor:
+        return ProcessPoolExecutor(self._workers, initializer=_init_worker, initargs=(self._records, self.seed))
+
+    def round_robin(self) -> list[tuple[Character, float]]:
+        """
+        Plays every participant against every other one.
+
+        Returns:
+            list[tuple[Character, float]]: The standings.
+        """
+        size = len(self._records)
+        if size < 2:
+            return self.standings()
+        shards = max(1, math.ceil(size * (size - 1) / 2 / self._shard_size))
+        bounds = _row_shards(size, shards)
+        if self._workers == 1:
+            _init_worker(self._records, self.seed)
+            results = [_play_rows(start, stop) for start, stop in bounds]
+        else:
+            with self._executor() as executor:
+                results = list(executor.map(_play_rows, *zip(*bounds)))
+
+        pairs = ((i, j) for start, stop in bounds for i in range(start, stop) for j in range(i + 1, size))
+        self._apply(pairs, (outcome for shard in results for outcome in shard))
+        return self.standings()
+
+    def swiss(self, rounds: int) -> list[tuple[Character, float]]:
+        """
+        Plays Swiss rounds: every round, participants are sorted by points and paired with their neighbour.
+
+        Args:
+            rounds (int): Number of rounds.
+
+        Returns:
+            list[tuple[Character, float]]: The standings.
+        """
+        executor = None if self._workers == 1 else self._executor()
+        if executor is None:
+            _init_worker(self._records, self.seed)
+        try:
+            for round_number in range(self._swiss_rounds, self._swiss_rounds + rounds):
+                order = sorted(range(len(self._records)), key=lambda index: (-self.points[index], index))
+                pairs = list(zip(order[0::2], order[1::2]))
+                shards = [pairs[start:start + self._shard_size] for start in range(0, len(pairs), self._shard_size)]
+                if executor is None:
+                    results = [_play_pairs(round_number, shard) for shard in shards]
+                else:
+                    results = list(executor.map(_play_pairs, [round_number] * len(shards), shards))
+                self._apply(iter(pairs), (outcome for shard in results for outcome in shard))
+                self._swiss_rounds += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.standings()
+
+    def _apply(self, pairs: Iterator[tuple[int, int]], outcomes: Iterator[int]) -> None:
+        """
+        Applies results in pairing order with check_winner()'s experience rules, including the winner's
+        level-dependent boost.
+
+        Opponent levels come from the snapshot taken when the tournament started, and the duels are fought with
+        the stats of that snapshot, so the boosts show only after the tournament. Every participant that played
+        gets an ExperienceChanged event, whose game is the tournament, once the results are applied.
+        """
+        played = set()
+        for (i, j), outcome in zip(pairs, outcomes):
+            played.update((i, j))
+            self.matches += 1
+            if outcome == DRAW:
+                self.points[i] += 0.5
+                self.points[j] += 0.5
+                self.characters[i].experience_drop()
+                self.characters[j].experience_drop()
+                continue
+            winner, loser = (i, j) if outcome == FIRST_WON else (j, i)
+            self.points[winner] += 1
+            self.characters[winner].experience_add(self._records[loser][6])
+            self.characters[winner].level_up()
+            self.characters[winner].level_dependent_boost()
+            self.characters[loser].experience_drop()
+        if bus.listening(ExperienceChanged):
+            for index in sorted(played):
+                character = self.characters[index]
+                bus.emit(ExperienceChanged(self, character, character.experience, character.level))
+
+    def standings(self) -> list[tuple[Character, float]]:
+        """Returns the participants with their points, best first. Ties keep the roster order."""
+        order = sorted(range(len(self.characters)), key=lambda index: (-self.points[index], index))
+        return [(self.characters[index], self.points[index]) for index in order]
+
+
+if __name__ == "__main__":
+    ...